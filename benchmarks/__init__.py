@@ -0,0 +1,28 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Benchmark scripts. These are not unit tests - run each module directly, for example:
+
+::
+
+    $ python -m benchmarks.bench_redaction
+"""
+
+import time
+
+
+def timed(function, *args, **kwargs)->float:
+    """Run the function once and return the elapsed wall time in seconds
+    """
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def report(label: str, operations: int, elapsed: float):
+    print('{:<60} {:>12,.0f} ops/s  ({:.3f}s for {:,} ops)'.format(label, operations / elapsed, elapsed, operations))
+
+# EOF
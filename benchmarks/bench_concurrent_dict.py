@@ -0,0 +1,59 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Store throughput by thread count: a GenericDataContainer guarded by one global lock compared with a
+ConcurrentDictContainer. Every thread stores its own keys. Log output is disabled during the measurements.
+
+On builds with the GIL the numbers mostly show the locking overhead. Run the script with a free-threaded build
+(python3.13t or later) to see the stripes scale with the number of threads.
+
+::
+
+    $ python -m benchmarks.bench_concurrent_dict
+"""
+
+import sys
+import logging
+import threading
+from benchmarks import timed, report
+from oculusd_utils.persistence import GenericDataContainer
+from oculusd_utils.persistence.concurrent import ConcurrentDictContainer
+
+
+STORES_PER_THREAD = 50000
+THREAD_COUNTS = (1, 2, 4, 8, )
+
+
+def run_threads(thread_count: int, store_function):
+    def worker(number: int):
+        for i in range(STORES_PER_THREAD):
+            store_function(data=i, key='{}-{}'.format(number, i))
+    threads = [threading.Thread(target=worker, args=(number, )) for number in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print('GIL enabled: {}'.format(getattr(sys, '_is_gil_enabled', lambda: True)()))
+    for thread_count in THREAD_COUNTS:
+        data = GenericDataContainer(data_type=dict)
+        lock = threading.Lock()
+
+        def locked_store(data_container=data, **kwarg):
+            with lock:
+                data_container.store(**kwarg)
+        report('Global lock, {} threads'.format(thread_count), thread_count * STORES_PER_THREAD, timed(run_threads, thread_count, locked_store))
+        data = ConcurrentDictContainer(stripe_count=32)
+        report('ConcurrentDictContainer, {} threads'.format(thread_count), thread_count * STORES_PER_THREAD, timed(run_threads, thread_count, data.store))
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,55 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Cost of persisting a few changed keys of a large dict: a full TextFileIO write compared with a DeltaFileIO write
+that only appends the changes. Log output is disabled during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_delta_io
+"""
+
+import logging
+import shutil
+import tempfile
+from benchmarks import timed, report
+from oculusd_utils.persistence import TextFileIO
+from oculusd_utils.persistence.delta_io import DeltaFileIO
+from oculusd_utils.persistence.snapshots import SnapshotDataContainer
+
+
+KEY_COUNT = 200000
+CHANGES_PER_WRITE = 100
+WRITE_COUNT = 20
+
+
+def changed_writes(file_io, data: SnapshotDataContainer):
+    for write in range(WRITE_COUNT):
+        for i in range(CHANGES_PER_WRITE):
+            data.store(data={'number': write, 'name': 'changed'}, key='key-{}'.format(write * CHANGES_PER_WRITE + i))
+        file_io.write(data=data)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp()
+    try:
+        for label, file_io in (
+            ('TextFileIO full writes', TextFileIO(file_folder_path=directory, file_name='full.json')),
+            ('DeltaFileIO delta writes', DeltaFileIO(file_folder_path=directory, file_name='delta.ndjson')),
+        ):
+            data = SnapshotDataContainer(data_type=dict)
+            data.data = {'key-{}'.format(i): {'number': i, 'name': 'item {}'.format(i)} for i in range(KEY_COUNT)}
+            file_io.write(data=data)
+            report('{} ({} changed keys per write)'.format(label, CHANGES_PER_WRITE), WRITE_COUNT, timed(changed_writes, file_io, data))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
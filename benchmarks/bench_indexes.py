@@ -0,0 +1,64 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Equality and range lookups in a list container of records: a linear scan of a GenericDataContainer compared with
+the indexes of an IndexedListContainer, and the cost of maintaining the indexes in store(). Log output is disabled
+during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_indexes
+"""
+
+import random
+import logging
+from benchmarks import timed, report
+from oculusd_utils.persistence import GenericDataContainer
+from oculusd_utils.persistence.indexes import IndexedListContainer
+
+
+RECORD_COUNT = 100000
+LOOKUP_COUNT = 200
+
+
+def make_records()->list:
+    return [{'id': i, 'hostname': 'node-{}'.format(i % 1000), 'timestamp': i * 10} for i in range(RECORD_COUNT)]
+
+
+def load(container: GenericDataContainer, records: list)->GenericDataContainer:
+    container.store_many(items=records)
+    return container
+
+
+def scan_lookups(container: GenericDataContainer, hostnames: list, starts: list):
+    for hostname, start in zip(hostnames, starts):
+        [record for record in container.data if record['hostname'] == hostname]
+        [record for record in container.data if start <= record['timestamp'] <= start + 1000]
+
+
+def index_lookups(container: IndexedListContainer, hostnames: list, starts: list):
+    for hostname, start in zip(hostnames, starts):
+        container.find(field='hostname', value=hostname)
+        container.find_range(field='timestamp', low=start, high=start + 1000)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    random.seed(1)
+    records = make_records()
+    hostnames = ['node-{}'.format(random.randrange(1000)) for i in range(LOOKUP_COUNT)]
+    starts = [random.randrange(RECORD_COUNT * 10) for i in range(LOOKUP_COUNT)]
+    report('store_many() into a GenericDataContainer', RECORD_COUNT, timed(load, GenericDataContainer(data_type=list), records))
+    new_indexed = lambda: IndexedListContainer(hash_indexes=('hostname', ), sorted_indexes=('timestamp', ))
+    report('store_many() into an IndexedListContainer', RECORD_COUNT, timed(load, new_indexed(), records))
+    report('Linear scan lookups (equality + range)', LOOKUP_COUNT, timed(scan_lookups, load(GenericDataContainer(data_type=list), records), hostnames, starts))
+    report('Index lookups (equality + range)', LOOKUP_COUNT, timed(index_lookups, load(new_indexed(), records), hostnames, starts))
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,69 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Formatting throughput of JsonLogFormatter compared with the text formatter and a dict + json.dumps() formatter
+
+::
+
+    $ python -m benchmarks.bench_json_logging
+"""
+
+import json
+import logging
+import socket
+from benchmarks import timed, report
+from oculusd_utils import formatter
+from oculusd_utils.json_logging import JsonLogFormatter
+
+
+RECORD_COUNT = 200000
+
+
+class DictJsonFormatter(logging.Formatter):
+    """The straight forward implementation, for comparison"""
+
+    def __init__(self):
+        super().__init__()
+        self.host = socket.gethostname()
+
+    def format(self, record):
+        return json.dumps({
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'service': 'bench',
+            'host': self.host,
+        })
+
+
+def build_records(count: int)->list:
+    records = list()
+    for i in range(count):
+        record = logging.LogRecord('oculusd_utils', logging.INFO, __file__, 42, 'Read {} bytes from "/var/lib/data/file-{}.json"'.format(i * 17, i), None, None)
+        record.created = 1545824915.0 + i / 1000.0
+        record.msecs = (i % 1000) * 1.0
+        records.append(record)
+    return records
+
+
+def format_all(log_formatter: logging.Formatter, records: list):
+    format_record = log_formatter.format
+    for record in records:
+        format_record(record)
+
+
+def main():
+    records = build_records(count=RECORD_COUNT)
+    report('Text formatter (default)', RECORD_COUNT, timed(format_all, formatter, records))
+    report('dict + json.dumps() formatter', RECORD_COUNT, timed(format_all, DictJsonFormatter(), records))
+    report('JsonLogFormatter', RECORD_COUNT, timed(format_all, JsonLogFormatter(service='bench'), records))
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
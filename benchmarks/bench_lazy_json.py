@@ -0,0 +1,74 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Reading a few keys of a large JSON object file: full parse compared with LazyJsonFileIO (first open with a scan,
+and a repeat open with the saved key index). Time and peak Python memory are measured in separate runs, as tracing
+memory allocations slows the code down. Log output is disabled.
+
+::
+
+    $ python -m benchmarks.bench_lazy_json
+"""
+
+import os
+import json
+import time
+import logging
+import shutil
+import tempfile
+import tracemalloc
+from oculusd_utils.persistence import TextFileIO
+from oculusd_utils.persistence.lazy_json import LazyJsonFileIO
+
+
+KEY_COUNT = 200000
+KEYS_READ = ('key-0', 'key-100000', 'key-199999', )
+
+
+def full_parse(directory: str):
+    data = json.loads(TextFileIO(file_folder_path=directory, file_name='big.json').read().data)
+    return [data[key] for key in KEYS_READ]
+
+
+def lazy_read(directory: str):
+    data = LazyJsonFileIO(file_folder_path=directory, file_name='big.json').read()
+    return [data.data[key] for key in KEYS_READ]
+
+
+def measure(label: str, directory: str, function, remove_index: bool=False):
+    if remove_index is True:
+        os.remove(os.path.join(directory, 'big.json.keyidx'))
+    start = time.perf_counter()
+    function(directory)
+    elapsed = time.perf_counter() - start
+    if remove_index is True:
+        os.remove(os.path.join(directory, 'big.json.keyidx'))
+    tracemalloc.start()
+    function(directory)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('{:<60} {:>8.3f}s  peak {:>8.1f} MiB'.format(label, elapsed, peak / 1024 / 1024))
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(directory, 'big.json'), 'w') as f:
+            json.dump({'key-{}'.format(i): {'name': 'item {}'.format(i), 'tags': ['a', 'b'], 'value': i * 1.5} for i in range(KEY_COUNT)}, f)
+        print('File size: {:.1f} MiB, {} keys, {} keys read'.format(os.path.getsize(os.path.join(directory, 'big.json')) / 1024 / 1024, KEY_COUNT, len(KEYS_READ)))
+        measure('Full parse (TextFileIO + json.loads)', directory, full_parse)
+        lazy_read(directory)
+        measure('LazyJsonFileIO, first open (scan)', directory, lazy_read, remove_index=True)
+        measure('LazyJsonFileIO, repeat open (saved key index)', directory, lazy_read)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
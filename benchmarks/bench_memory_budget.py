@@ -0,0 +1,48 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Cost of the memory accounting in GenericDataContainer.store(): a dict container of small records, with and without
+a MemoryBudget, and the time deep_size() takes to measure the whole container once. Log output is disabled during
+the measurements.
+
+::
+
+    $ python -m benchmarks.bench_memory_budget
+"""
+
+import logging
+from benchmarks import timed, report
+from oculusd_utils.persistence import GenericDataContainer, MemoryBudget, deep_size
+
+
+RECORD_COUNT = 100000
+
+
+def make_records()->list:
+    return [('key-{}'.format(i), {'hostname': 'node-{}'.format(i % 50), 'status': 'running', 'values': [i, i * 2]}, ) for i in range(RECORD_COUNT)]
+
+
+def load(records: list, memory_budget: MemoryBudget=None)->GenericDataContainer:
+    container = GenericDataContainer(result_set_name='records', data_type=dict, memory_budget=memory_budget)
+    for key, value in records:
+        container.store(data=value, key=key)
+    return container
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    records = make_records()
+    report('store() without accounting', RECORD_COUNT, timed(load, records))
+    budget = MemoryBudget()
+    report('store() with a MemoryBudget', RECORD_COUNT, timed(load, records, budget))
+    container = load(records)
+    report('deep_size() of the whole container (records measured)', RECORD_COUNT, timed(deep_size, container.data))
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,80 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Streaming NDJSON throughput and memory: buffered writes, validated streaming reads in batches, and a whole-file read
+for comparison. Peak memory is measured in a separate run, because tracing allocations slows the code down. Log output
+is disabled during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_ndjson_io
+"""
+
+import os
+import time
+import logging
+import shutil
+import tempfile
+import tracemalloc
+from oculusd_utils.security.validation import DataValidator
+from oculusd_utils.persistence.ndjson_io import NDJsonIO
+
+
+RECORD_COUNT = 500000
+
+
+class EventValidator(DataValidator):
+
+    def validate(self, data: object, **kwarg)->bool:
+        return isinstance(data, dict) and 'id' in data
+
+
+def write_records(ndjson_io: NDJsonIO):
+    with ndjson_io.writer() as writer:
+        writer.write_records(records=({'id': i, 'name': 'event {}'.format(i), 'tags': ['a', 'b'], 'value': i * 1.5} for i in range(RECORD_COUNT)))
+
+
+def stream_batches(ndjson_io: NDJsonIO):
+    count = 0
+    for batch in ndjson_io.batches(batch_size=10000):
+        count = count + len(batch.data)
+    return count
+
+
+def read_all(ndjson_io: NDJsonIO):
+    return len(ndjson_io.read().data)
+
+
+def measure(label: str, function, ndjson_io: NDJsonIO):
+    start = time.perf_counter()
+    function(ndjson_io)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(ndjson_io)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    size = os.path.getsize(ndjson_io.uri) / 1024 / 1024
+    print('{:<50} {:>8.3f}s  {:>8.1f} MiB/s  peak {:>8.1f} MiB'.format(label, elapsed, size / elapsed, peak / 1024 / 1024))
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp()
+    try:
+        ndjson_io = NDJsonIO(file_folder_path=directory, file_name='events.ndjson', data_validator=EventValidator())
+        write_records(ndjson_io)
+        print('File size: {:.1f} MiB, {} records'.format(os.path.getsize(ndjson_io.uri) / 1024 / 1024, RECORD_COUNT))
+        measure('Buffered write', write_records, ndjson_io)
+        measure('Validated streaming read (batches of 10000)', stream_batches, ndjson_io)
+        measure('Validated read into one container', read_all, ndjson_io)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
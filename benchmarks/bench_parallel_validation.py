@@ -0,0 +1,54 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Speedup of ParallelValidator by number of worker processes, for numbers in shared memory and for strings sent
+shard by shard. The single process baseline validates the same values in a loop. Worker start up is excluded (the pool
+is warmed up first). Log output is disabled during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_parallel_validation
+"""
+
+import os
+import logging
+from array import array
+from benchmarks import timed, report
+from oculusd_utils.security.validation import StringDataValidator, NumberDataValidator
+from oculusd_utils.security.parallel import ParallelValidator
+
+
+NUMBER_COUNT = 2000000
+STRING_COUNT = 1000000
+WORKER_COUNTS = (1, 2, 4, 8, )
+
+
+def single_process(validator, parameters: dict, values: object):
+    for value in values:
+        validator.validate(data=value, **parameters)
+
+
+def measure(label: str, validator, parameters: dict, values: object):
+    baseline = timed(single_process, validator, parameters, values)
+    report('{}, single process loop'.format(label), len(values), baseline)
+    for worker_count in WORKER_COUNTS:
+        with ParallelValidator(validator=validator, parameters=parameters, max_workers=worker_count, shard_size=50000) as runner:
+            runner.validate_many(values=values[:worker_count * 50000 + 1])     # Start all workers
+            elapsed = timed(runner.validate_many, values)
+        report('{}, {} workers ({:.2f}x)'.format(label, worker_count, baseline / elapsed), len(values), elapsed)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print('CPU count: {}'.format(os.cpu_count()))
+    measure('Numbers (shared memory)', NumberDataValidator(), {'min_value': 0, 'max_value': 1000000}, array('d', [i * 0.5 for i in range(NUMBER_COUNT)]))
+    measure('Strings', StringDataValidator(), {'max_length': 32}, ['name {}'.format(i) for i in range(STRING_COUNT)])
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,58 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Millions of scalar updates - an int counter, a float gauge and a Decimal amount, each validated with a
+NumberDataValidator - in a GenericDataContainer (parameters passed to every store()) compared with a
+ScalarDataContainer (parameters bound once). Log output is disabled during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_scalars
+"""
+
+import logging
+from decimal import Decimal
+from benchmarks import timed, report
+from oculusd_utils.security.validation import NumberDataValidator
+from oculusd_utils.persistence import GenericDataContainer
+from oculusd_utils.persistence.scalars import ScalarDataContainer
+
+
+UPDATE_COUNT = 1000000
+DECIMAL_UPDATE_COUNT = 200000
+
+
+def update(container: GenericDataContainer, values: list, parameters: dict):
+    store = container.store
+    for value in values:
+        store(data=value, **parameters)
+
+
+def update_bound(container: ScalarDataContainer, values: list):
+    store = container.store
+    for value in values:
+        store(data=value)
+
+
+def run(label: str, data_type: object, values: list, parameters: dict):
+    generic = GenericDataContainer(result_set_name=label, data_type=data_type, data_validator=NumberDataValidator())
+    report('{}: GenericDataContainer'.format(label), len(values), timed(update, generic, values, parameters))
+    scalar = ScalarDataContainer(result_set_name=label, data_type=data_type, data_validator=NumberDataValidator(), validation_parameters=parameters)
+    report('{}: ScalarDataContainer'.format(label), len(values), timed(update_bound, scalar, values))
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    run('Counter (int)', int, list(range(UPDATE_COUNT)), {'min_value': 0})
+    run('Gauge (float)', float, [(i % 1000) / 10.0 for i in range(UPDATE_COUNT)], {'min_value': 0.0, 'max_value': 100.0})
+    run('Counter from text (str -> int)', int, [str(i) for i in range(UPDATE_COUNT)], {'min_value': 0})
+    run('Amount (Decimal)', Decimal, [Decimal(i) / 100 for i in range(DECIMAL_UPDATE_COUNT)], {'min_value': Decimal('0')})
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,74 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Peak memory and speed of a list GenericDataContainer compared with a SpillableListContainer, for records (pickled
+chunks) and for floats (mmap-backed chunks). Log output is disabled during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_spill
+"""
+
+import random
+import logging
+import tracemalloc
+from benchmarks import timed, report
+from oculusd_utils.persistence import GenericDataContainer
+from oculusd_utils.persistence.spill import SpillableListContainer
+
+
+ITEM_COUNT = 500000
+LOOKUP_COUNT = 10000
+
+
+def make_record(i: int)->dict:
+    return {'sequence': i, 'hostname': 'node-{}'.format(i % 50), 'value': i * 0.5}
+
+
+def fill(container: GenericDataContainer, numeric: bool)->GenericDataContainer:
+    for i in range(ITEM_COUNT):
+        container.store(data=i * 0.5 if numeric else make_record(i))
+    return container
+
+
+def peak_size(function, *args)->float:
+    tracemalloc.start()
+    result = function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak / 1024 / 1024
+
+
+def lookups(container: GenericDataContainer, indices: list):
+    data = container.data
+    for index in indices:
+        data[index]
+
+
+def run(label: str, numeric: bool, new_container):
+    report('{}: store()'.format(label), ITEM_COUNT, timed(fill, new_container(), numeric))
+    container = fill(new_container(), numeric)
+    sequential = list(range(0, ITEM_COUNT, ITEM_COUNT // LOOKUP_COUNT))
+    random_indices = [random.randrange(ITEM_COUNT) for i in range(LOOKUP_COUNT)]
+    report('{}: sequential index access'.format(label), len(sequential), timed(lookups, container, sequential))
+    report('{}: random index access'.format(label), LOOKUP_COUNT, timed(lookups, container, random_indices))
+    print('{}: peak memory {:.1f} MiB'.format(label, peak_size(fill, new_container(), numeric)))
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    random.seed(1)
+    run('Records in a list', False, lambda: GenericDataContainer(result_set_name='list', data_type=list))
+    run('Records in a SpillableListContainer', False, lambda: SpillableListContainer(result_set_name='spill', max_memory_items=50000))
+    run('Floats in a list', True, lambda: GenericDataContainer(result_set_name='list', data_type=list))
+    run('Floats in a SpillableListContainer', True, lambda: SpillableListContainer(result_set_name='spill', max_memory_items=50000, typecode='d'))
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,62 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Write throughput of SQLiteIO: one transaction per key compared with batched writes in a single transaction, and
+keyed reads compared with reading the complete result set. Log output is disabled during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_sqlite_io
+"""
+
+import os
+import logging
+import shutil
+import tempfile
+from benchmarks import timed, report
+from oculusd_utils.persistence import GenericDataContainer
+from oculusd_utils.persistence.sqlite_io import SQLiteIO
+
+
+SINGLE_WRITE_COUNT = 5000
+BATCH_WRITE_COUNT = 200000
+KEYED_READ_COUNT = 5000
+
+
+def single_writes(sqlite_io: SQLiteIO, count: int):
+    for i in range(count):
+        sqlite_io.put_item(key='key-{}'.format(i), value={'number': i, 'name': 'item {}'.format(i)}, result_set_name='single')
+
+
+def batched_write(sqlite_io: SQLiteIO, data: GenericDataContainer):
+    sqlite_io.write(data=data)
+
+
+def keyed_reads(sqlite_io: SQLiteIO, count: int):
+    for i in range(count):
+        sqlite_io.read_key(key='key-{}'.format(i * 37), result_set_name='batched')
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp()
+    try:
+        sqlite_io = SQLiteIO(db_path=os.path.join(directory, 'bench.db'))
+        data = GenericDataContainer(result_set_name='batched', data_type=dict)
+        data.data = {'key-{}'.format(i): {'number': i, 'name': 'item {}'.format(i)} for i in range(BATCH_WRITE_COUNT)}
+        report('Single writes (one transaction per key)', SINGLE_WRITE_COUNT, timed(single_writes, sqlite_io, SINGLE_WRITE_COUNT))
+        report('Batched write (executemany, one transaction)', BATCH_WRITE_COUNT, timed(batched_write, sqlite_io, data))
+        report('Keyed reads (read_key)', KEYED_READ_COUNT, timed(keyed_reads, sqlite_io, KEYED_READ_COUNT))
+        report('Full result set read (rows)', BATCH_WRITE_COUNT, timed(sqlite_io.read, result_set_name='batched'))
+        sqlite_io.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
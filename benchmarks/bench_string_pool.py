@@ -0,0 +1,60 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Memory and store() cost of a list container holding decoded JSON records with many repeated strings, with and
+without a StringPool. Log output is disabled during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_string_pool
+"""
+
+import json
+import logging
+import tracemalloc
+from benchmarks import timed, report
+from oculusd_utils.persistence import GenericDataContainer, StringPool
+
+
+RECORD_COUNT = 100000
+
+
+def make_lines()->list:
+    return [
+        json.dumps({'hostname': 'node-{:02d}.cluster.example.com'.format(i % 50), 'status': ('running', 'stopped', 'degraded')[i % 3], 'sequence': i})
+        for i in range(RECORD_COUNT)
+    ]
+
+
+def load(lines: list, string_pool: StringPool=None)->GenericDataContainer:
+    container = GenericDataContainer(result_set_name='records', data_type=list, string_pool=string_pool)
+    container.store_many(items=(json.loads(line) for line in lines))
+    return container
+
+
+def traced_size(lines: list, string_pool: StringPool=None)->float:
+    tracemalloc.start()
+    result = load(lines, string_pool)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size / 1024 / 1024
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    lines = make_lines()
+    report('store_many() of decoded records', RECORD_COUNT, timed(load, lines))
+    report('store_many() of decoded records, with a StringPool', RECORD_COUNT, timed(load, lines, StringPool()))
+    pool = StringPool()
+    print('Memory: without pool {:.1f} MiB, with pool {:.1f} MiB'.format(traced_size(lines), traced_size(lines, pool)))
+    print('Pool statistics: {}'.format(pool.statistics()))
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,67 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Compiled StringRules compared with validate_string() for its own rules, and compared with the same rich rules
+written as separate Python checks. Log output is disabled during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_string_rules
+"""
+
+import random
+import string
+import logging
+from benchmarks import timed, report
+from oculusd_utils.security.validation import validate_string, StringDataValidator
+from oculusd_utils.security.string_rules import StringRules, RuleStringDataValidator
+
+
+VALUE_COUNT = 200000
+ALLOWED = string.ascii_letters + string.digits + '-'
+PREFIXES = ('a', 'b', 'c', )
+FORBIDDEN = ('--', 'xx', )
+
+
+def make_values()->list:
+    random.seed(1)
+    return [''.join([random.choice(ALLOWED + ' _!') for _ in range(random.randint(0, 40))]) for _ in range(VALUE_COUNT)]
+
+
+def separate_checks(value: str)->bool:
+    if not validate_string(input_str=value, max_length=32):
+        return False
+    if not all([character in ALLOWED for character in value]):
+        return False
+    for substring in FORBIDDEN:
+        if substring in value:
+            return False
+    return value.startswith(PREFIXES)
+
+
+def run(function, values: list):
+    for value in values:
+        function(value)
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    values = make_values()
+    report('validate_string() (default rules)', VALUE_COUNT, timed(run, lambda value: validate_string(input_str=value), values))
+    report('StringRules.check() (default rules)', VALUE_COUNT, timed(run, StringRules().check, values))
+    report('StringDataValidator.validate() (default rules)', VALUE_COUNT, timed(run, StringDataValidator().validate, values))
+    report('RuleStringDataValidator.validate() (default rules)', VALUE_COUNT, timed(run, RuleStringDataValidator().validate, values))
+    rules = StringRules(max_length=32, allowed_characters=ALLOWED, prefixes=PREFIXES, forbidden_substrings=FORBIDDEN)
+    report('Rich rules as separate Python checks', VALUE_COUNT, timed(run, separate_checks, values))
+    report('Rich rules compiled (one regex)', VALUE_COUNT, timed(run, rules.check, values))
+    rules = StringRules(max_length=32, allowed_characters=ALLOWED, prefixes=PREFIXES)
+    report('Rich rules without forbidden substrings (C-level calls)', VALUE_COUNT, timed(run, rules.check, values))
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,75 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Memory and validation cost of tabular data: a list of dicts validated per field with StringDataValidator and
+NumberDataValidator, compared with a TableDataContainer validated per column. Log output is disabled during the
+measurements.
+
+::
+
+    $ python -m benchmarks.bench_table
+"""
+
+import logging
+import tracemalloc
+from benchmarks import timed, report
+from oculusd_utils.security.validation import StringDataValidator, NumberDataValidator
+from oculusd_utils.persistence.table import TableDataContainer
+
+
+ROW_COUNT = 200000
+SCHEMA = {
+    'name': (str, {'min_length': 1, 'max_length': 32}),
+    'age': (int, {'min_value': 0, 'max_value': 150}),
+    'score': (float, {'min_value': 0.0}),
+}
+
+
+def make_rows()->list:
+    return [{'name': 'Person{}'.format(i), 'age': i % 100, 'score': i * 0.5} for i in range(ROW_COUNT)]
+
+
+def validate_rows(rows: list):
+    string_validator = StringDataValidator()
+    number_validator = NumberDataValidator()
+    for row in rows:
+        for name, column_spec in SCHEMA.items():
+            validator = string_validator if column_spec[0] is str else number_validator
+            if not validator.validate(data=row[name], **column_spec[1]):
+                raise Exception('Validation failed')
+
+
+def load_table(rows: list)->TableDataContainer:
+    table = TableDataContainer(schema=SCHEMA)
+    table.extend(rows=rows)
+    return table
+
+
+def make_table()->TableDataContainer:
+    return load_table(make_rows())
+
+
+def traced_size(function, *args)->float:
+    tracemalloc.start()
+    result = function(*args)
+    size = tracemalloc.get_traced_memory()[0]   # Only what is still allocated, the rows of make_table() are freed
+    tracemalloc.stop()
+    del result
+    return size / 1024 / 1024
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    rows = make_rows()
+    report('List of dicts, validated per field', ROW_COUNT, timed(validate_rows, rows))
+    report('TableDataContainer.extend(), validated per column', ROW_COUNT, timed(load_table, rows))
+    print('Memory: list of dicts {:.1f} MiB, table {:.1f} MiB'.format(traced_size(make_rows), traced_size(make_table)))
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
@@ -0,0 +1,82 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Cold versus warm startup: reading many JSON files and storing their values in GenericDataContainer instances,
+compared with loading the stored containers from a WarmStartCache. Log output is disabled during the measurements.
+
+::
+
+    $ python -m benchmarks.bench_warm_start
+"""
+
+import os
+import json
+import logging
+import shutil
+import tempfile
+from benchmarks import timed, report
+from oculusd_utils.persistence import TextFileIO, GenericDataContainer
+from oculusd_utils.persistence.warm_cache import WarmStartCache
+
+
+FILE_COUNT = 2000
+KEYS_PER_FILE = 200
+
+
+def create_files(directory: str)->list:
+    file_names = list()
+    for i in range(FILE_COUNT):
+        file_name = 'file-{}.json'.format(i)
+        with open(os.path.join(directory, file_name), 'w') as f:
+            json.dump({'key-{}'.format(k): 'value {} of file {}'.format(k, i) for k in range(KEYS_PER_FILE)}, f)
+        file_names.append(file_name)
+    return file_names
+
+
+def parse(directory: str, file_name: str)->GenericDataContainer:
+    text = TextFileIO(file_folder_path=directory, file_name=file_name).read().data
+    data = GenericDataContainer(data_type=dict)
+    for key, value in json.loads(text).items():
+        data.store(data=value, key=key)
+    return data
+
+
+def cold_start(directory: str, file_names: list, cache: WarmStartCache=None):
+    for file_name in file_names:
+        data = parse(directory=directory, file_name=file_name)
+        if cache is not None:
+            cache.put_container(path=os.path.join(directory, file_name), data=data, parser='json')
+
+
+def warm_start(directory: str, file_names: list, db_path: str):
+    cache = WarmStartCache(db_path=db_path)
+    cache.warm_up()
+    for file_name in file_names:
+        data = cache.get_container(path=os.path.join(directory, file_name), parser='json')
+        if data is None:    # pragma: no cover
+            parse(directory=directory, file_name=file_name)
+    cache.close()
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp()
+    try:
+        file_names = create_files(directory=directory)
+        db_path = os.path.join(directory, 'warm.db')
+        report('Cold start (read + parse)', FILE_COUNT, timed(cold_start, directory, file_names))
+        cache = WarmStartCache(db_path=db_path)
+        report('Cold start, populating the warm start cache', FILE_COUNT, timed(cold_start, directory, file_names, cache))
+        cache.close()
+        report('Warm start (bulk load + validate)', FILE_COUNT, timed(warm_start, directory, file_names, db_path))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
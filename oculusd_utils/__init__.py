@@ -6,9 +6,8 @@
 
 import logging
 import os
-import traceback
-import inspect
-from datetime import datetime
+import sys
+import time
 
 
 DEBUG = os.getenv('DEBUG', None)
@@ -18,6 +17,9 @@ else:                   # pragma: no cover
     DEBUG = False       # pragma: no cover
 
 
+LAZY_SUBMODULES = ('persistence', 'security', )
+
+
 def get_logging_level():
     if DEBUG is True:           # pragma: no cover
         return logging.DEBUG    # pragma: no cover
@@ -28,32 +30,118 @@ def get_logging_level():
 logger = logging.getLogger(__name__)
 logger.setLevel(get_logging_level())
 
-# create console handler and set level to debug
-ch = logging.StreamHandler()
-ch.setLevel(get_logging_level())
-
 # create formatter
 formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 
-# add formatter to ch
-ch.setFormatter(formatter)
+# The console handler is only created and attached on first use of the default logger (see setup_default_handler())
+_default_handler = None
+
 
-# add ch to logger
-logger.addHandler(ch)
+def setup_default_handler()->logging.Handler:
+    """Create the console handler for the default logger and attach it, but only once.
+
+    Importing the package is therefore free of any handler side effects. OculusDLogger calls this function the first 
+    time it emits a message through (or changes the level of) the default logger.
+
+    :returns: logging.StreamHandler attached to the default logger
+    """
+    global _default_handler
+    if _default_handler is None:
+        # create console handler and set level to debug
+        handler = logging.StreamHandler()
+        handler.setLevel(get_logging_level())
+        # add formatter to ch
+        handler.setFormatter(formatter)
+        # add ch to logger
+        logger.addHandler(handler)
+        _default_handler = handler
+    return _default_handler
+
+
+def __getattr__(name: str):
+    """Module level lazy attributes (PEP 562)
+
+    * ``ch`` - the default console handler, created on first access
+    * ``persistence`` and ``security`` - the sub-packages, imported on first access
+    """
+    if name == 'ch':
+        return setup_default_handler()
+    if name in LAZY_SUBMODULES:
+        import importlib
+        return importlib.import_module('{}.{}'.format(__name__, name))
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
 
 
 def id_caller()->list:
     result = list()
     try:
-        caller_stack = inspect.stack()[2]
-        result.append(caller_stack[1].split(os.sep)[-1]) # File name
-        result.append(caller_stack[2]) # line number
-        result.append(caller_stack[3]) # function name
+        caller_frame = sys._getframe(2)
+        result.append(caller_frame.f_code.co_filename.split(os.sep)[-1]) # File name
+        result.append(caller_frame.f_lineno) # line number
+        result.append(caller_frame.f_code.co_name) # function name
     except: # pragma: no cover
         pass
     return result
 
 
+class LogRateLimit:
+    """Per call site rate limiting and deduplication of log messages
+
+    For every call site (source line) the first first_n messages are logged. After that, messages from that call site
+    are suppressed and counted, and at most one message per interval seconds is logged with a summary of the number 
+    of suppressed messages appended.
+
+    The counters are not protected by a lock. Under concurrent logging the counts may be slightly off, which is 
+    acceptable for this purpose and keeps the check cheap.
+    """
+
+    def __init__(self, first_n: int=10, interval: float=60.0, clock=time.monotonic):
+        """
+        :param first_n: int number of messages per call site that are always logged (default=10)
+        :param interval: float minimum number of seconds between summary messages per call site (default=60.0)
+        :param clock: callable returning a monotonic time in seconds (default=time.monotonic)
+        """
+        if first_n < 0 or interval < 0:
+            raise Exception('first_n and interval must not be negative')
+        self.first_n = first_n
+        self.interval = interval
+        self.clock = clock
+        self.call_sites = dict()
+
+    def check(self, frame)->int:
+        """Decide if a message from the call site must be logged
+
+        :param frame: the frame of the caller (for example sys._getframe(1))
+        :returns: None when the message must be suppressed, otherwise the number of messages suppressed since the last logged message of the call site
+        """
+        call_site = (frame.f_code, frame.f_lineno, )
+        state = self.call_sites.get(call_site)
+        if state is None:
+            # [logged, suppressed, last_logged_timestamp]
+            state = [0, 0, 0.0]
+            self.call_sites[call_site] = state
+        if state[0] < self.first_n:
+            state[0] = state[0] + 1
+            state[2] = self.clock()
+            return 0
+        now = self.clock()
+        if now - state[2] >= self.interval:
+            suppressed = state[1]
+            state[1] = 0
+            state[2] = now
+            return suppressed
+        state[1] = state[1] + 1
+        return None
+
+    def summary(self, message: str, suppressed: int)->str:
+        if suppressed > 0 and message is not None:
+            return '{} [{} similar messages suppressed]'.format(message, suppressed)
+        return message
+
+    def reset(self):
+        self.call_sites = dict()
+
+
 class OculusDLogger:
     """
     A Python log wrapper class to make things a little easier
@@ -89,9 +177,42 @@ class OculusDLogger:
         Remember that no matter how you set-up your custom logger, when enabling DEBUG mode, the abbreviated stack 
         information will be added to ALL messages regardless, just infrom of the actual message enclosed in square 
         brackets.
+
+        Structured (JSON) output, one JSON object per line, can be enabled with:
+
+            >>> app_logger.enable_structured_output(service='my-service')
+
+        In structured mode the stack information of DEBUG mode is written to separate "file", "line" and "func" 
+        fields instead of being added in front of the message.
+
+        Repeated messages from the same line of code can be rate limited per level (see LogRateLimit):
+
+            >>> app_logger.set_rate_limit(level=logging.WARNING, first_n=10, interval=60.0)
         """
         self.logger = logger_impl
         self.debug_flag = DEBUG
+        self.rate_limits = dict()
+
+    def set_rate_limit(self, level: int=logging.WARNING, first_n: int=10, interval: float=60.0)->LogRateLimit:
+        """Limit the number of messages per call site for a log level
+
+        :param level: int Python logging level - one of logging.DEBUG, logging.INFO, logging.WARNING or logging.ERROR (default=logging.WARNING)
+        :param first_n: int number of messages per call site that are always logged (default=10)
+        :param interval: float minimum number of seconds between summary messages per call site (default=60.0)
+        :returns: LogRateLimit
+        """
+        if level not in (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR):
+            raise Exception('Unsupported log level "{}"'.format(level))
+        rate_limit = LogRateLimit(first_n=first_n, interval=interval)
+        self.rate_limits[level] = rate_limit
+        return rate_limit
+
+    def remove_rate_limit(self, level: int=logging.WARNING):
+        self.rate_limits.pop(level, None)
+
+    def _ensure_handler(self):
+        if _default_handler is None and self.logger is logger:
+            setup_default_handler()
 
     def _format_msg(self, stack_data: list, message: str)->str:
         if message is not None:
@@ -107,42 +228,175 @@ class OculusDLogger:
             return message
         return 'NO_INPUT_MESSAGE'
 
+    def _extra(self, stack_data: list)->dict:
+        # The stack information is also passed as a record attribute - a JsonLogFormatter writes it to separate fields
+        # and removes it from the message, other formatters keep it in front of the message
+        if self.debug_flag is True and len(stack_data) == 3:
+            return {'oculusd_caller': stack_data}
+        return None
+
+    def enable_structured_output(self, service: str=None, static_fields: dict=None, include_host: bool=True):
+        """Switch all handlers of the logger to JSON output (see oculusd_utils.json_logging.JsonLogFormatter)
+
+        Only the handlers of this logger are switched. The DEBUG stack information is moved from the message to
+        separate fields by the formatter of each handler, so other loggers and handlers keep their text output.
+
+        :param service: str with the service name to add to every record (default=None, which omits the field)
+        :param static_fields: dict of additional fields added to every record
+        :param include_host: bool - add the host name to every record (default=True)
+        """
+        from oculusd_utils.json_logging import JsonLogFormatter
+        self._ensure_handler()
+        json_formatter = JsonLogFormatter(service=service, static_fields=static_fields, include_host=include_host)
+        for handler in self.logger.handlers:
+            handler.setFormatter(json_formatter)
+
+    def disable_structured_output(self):
+        """Switch all handlers of the logger back to the default text formatter
+        """
+        for handler in self.logger.handlers:
+            handler.setFormatter(formatter)
+
     def enable_debug(self):
+        self._ensure_handler()
         self.logger.setLevel(logging.DEBUG)
         for handler in self.logger.handlers:
             handler.setLevel(logging.DEBUG)
         self.debug_flag = True
 
     def disable_debug(self):
+        self._ensure_handler()
         self.logger.setLevel(logging.INFO)
         for handler in self.logger.handlers:
             handler.setLevel(logging.INFO)
         self.debug_flag = False
 
     def info(self, message: str, **kwargs):
-        message = self._format_msg(stack_data=id_caller(), message=message)
-        self.logger.info(message)
+        rate_limit = self.rate_limits.get(logging.INFO)
+        if rate_limit is not None:
+            suppressed = rate_limit.check(frame=sys._getframe(1))
+            if suppressed is None:
+                return
+            message = rate_limit.summary(message=message, suppressed=suppressed)
+        self._ensure_handler()
+        stack_data = id_caller()
+        self.logger.info(self._format_msg(stack_data=stack_data, message=message), extra=self._extra(stack_data=stack_data))
 
     def debug(self, message: str, **kwargs):
         if self.debug_flag is True:
-            message = self._format_msg(stack_data=id_caller(), message=message)
-            self.logger.debug(message)
+            rate_limit = self.rate_limits.get(logging.DEBUG)
+            if rate_limit is not None:
+                suppressed = rate_limit.check(frame=sys._getframe(1))
+                if suppressed is None:
+                    return
+                message = rate_limit.summary(message=message, suppressed=suppressed)
+            self._ensure_handler()
+            stack_data = id_caller()
+            self.logger.debug(self._format_msg(stack_data=stack_data, message=message), extra=self._extra(stack_data=stack_data))
 
     def warning(self, message: str, **kwargs):
-        message = self._format_msg(stack_data=id_caller(), message=message)
-        self.logger.warning(message)
+        rate_limit = self.rate_limits.get(logging.WARNING)
+        if rate_limit is not None:
+            suppressed = rate_limit.check(frame=sys._getframe(1))
+            if suppressed is None:
+                return
+            message = rate_limit.summary(message=message, suppressed=suppressed)
+        self._ensure_handler()
+        stack_data = id_caller()
+        self.logger.warning(self._format_msg(stack_data=stack_data, message=message), extra=self._extra(stack_data=stack_data))
     
     def error(self, message: str, **kwargs):
-        message = self._format_msg(stack_data=id_caller(), message=message)
-        self.logger.error(message)
+        rate_limit = self.rate_limits.get(logging.ERROR)
+        if rate_limit is not None:
+            suppressed = rate_limit.check(frame=sys._getframe(1))
+            if suppressed is None:
+                return
+            message = rate_limit.summary(message=message, suppressed=suppressed)
+        self._ensure_handler()
+        stack_data = id_caller()
+        self.logger.error(self._format_msg(stack_data=stack_data, message=message), extra=self._extra(stack_data=stack_data))
 
 
 def get_utc_timestamp(with_decimal: bool=False):
-    epoch = datetime(1970,1,1,0,0,0)
-    now = datetime.utcnow()
-    timestamp = (now - epoch).total_seconds()
+    """Seconds since the Unix epoch (UTC)
+
+    :param with_decimal: bool - if True, return a float with the sub-second part, otherwise an int (default=False)
+    """
     if with_decimal:
-        return timestamp
-    return int(timestamp)
+        return time.time()
+    return int(time.time())
+
+
+def get_monotonic_timestamp()->float:
+    """Seconds from a monotonic clock
+
+    Only useful to measure elapsed time (ages, TTL's, timeouts) - the value is not related to the wall clock and will 
+    therefore not jump when the system time is changed.
+    """
+    return time.monotonic()
+
+
+class CoarseClock:
+    """A cheap clock with a fixed resolution, updated by a background thread
+
+    Reading the cached value is only an attribute lookup, which makes it useful for very hot TTL checks where a 
+    resolution of the tick interval is acceptable. Until start() is called (or after stop() was called) the real 
+    clocks are read instead.
+
+    Example:
+
+        >>> clock = CoarseClock(resolution=0.1)
+        >>> clock.start()
+        >>> tfio = TextFileIO(file_folder_path='.', file_name='data.txt', enable_cache=True, clock=clock.monotonic)
+    """
+
+    def __init__(self, resolution: float=0.1):
+        """
+        :param resolution: float number of seconds between updates of the cached time values (default=0.1)
+        """
+        if resolution <= 0:
+            raise Exception('The resolution must be a positive number of seconds')
+        self.resolution = resolution
+        self.utc_now = time.time()
+        self.monotonic_now = time.monotonic()
+        self._thread = None
+        self._stop_event = None
+
+    def _tick(self):
+        while not self._stop_event.wait(self.resolution):
+            self.utc_now = time.time()
+            self.monotonic_now = time.monotonic()
+
+    def start(self):
+        if self._thread is None:
+            import threading
+            self.utc_now = time.time()
+            self.monotonic_now = time.monotonic()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._tick, name='CoarseClock', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self)->bool:
+        return self._thread is not None
+
+    def utc_timestamp(self, with_decimal: bool=False):
+        """Same output semantics as get_utc_timestamp()
+        """
+        if self._thread is None:
+            return get_utc_timestamp(with_decimal=with_decimal)
+        if with_decimal:
+            return self.utc_now
+        return int(self.utc_now)
+
+    def monotonic(self)->float:
+        if self._thread is None:
+            return time.monotonic()
+        return self.monotonic_now
 
 # EOF
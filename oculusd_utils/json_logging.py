@@ -0,0 +1,101 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Structured log output: one JSON object per log record
+
+The formatter builds each line directly from string fragments instead of filling a dict and calling json.dumps():
+
+* static fields (service, host and any custom fields) are encoded once, when the formatter is created
+* the date/time part of the timestamp is formatted once per second and only the milliseconds are added per record
+* level and logger names are encoded once and then looked up
+* strings are escaped with the C accelerated encoder of the json module
+
+Example output line:
+
+    {"ts":"2018-12-26T11:48:35.060Z","level":"INFO","logger":"oculusd_utils","msg":"TEST","service":"api","host":"node1"}
+
+When DEBUG mode is enabled on an OculusDLogger, the caller details are added as the fields "file", "line" and "func",
+and removed from the front of the message.
+"""
+
+import json
+import logging
+import socket
+import time
+
+
+encode_string = json.encoder.encode_basestring_ascii
+
+
+class JsonLogFormatter(logging.Formatter):
+
+    def __init__(self, service: str=None, static_fields: dict=None, include_host: bool=True):
+        """
+        :param service: str with the service name to add to every record (default=None, which omits the field)
+        :param static_fields: dict of additional fields added to every record. Values must be JSON serialisable
+        :param include_host: bool - add the host name to every record (default=True)
+        """
+        super().__init__()
+        fields = dict()
+        if service is not None:
+            fields['service'] = service
+        if include_host is True:
+            fields['host'] = socket.gethostname()
+        if static_fields is not None:
+            fields.update(static_fields)
+        encoded_fields = list()
+        for key, value in fields.items():
+            encoded_fields.append(',{}:{}'.format(encode_string('{}'.format(key)), json.dumps(value, separators=(',', ':'))))
+        self.static_fields = ''.join(encoded_fields)
+        self._cached_time = (None, '', )    # (second, encoded date and time) - replaced as a whole, so threads never see half of an update
+        self._encoded_names = dict()
+
+    def _encode_name(self, name: str)->str:
+        encoded_name = self._encoded_names.get(name)
+        if encoded_name is None:
+            encoded_name = encode_string(name)
+            self._encoded_names[name] = encoded_name
+        return encoded_name
+
+    def format_timestamp(self, created: float, msecs: float)->str:
+        """Returns the encoded timestamp (ISO 8601, UTC, millisecond resolution) including the quotes
+        """
+        second = int(created)
+        cached_time = self._cached_time
+        if second != cached_time[0]:
+            cached_time = (second, '"{}'.format(time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))), )
+            self._cached_time = cached_time
+        return '{}.{:03d}Z"'.format(cached_time[1], int(msecs))
+
+    def format(self, record: logging.LogRecord)->str:
+        message = record.getMessage()
+        caller = getattr(record, 'oculusd_caller', None)
+        if caller is not None:
+            prefix = '[{}:{}:{}] '.format(caller[0], caller[1], caller[2])
+            if message.startswith(prefix):
+                message = message[len(prefix):]
+        parts = [
+            '{"ts":', self.format_timestamp(created=record.created, msecs=record.msecs),
+            ',"level":', self._encode_name(record.levelname),
+            ',"logger":', self._encode_name(record.name),
+            ',"msg":', encode_string(message),
+        ]
+        if caller is not None:
+            parts.extend((
+                ',"file":', encode_string('{}'.format(caller[0])),
+                ',"line":', '{:d}'.format(caller[1]),
+                ',"func":', encode_string('{}'.format(caller[2])),
+            ))
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            parts.extend((',"exc":', encode_string(record.exc_text)))
+        parts.append(self.static_fields)
+        parts.append('}')
+        return ''.join(parts)
+
+# EOF
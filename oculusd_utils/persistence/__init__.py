@@ -4,26 +4,336 @@
 # LICENSE.txt. If this is not the case, you can view the license online at
 # https://www.gnu.org/licenses/lgpl-3.0.txt
 
-from oculusd_utils import OculusDLogger, get_utc_timestamp
+from oculusd_utils import OculusDLogger, get_monotonic_timestamp
 from oculusd_utils.security.validation import DataValidator, StringDataValidator, NumberDataValidator
-import pathlib
 import os
-import json
+import sys
+import logging
+import threading
+import weakref
+from collections import OrderedDict
 from decimal import Decimal
 
 
+# Per call site limits for the module logger - bulk stores and cache hits would otherwise log one line per item
+LOG_RATE_LIMIT_FIRST_N = 100
+LOG_RATE_LIMIT_INTERVAL = 60.0
+
+
+# The data types supported by GenericDataContainer, by name
+DATA_TYPES = {
+    'str': str,
+    'list': list,
+    'tuple': tuple,
+    'int': int,
+    'float': float,
+    'Decimal': Decimal,
+    'dict': dict,
+}
+
+
+# The types of which deep_size() also measures the items
+NESTED_TYPES = frozenset((dict, list, tuple, set, frozenset, ))
+
+
 L = OculusDLogger()
+L.set_rate_limit(level=logging.INFO, first_n=LOG_RATE_LIMIT_FIRST_N, interval=LOG_RATE_LIMIT_INTERVAL)
+L.set_rate_limit(level=logging.WARNING, first_n=LOG_RATE_LIMIT_FIRST_N, interval=LOG_RATE_LIMIT_INTERVAL)
+
+
+def get_home()->str:
+    """Resolve the user home directory (with a trailing path separator)
+
+    The value is only computed on first use and is then also available as the module attribute HOME
+    """
+    home = globals().get('HOME')
+    if home is None:
+        import pathlib
+        home = '{}{}'.format(str(pathlib.Path.home()), os.sep)
+        L.debug('HOME={}'.format(home))
+        globals()['HOME'] = home
+    return home
+
+
+def __getattr__(name: str):
+    if name == 'HOME':
+        return get_home()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+class StringPool:
+    """Deduplicates equal strings, so containers with many repeated values (host names, statuses, dict keys) keep only
+    one object per distinct string
+
+    The pool keeps its own table of up to max_size strings, and forgets the least recently used string when it is
+    full. sys.intern() is not used: its table is never trimmed, and on CPython 3.12 and later interned strings are never
+    freed. Pooled strings stay alive while they are in the table, so max_size bounds the memory the pool itself holds.
+    Only strings of up to max_length characters are pooled.
+    """
+
+    def __init__(self, max_length: int=256, max_size: int=100000):
+        """
+        :param max_length: int longest string to pool - longer strings are rarely repeated (default=256)
+        :param max_size: int number of distinct strings kept in the pool (default=100000)
+        """
+        if max_size < 1:
+            raise Exception('max_size must be at least 1')
+        self.max_length = max_length
+        self.max_size = max_size
+        self.lookups = 0
+        self.deduplicated = 0
+        self.replaced_bytes = 0
+        self.evicted = 0
+        self._table = OrderedDict()     # str -> the same str, in least recently used order
+        self._lock = threading.Lock()
+
+    def __len__(self)->int:
+        return len(self._table)
+
+    def intern(self, value: str)->str:
+        """:returns: str the pooled string equal to value (value itself when it is the first one, or when it is not pooled)
+        """
+        if type(value) is not str or len(value) > self.max_length:
+            return value
+        with self._lock:
+            self.lookups += 1
+            table = self._table
+            pooled = table.get(value)
+            if pooled is None:
+                table[value] = value
+                if len(table) > self.max_size:
+                    table.popitem(last=False)
+                    self.evicted += 1
+                return value
+            table.move_to_end(value)
+            if pooled is not value:
+                self.deduplicated += 1
+                self.replaced_bytes += sys.getsizeof(value)
+        return pooled
+
+    def deduplicate(self, value: object)->object:
+        """Pool a string, or the strings (and dict keys) in a dict, list or tuple - including nested ones. Dicts and
+        tuples are rebuilt, lists are changed in place.
+        """
+        value_type = type(value)
+        if value_type is str:
+            return self.intern(value)
+        if value_type is dict:
+            return {self.intern(key) if type(key) is str else key: self.deduplicate(item) for key, item in value.items()}
+        if value_type is list:
+            for index, item in enumerate(value):
+                value[index] = self.deduplicate(item)
+            return value
+        if value_type is tuple:
+            return tuple([self.deduplicate(item) for item in value])
+        return value
+
+    def statistics(self)->dict:
+        """The replaced bytes are the size of the duplicates that were replaced by a pooled string. This is an upper
+        bound of the memory saved: a duplicate is only freed when nothing else refers to it, and the same duplicate
+        can be replaced more than once.
+
+        :returns: dict with the number of strings looked up, the number of duplicates replaced by a pooled string, the bytes those duplicates used, and the number of strings in and evicted from the pool
+        """
+        return {
+            'lookups': self.lookups,
+            'deduplicated': self.deduplicated,
+            'replaced_bytes': self.replaced_bytes,
+            'size': len(self._table),
+            'evicted': self.evicted,
+        }
 
 
-HOME = '{}{}'.format(str(pathlib.Path.home()), os.sep)
-L.debug('HOME={}'.format(HOME))
+def parse_int(data: str)->int:
+    """Integer strings are parsed exactly, also when they are too large for a float - other numbers (like "1.5" or
+    "1e3") are parsed as a float first, and truncated
+    """
+    try:
+        return int(data)
+    except ValueError:
+        return int(float(data))
+
+
+def deep_size(value: object, getsizeof=sys.getsizeof)->int:
+    """Approximate number of bytes used by a value, including the keys and items of (nested) dicts, lists, tuples and
+    sets. Objects shared by several items are counted every time, and the values must not contain reference cycles.
+    """
+    size = getsizeof(value)
+    value_type = type(value)
+    if value_type is dict:
+        for key, item in value.items():
+            size += deep_size(key) if type(key) in NESTED_TYPES else getsizeof(key)
+            size += deep_size(item) if type(item) in NESTED_TYPES else getsizeof(item)
+    elif value_type in NESTED_TYPES:
+        for item in value:
+            size += deep_size(item) if type(item) in NESTED_TYPES else getsizeof(item)
+    return size
+
+
+class MemoryBudget:
+    """Accounting of the memory held by containers and caches, with an optional limit for all of them together
+
+    Containers and caches given a memory_budget register with it and report every change of their size. When the total
+    goes over the limit, release_memory() is called on the registered owners, largest first, until the total is back
+    under the limit. Caches drop their data, containers that can spill to disk do so - other containers release nothing.
+    Owners are only weakly referenced, and are forgotten when they are garbage collected.
+
+    When nothing more can be released, the budget stays over its limit. It then waits until the total grew by
+    retry_growth of the limit, or until a new owner registers, before it tries again - so that every store() does not
+    sort the owners and log a warning.
+
+    MEMORY_BUDGET is the process-wide instance:
+
+        >>> MEMORY_BUDGET.limit = 512 * 1024 * 1024
+        >>> data = GenericDataContainer(result_set_name='events', data_type=list, memory_budget=MEMORY_BUDGET)
+        >>> MEMORY_BUDGET.usage()
+        {'events': 64}
+    """
+
+    def __init__(self, limit: int=None, retry_growth: float=0.05, logger=L):
+        """
+        :param limit: int number of bytes (default=None, which only accounts)
+        :param retry_growth: float fraction of the limit by which the total must grow before releasing is tried again, after nothing more could be released (default=0.05)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        self.limit = limit
+        self.retry_growth = retry_growth
+        self.logger = logger
+        self.total = 0
+        self.release_count = 0
+        self.enforce_count = 0
+        self._owners = dict()       # id(owner) -> [weak reference, name, size]
+        self._lock = threading.RLock()
+        self._releasing = False
+        self._retry_at = None       # Total from which enforce() runs again, after it could not get within the limit
+
+    def register(self, owner: object, name: str, size: int=0):
+        """
+        :param owner: object that reports its size with update() or set_size(), and optionally implements release_memory()->int
+        :param name: str reported by usage(), for example the result_set_name of a container
+        :param size: int current size in bytes (default=0)
+        """
+        key = id(owner)
+
+        def forget(reference):
+            self._forget(key=key, reference=reference)
+
+        with self._lock:
+            self._forget(key=key)
+            self._owners[key] = [weakref.ref(owner, forget), name, 0]
+            if getattr(owner, 'release_memory', None) is not None:
+                self._retry_at = None
+        self.update(owner=owner, delta=size)
+
+    def _forget(self, key: int, reference: object=None):
+        with self._lock:
+            entry = self._owners.get(key)
+            if entry is not None and (reference is None or entry[0] is reference):
+                del self._owners[key]
+                self.total -= entry[2]
+
+    def unregister(self, owner: object):
+        self._forget(key=id(owner))
+
+    def update(self, owner: object, delta: int):
+        """Add delta (which may be negative) to the size of a registered owner
+        """
+        with self._lock:
+            entry = self._owners.get(id(owner))
+            if entry is None:
+                return
+            entry[2] += delta
+            self.total += delta
+        if self.limit is not None and self.total > self.limit:
+            if self._retry_at is None or self.total >= self._retry_at:
+                self.enforce()
+        elif self._retry_at is not None:
+            self._retry_at = None
+
+    def set_size(self, owner: object, size: int):
+        with self._lock:
+            entry = self._owners.get(id(owner))
+            if entry is None:
+                return
+            delta = size - entry[2]
+        self.update(owner=owner, delta=delta)
+
+    def size_of(self, owner: object)->int:
+        entry = self._owners.get(id(owner))
+        if entry is None:
+            return 0
+        return entry[2]
+
+    def usage(self)->dict:
+        """:returns: dict with the bytes in use per name - owners registered with the same name are added up
+        """
+        result = dict()
+        with self._lock:
+            for reference, name, size in self._owners.values():
+                result[name] = result.get(name, 0) + size
+        return result
+
+    def enforce(self)->int:
+        """Call release_memory() on the owners, largest first, until the total is within the limit
+
+        :returns: int number of bytes released
+        """
+        if self.limit is None or self._releasing is True:
+            return 0
+        self._releasing = True
+        self.enforce_count += 1
+        released = 0
+        try:
+            with self._lock:
+                candidates = sorted([tuple(entry) for entry in self._owners.values()], key=lambda entry: entry[2], reverse=True)
+            for reference, name, size in candidates:
+                if self.total <= self.limit:
+                    break
+                owner = reference()
+                release_memory = getattr(owner, 'release_memory', None)
+                if size <= 0 or release_memory is None:
+                    continue
+                freed = release_memory()
+                if freed > 0:
+                    released += freed
+                    self.release_count += 1
+                    self.logger.info('Memory budget: released {} bytes of "{}"'.format(freed, name))
+            if self.total > self.limit:
+                self._retry_at = self.total + max(int(self.limit * self.retry_growth), 1)
+                self.logger.warning('Memory budget exceeded - {} bytes in use with a limit of {} bytes, and nothing left to release'.format(self.total, self.limit))
+            else:
+                self._retry_at = None
+        finally:
+            self._releasing = False
+        return released
+
+
+MEMORY_BUDGET = MemoryBudget()
 
 
 class GenericDataContainer:
     """A data container for storing some common Python types with some basic validation capabilities
     """
 
-    def __init__(self, result_set_name: str='anonymous', data_type: object=str, data_validator: DataValidator=None, logger=L):
+    def __init__(
+        self,
+        result_set_name: str='anonymous',
+        data_type: object=str,
+        data_validator: DataValidator=None,
+        logger=L,
+        string_pool: StringPool=None,
+        memory_budget: MemoryBudget=None
+    ):
+        """
+        :param result_set_name: str (default='anonymous')
+        :param data_type: one of str, list, tuple, int, float, Decimal or dict (default=str)
+        :param data_validator: DataValidator (default=None)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        :param string_pool: StringPool used by store() to deduplicate the strings in list items, dict keys and dict values (default=None)
+        :param memory_budget: MemoryBudget to which store() reports the size of the data, for example MEMORY_BUDGET (default=None, which disables the accounting)
+        """
+        self.memory_size = None
+        self.string_pool = string_pool
         self.data = None
         self.data_type = data_type
         if data_type.__name__ == 'str':
@@ -57,6 +367,68 @@ class GenericDataContainer:
         logger.info('GenericDataContainer "{}" ready'.format(result_set_name))
         self.logger = logger
         self.result_set_name = result_set_name
+        self.memory_budget = memory_budget
+        if memory_budget is not None:
+            self.memory_size = self._data_size()
+            memory_budget.register(owner=self, name=result_set_name, size=self.memory_size)
+
+    @property
+    def data(self)->object:
+        return self._data
+
+    @data.setter
+    def data(self, value: object):
+        # Assigning the data directly is accounted as well - the new data is measured once
+        self._data = value
+        if self.memory_size is not None:
+            self._resize(size=self._data_size())
+
+    def _data_size(self)->int:
+        return deep_size(self.data)
+
+    def _resize(self, size: int):
+        delta = size - self.memory_size
+        self.memory_size = size
+        self.memory_budget.update(owner=self, delta=delta)
+
+    def memory_usage(self)->int:
+        """:returns: int approximate number of bytes used by the data - tracked by store() when a memory_budget is set, computed otherwise
+        """
+        if self.memory_size is not None:
+            return self.memory_size
+        return self._data_size()
+
+    def release_memory(self)->int:
+        """Called by the MemoryBudget when it is over its limit. The data of a GenericDataContainer is never dropped.
+
+        :returns: int number of bytes released
+        """
+        return 0
+
+    def _store_tracked(self, data: object, key: object=None, **kwarg)->int:
+        """store() with memory accounting: only the size of the stored value (and of the growth of the dict or list)
+        is added, the rest of the data is not measured again
+        """
+        data_type_name = self.data_type.__name__
+        if data_type_name == 'dict':
+            container_size = sys.getsizeof(self.data)
+            replaced_size = deep_size(self.data[key]) if key in self.data else None
+            result = self._store(data=data, key=key, **kwarg)
+            delta = sys.getsizeof(self.data) - container_size + deep_size(self.data[key])
+            if replaced_size is None:
+                delta += deep_size(key)
+            else:
+                delta -= replaced_size
+        elif data_type_name == 'list':
+            container_size = sys.getsizeof(self.data)
+            result = self._store(data=data, key=key, **kwarg)
+            delta = sys.getsizeof(self.data) - container_size + deep_size(self.data[-1])
+        else:
+            # The other data types are replaced on every store(), which the data setter accounts for
+            return self._store(data=data, key=key, **kwarg)
+        self.memory_size += delta
+        self.memory_budget.update(owner=self, delta=delta)
+        return result
 
     def _store_dict(self, data: object, key: object, **kwarg)->int:
         if key is None:
@@ -73,6 +445,9 @@ class GenericDataContainer:
                 self.logger.warning('No DataValidator set - Dictionary value for key "{}" stored without validation! [2]'.format(key)) # pragma: no cover
         else:
             self.logger.warning('No DataValidator set - Dictionary value for key "{}" stored without validation! [1]'.format(key))
+        if self.string_pool is not None:
+            key = self.string_pool.deduplicate(key)
+            data = self.string_pool.deduplicate(data)
         self.data[key] = data
         return len(self.data)
 
@@ -100,6 +475,8 @@ class GenericDataContainer:
                 self.logger.debug('Validation for value passed. New list size: {}'.format(len(self.data)+1))
         else:
             self.logger.warning('No DataValidator set - List value stored without validation! [2]. New list size: {}'.format(len(self.data)+1))
+        if self.string_pool is not None:
+            data = self.string_pool.deduplicate(data)
         self.data.append(data)
         return len(self.data)
 
@@ -130,7 +507,7 @@ class GenericDataContainer:
             raise Exception('Expecting a int, float or str but got "{}"'.format(type(data).__name__))
         tmp_value = None
         if isinstance(data, str):
-            tmp_value = int(float(data))
+            tmp_value = parse_int(data)
         elif isinstance(data, float):
             tmp_value = int(data)
         elif isinstance(data, int):
@@ -177,6 +554,11 @@ class GenericDataContainer:
         return 1
 
     def store(self, data: object, key: object=None, **kwarg)->int:
+        if self.memory_budget is not None:
+            return self._store_tracked(data=data, key=key, **kwarg)
+        return self._store(data=data, key=key, **kwarg)
+
+    def _store(self, data: object, key: object=None, **kwarg)->int:
         if self.data_type.__name__ == 'dict':
             return self._store_dict(data=data, key=key, **kwarg)
         elif self.data_type.__name__ == 'str':
@@ -192,6 +574,23 @@ class GenericDataContainer:
         elif self.data_type.__name__ == 'Decimal':
             return self._store_decimal(data=data, key=key, **kwarg)
 
+    def store_many(self, items: object, **kwarg)->int:
+        """Store many values, one store() at a time
+
+        :param items: dict of key -> value for dict containers, or an iterable of values for list containers
+        :returns: int the result of the last store() (the container size for list and dict containers)
+        """
+        result = len(self.data) if self.data_type.__name__ in ('dict', 'list') else 0
+        if self.data_type.__name__ == 'dict':
+            for key, value in items.items():
+                result = self.store(data=value, key=key, **kwarg)
+        elif self.data_type.__name__ == 'list':
+            for value in items:
+                result = self.store(data=value, **kwarg)
+        else:
+            raise Exception('store_many() is only supported for the dict and list data types')
+        return result
+
 
 class GenericIOProcessor:
     """A processing Abstract Base Class that can be used to process data post reading/writing
@@ -259,11 +658,141 @@ class GenericIOProcessor:
         raise Exception('Not yet implemented')
 
 
+# Listing a directory with os.scandir() costs about as much as 2 stat() calls, plus one stat() call for every 3 entries
+# (measured on Linux). Listing pays off from MIN_PATHS_FOR_SCANDIR paths in a small directory, and from
+# SCANDIR_PATHS_PER_ENTRY paths per directory entry in a larger one.
+MIN_PATHS_FOR_SCANDIR = 4
+SCANDIR_PATHS_PER_ENTRY = 0.35
+
+
 class ValidateFileExistIOProcessor(GenericIOProcessor):
     """The TestFileExistIOProcessor should be used in cases where the existance of a file should be tested for
+
+    Many paths can be validated at once with process_bulk(), which lists a directory once with os.scandir() instead
+    of calling stat() per path when enough of its entries are tested. The number of entries of every listed directory
+    is remembered, so a large directory is only listed again when that is cheaper than testing the paths one by one.
+    Results can optionally be cached for a short time (cache_ttl).
     """
-    def __init__(self, logger=L):
+    def __init__(
+        self,
+        logger=L,
+        cache_ttl: float=0.0,
+        negative_cache_ttl: float=None,
+        max_cache_entries: int=100000,
+        min_paths_for_scandir: int=MIN_PATHS_FOR_SCANDIR,
+        clock=get_monotonic_timestamp
+    ):
+        """
+        :param logger: OculusDLogger (default=OculusDLogger())
+        :param cache_ttl: float number of seconds an existing file is remembered (default=0.0, which disables the cache)
+        :param negative_cache_ttl: float number of seconds a missing file is remembered (default=None, which means the same as cache_ttl)
+        :param max_cache_entries: int maximum number of cached results (default=100000)
+        :param min_paths_for_scandir: int number of paths in the same directory from which process_bulk() lists the directory instead of testing each path - for directories listed before, at least SCANDIR_PATHS_PER_ENTRY paths per entry are needed as well (default=MIN_PATHS_FOR_SCANDIR)
+        :param clock: callable returning a monotonic time in seconds (default=get_monotonic_timestamp)
+        """
         super().__init__(logger=logger)
+        self.cache_ttl = cache_ttl
+        self.negative_cache_ttl = negative_cache_ttl
+        if negative_cache_ttl is None:
+            self.negative_cache_ttl = cache_ttl
+        self.max_cache_entries = max_cache_entries
+        self.min_paths_for_scandir = min_paths_for_scandir
+        self.clock = clock
+        self.existence_cache = dict()   # path -> (exists, expires_at)
+        self.directory_sizes = dict()   # directory -> number of entries when it was last listed
+
+    def _cache_get(self, path: str, now: float)->bool:
+        cached = self.existence_cache.get(path)
+        if cached is not None:
+            if now < cached[1]:
+                return cached[0]
+            del self.existence_cache[path]
+        return None
+
+    def _cache_put(self, path: str, exists: bool, now: float):
+        ttl = self.cache_ttl if exists else self.negative_cache_ttl
+        if ttl <= 0:
+            return
+        if len(self.existence_cache) >= self.max_cache_entries:
+            self.existence_cache = {key: value for key, value in self.existence_cache.items() if now < value[1]}
+            if len(self.existence_cache) >= self.max_cache_entries:
+                self.existence_cache = dict()
+        self.existence_cache[path] = (exists, now + ttl, )
+
+    def clear_cache(self):
+        self.existence_cache = dict()
+
+    def is_file(self, path: str)->bool:
+        """Same as os.path.isfile(), but using the existence cache when enabled
+        """
+        now = self.clock()
+        exists = self._cache_get(path=path, now=now)
+        if exists is None:
+            exists = os.path.isfile(path)
+            self._cache_put(path=path, exists=exists, now=now)
+        return exists
+
+    def _list_files(self, directory: str)->set:
+        """Returns the set of names of the files in the directory, or None if the directory could not be listed
+        """
+        file_names = set()
+        entry_count = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    entry_count += 1
+                    if entry.is_file():
+                        file_names.add(entry.name)
+        except FileNotFoundError:
+            return set()
+        except OSError:
+            return None
+        if len(self.directory_sizes) >= self.max_cache_entries:
+            self.directory_sizes = dict()
+        self.directory_sizes[directory] = entry_count
+        return file_names
+
+    def _use_listing(self, directory: str, path_count: int)->bool:
+        if path_count < self.min_paths_for_scandir:
+            return False
+        entry_count = self.directory_sizes.get(directory)
+        return entry_count is None or path_count >= entry_count * SCANDIR_PATHS_PER_ENTRY
+
+    def files_exist(self, paths: list)->dict:
+        """Test the existence of many files, listing every directory at most once
+
+        Note that, unlike os.path.isfile(), names found through a directory listing are compared case sensitive, 
+        also on case insensitive file systems.
+
+        :param paths: list of str file paths
+        :returns: dict with each path as key and a bool indicating if the file exists as value
+        """
+        now = self.clock()
+        result = dict()
+        directories = dict()    # directory -> list of (path, file name)
+        for path in paths:
+            if path in result:
+                continue
+            exists = self._cache_get(path=path, now=now)
+            if exists is not None:
+                result[path] = exists
+                continue
+            directory, file_name = os.path.split(os.path.normpath(path))
+            if directory == '':
+                directory = '.'
+            directories.setdefault(directory, list()).append((path, file_name, ))
+        for directory, directory_paths in directories.items():
+            file_names = None
+            if self._use_listing(directory=directory, path_count=len(directory_paths)):
+                file_names = self._list_files(directory=directory)
+            for path, file_name in directory_paths:
+                if file_names is not None:
+                    exists = file_name in file_names
+                else:
+                    exists = os.path.isfile(path)
+                result[path] = exists
+                self._cache_put(path=path, exists=exists, now=now)
+        return result
 
     def process(self, data: GenericDataContainer, **kwarg):
         """This method will take the text string stored in the data container and assume that is a file path
@@ -280,11 +809,30 @@ class ValidateFileExistIOProcessor(GenericIOProcessor):
         if not data.data_type.__name__ == 'str':
             self.logger.error('Cannot validate file - invalid data type. Expected a GenericDataContainer storing a string value')
             raise Exception('Expected a string in GenericDataContainer')
-        if not os.path.isfile(data.data):
+        if not self.is_file(data.data):
             self.logger.error('File "{}" does not seem to exists'.format(data.data))
             raise Exception('File not found')
         self.logger.info('File "{}" exists'.format(data.data))
 
+    def process_bulk(self, data: GenericDataContainer, **kwarg)->dict:
+        """Bulk version of process(): validate all file paths stored in a list or tuple GenericDataContainer
+
+        No exception is raised for missing files - inspect the result instead. One summary line is logged.
+
+        :param data: GenericDataContainer storing a list or tuple of file paths
+        :returns: dict with each path as key and a bool indicating if the file exists as value
+        """
+        if not isinstance(data, GenericDataContainer):
+            self.logger.error('Cannot validate files - invalid data type. Expected a GenericDataContainer')
+            raise Exception('Expected a GenericDataContainer')
+        if data.data_type.__name__ not in ('list', 'tuple'):
+            self.logger.error('Cannot validate files - invalid data type. Expected a GenericDataContainer storing a list or tuple')
+            raise Exception('Expected a list or tuple in GenericDataContainer')
+        result = self.files_exist(paths=data.data)
+        missing_qty = len([exists for exists in result.values() if exists is False])
+        self.logger.info('Validated {} file paths - {} missing'.format(len(result), missing_qty))
+        return result
+
 
 class GenericIO:
 
@@ -299,6 +847,25 @@ class GenericIO:
         raise Exception('Not yet implemented')
 
 
+class CacheBackend:
+    """Base class for caches of file text that live outside of the TextFileIO instance (for example shared between 
+    processes). See oculusd_utils.persistence.shared_cache.SharedMemoryCache
+    """
+
+    def get_text(self, key: str, max_age: float=None)->str:
+        """:returns: str with the cached text, or None if there is no (fresh enough) entry for the key
+        """
+        raise Exception('Not yet implemented')
+
+    def put_text(self, key: str, text: str, signature: tuple=None):
+        """:param signature: tuple (mtime_ns, size) of the file, taken before the text was read - backends that validate entries against the file use it (default=None)
+        """
+        raise Exception('Not yet implemented')
+
+    def invalidate(self, key: str):
+        raise Exception('Not yet implemented')
+
+
 class TextFileIO(GenericIO):
 
     def __init__(
@@ -307,13 +874,31 @@ class TextFileIO(GenericIO):
         file_name: str,
         cache_max_age: int=900,
         enable_cache: bool=False,
-        logger=L
+        logger=L,
+        clock=get_monotonic_timestamp,
+        cache_backend: CacheBackend=None,
+        memory_budget: MemoryBudget=None
     ):
+        """
+        :param file_folder_path: str with the directory of the file
+        :param file_name: str with the file name
+        :param cache_max_age: int number of seconds a cached value stays valid (default=900)
+        :param enable_cache: bool to enable caching of read/written data (default=False)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        :param clock: callable returning a monotonic time in seconds, used for cache expiry - for example CoarseClock().monotonic (default=get_monotonic_timestamp)
+        :param cache_backend: CacheBackend - when set (and enable_cache is True), the text is cached in the backend instead of in this instance. Only text (str) data is cached in the backend (default=None)
+        :param memory_budget: MemoryBudget to which the size of the cached data is reported - the cache is dropped when the budget is over its limit (default=None)
+        """
         # TODO: check that folder exists...
         self.cached_data = None
         self.cached_data_timestamp = 0
         self.cache_max_age = cache_max_age
         self.enable_cache = enable_cache
+        self.clock = clock
+        if cache_backend is not None and not isinstance(cache_backend, CacheBackend):
+            raise Exception('Invalid cache backend type. Expected an implementation of CacheBackend')
+        self.cache_backend = cache_backend
+        self.cached_bytes = 0
         super().__init__(
             uri='{}{}{}'.format(
                 file_folder_path,
@@ -322,26 +907,80 @@ class TextFileIO(GenericIO):
             ),
             logger=logger
         )
+        self.memory_budget = memory_budget
+        if memory_budget is not None:
+            memory_budget.register(owner=self, name=self.uri)
+
+    def _set_cached_data(self, data: GenericDataContainer, timestamp: float):
+        self.cached_data = data
+        self.cached_data_timestamp = timestamp
+        self.cached_bytes = 0 if data is None else data.memory_usage()
+        if self.memory_budget is not None:
+            self.memory_budget.set_size(owner=self, size=self.cached_bytes)
 
     def read_from_cache(self, **kwarg)->str:
+        if self.enable_cache is True and self.cache_backend is not None:
+            if 'force' in kwarg:
+                self.logger.info('Cache reset forced.')
+                return None
+            text = self.cache_backend.get_text(key=self.uri, max_age=self.cache_max_age)
+            if text is None:
+                return None
+            self.logger.info('Returning cached value')
+            data = GenericDataContainer(result_set_name=self.uri, data_type=str)
+            data.store(data=text)
+            return data
         if self.enable_cache is True:
-            now = get_utc_timestamp()
+            now = self.clock()
             if 'force' not in kwarg:
                 if self.cached_data is not None and (now - self.cached_data_timestamp) < self.cache_max_age:
                     self.logger.info('Returning cached value')
                     return self.cached_data
             else:
                 self.logger.info('Cache reset forced.')
-            self.cached_data = None
-            self.cached_data_timestamp = 0
+            self._set_cached_data(data=None, timestamp=0)
         return None
 
-    def update_cache(self, data: GenericDataContainer, **kwarg):
+    def invalidate_cache(self):
+        """Drop the cached data, so the next read() goes to the file again
+        """
+        if self.cached_data is not None:
+            self.logger.info('Cache invalidated')
+        self._set_cached_data(data=None, timestamp=0)
+        if self.cache_backend is not None:
+            self.cache_backend.invalidate(key=self.uri)
+
+    def _file_signature(self, f: object)->tuple:
+        """:returns: tuple (mtime_ns, size) of the open file for the cache backend, or None when there is no cache backend
+        """
+        if self.enable_cache is True and self.cache_backend is not None:
+            stat_result = os.fstat(f.fileno())
+            return (stat_result.st_mtime_ns, stat_result.st_size, )
+        return None
+
+    def update_cache(self, data: GenericDataContainer, signature: tuple=None, **kwarg):
+        if self.enable_cache is True and self.cache_backend is not None:
+            if data.data_type.__name__ == 'str' and data.data is not None:
+                self.cache_backend.put_text(key=self.uri, text=data.data, signature=signature)
+                self.logger.info('Cache updated')
+            else:
+                self.cache_backend.invalidate(key=self.uri)
+            return
         if self.enable_cache is True:
-            self.cached_data = data
-            self.cached_data_timestamp = get_utc_timestamp()
+            self._set_cached_data(data=data, timestamp=self.clock())
             self.logger.info('Cache updated')
 
+    def release_memory(self)->int:
+        """Drop the cached data - called by the MemoryBudget when it is over its limit
+
+        :returns: int number of bytes released
+        """
+        released = self.cached_bytes
+        if self.cached_data is not None:
+            self._set_cached_data(data=None, timestamp=0)
+            self.logger.info('Cache released')
+        return released
+
     def data_processing(self, data: GenericDataContainer, processor: GenericIOProcessor, **kwarg):
         if processor is not None:
             if isinstance(processor, GenericIOProcessor):
@@ -366,6 +1005,7 @@ class TextFileIO(GenericIO):
         data_str = ''
         lines = list()
         with open(self.uri, 'r') as f:
+            signature = self._file_signature(f=f)   # Before reading, so that a change during the read is not cached
             lines = f.readlines()
         if len(lines) > 1:
             data_str = ''.join(lines)
@@ -375,20 +1015,40 @@ class TextFileIO(GenericIO):
             data_str = ''
         data.store(data=data_str)
         self.logger.info('{} bytes read.'.format(len(data_str)))
-        self.update_cache(data=data, **kwarg)
+        self.update_cache(data=data, signature=signature, **kwarg)
         self.data_processing(data=data, processor=read_processor, **kwarg)
         return data
 
+    @staticmethod
+    def _list_text(items: object):
+        """Yield the text of a list, item by item - for list-like data that is not a list (for example a
+        SpillableList), which is written without building the complete text in memory
+        """
+        yield '['
+        separator = ''
+        for item in items:
+            yield separator
+            yield repr(item)
+            separator = ', '
+        yield ']'
+
     def write(self, data: GenericDataContainer, write_processor: GenericIOProcessor=None, **kwarg):
         data_to_write = data.data
         if data.data_type.__name__ != 'str':
             if data.data_type.__name__ == 'dict':
+                import json
                 data_to_write = json.dumps(data_to_write)
+            elif data.data_type.__name__ == 'list' and data_to_write is not None and not isinstance(data_to_write, list):
+                data_to_write = self._list_text(items=data_to_write)
             else:
                 data_to_write = '{}'.format(data_to_write)
         with open(self.uri, 'w') as f:
-            f.write(data_to_write)
-            self.update_cache(data=data, **kwarg)
+            if isinstance(data_to_write, str):
+                f.write(data_to_write)
+            else:
+                f.writelines(data_to_write)
+            f.flush()
+            self.update_cache(data=data, signature=self._file_signature(f=f), **kwarg)
         self.data_processing(data=data, processor=write_processor, **kwarg)
 
 # EOF
@@ -0,0 +1,235 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""A thread safe dict container for multi threaded ingestion
+
+Keys are spread over stripe_count sub dicts (shards), each with its own lock, so threads storing different keys rarely
+wait for each other. Validation runs before any lock is taken. Example:
+
+    >>> data = ConcurrentDictContainer(result_set_name='events', data_validator=MyValidator(), stripe_count=32)
+    >>> # from many threads:
+    >>> data.store(data=event, key=event_id)
+    >>> # later:
+    >>> events = data.data              # a consistent, read-only snapshot
+
+Reading single keys with get() does not lock. Consistent reads of all keys do not block writers either:
+
+* The data attribute returns the last published snapshot, a ReadOnlyDict that is never changed after it was
+  published. When nothing was stored since, this is a single attribute read, without any lock
+* After a change, the next read publishes a new snapshot. It takes the references to the current stripes, after which
+  a writer copies its stripe before the first change to it (copy-on-write, once per stripe and snapshot). The reader
+  then only waits for the writes that were already in flight - taking and releasing one stripe lock at a time - and
+  merges the stripes into the new snapshot without holding any lock
+* A bulk update() changes all its stripes under their locks, so a snapshot never contains half of it
+
+snapshot() returns a plain, changeable copy of the published snapshot. The ReadOnlyDict raises an Exception when it is
+changed - a change to the shared snapshot would otherwise be lost silently. Use store(), update() and delete() instead.
+
+On CPython builds with the GIL only one thread runs Python code at a time, so striping mostly reduces lock hand-offs.
+On free-threaded builds (PEP 703) writers to different stripes run in parallel.
+"""
+
+import threading
+from oculusd_utils.persistence import L, GenericDataContainer
+from oculusd_utils.security.validation import DataValidator
+
+
+class ReadOnlyDict(dict):
+    """A dict copy that refuses changes. It is still a dict, so json.dumps() and other code that expects one accept it.
+    """
+
+    def _read_only(self, *args, **kwarg):
+        raise Exception('The data of a ConcurrentDictContainer is a read-only copy - use store(), update() or delete()')
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __ior__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+
+class ConcurrentDictContainer(GenericDataContainer):
+
+    def __init__(self, result_set_name: str='anonymous', data_validator: DataValidator=None, stripe_count: int=16, logger=L):
+        """
+        :param result_set_name: str (default='anonymous')
+        :param data_validator: DataValidator used to validate every stored value (default=None)
+        :param stripe_count: int number of sub dicts, each with its own lock (default=16)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if stripe_count < 1:
+            raise Exception('stripe_count must be at least 1')
+        self.stripe_count = stripe_count
+        self._locks = [threading.Lock() for stripe in range(stripe_count)]
+        self._shards = [dict() for stripe in range(stripe_count)]
+        self._epoch = 0                                 # Incremented every time a snapshot takes the stripes
+        self._shard_epochs = [0] * stripe_count         # The epoch in which every stripe was last copied
+        self._published = None
+        self._dirty = True
+        self._publish_lock = threading.Lock()           # Only taken by readers
+        super().__init__(result_set_name=result_set_name, data_type=dict, data_validator=data_validator, logger=logger)
+
+    @property
+    def data(self)->dict:
+        """A consistent, read-only snapshot of all keys. Keys are ordered by stripe, not by insertion.
+        """
+        published = self._published
+        if published is not None and self._dirty is False:
+            return published
+        return self._publish()
+
+    @data.setter
+    def data(self, value: dict):
+        """Replace all keys, for example data.data = {'a': 1}. Values are not validated.
+        """
+        shards = [dict() for stripe in range(self.stripe_count)]
+        if value is not None:
+            for key, item in value.items():
+                shards[hash(key) % self.stripe_count][key] = item
+        self._acquire_all()
+        try:
+            self._shards = shards
+            self._shard_epochs = [self._epoch] * self.stripe_count
+            self._dirty = True
+        finally:
+            self._release_all()
+
+    def _acquire_all(self):
+        # Always in the same order, so two threads locking all stripes can not deadlock
+        for lock in self._locks:
+            lock.acquire()
+
+    def _release_all(self):
+        for lock in reversed(self._locks):
+            lock.release()
+
+    def _writable_shard(self, stripe: int, epoch: int)->dict:
+        # Called with the lock of the stripe held. A stripe that a snapshot took is copied before it is changed.
+        if self._shard_epochs[stripe] != epoch:
+            self._shards[stripe] = dict(self._shards[stripe])
+            self._shard_epochs[stripe] = epoch
+        return self._shards[stripe]
+
+    def _publish(self)->dict:
+        with self._publish_lock:
+            if self._published is not None and self._dirty is False:
+                return self._published
+            self._dirty = False
+            shards = tuple(self._shards)
+            # Writers that take their lock from here on copy their stripe first, so only writes in flight can still
+            # change the stripes that were taken
+            self._epoch += 1
+            for lock in self._locks:
+                with lock:
+                    pass
+            published = ReadOnlyDict()
+            for shard in shards:
+                dict.update(published, shard)     # dict.update() also fills a ReadOnlyDict
+            self._published = published
+            return published
+
+    def _validate(self, data: object, key: object, **kwarg):
+        if key is None:
+            raise Exception('Expected a key value but found None (data_type was set to dict)')
+        if self.data_validator is not None:
+            if not self.data_validator.validate(data=data, **kwarg):
+                raise Exception('Dictionary validation failed')
+            self.logger.info('Validation for value passed. key="{}"'.format(key))
+        else:
+            self.logger.warning('No DataValidator set - Dictionary value for key "{}" stored without validation! [1]'.format(key))
+
+    def _store_dict(self, data: object, key: object, **kwarg)->int:
+        self._validate(data=data, key=key, **kwarg)
+        stripe = hash(key) % self.stripe_count
+        with self._locks[stripe]:
+            shard = self._writable_shard(stripe=stripe, epoch=self._epoch)
+            replaced = key in shard
+            shard[key] = data
+            self._dirty = True
+        if replaced is True:
+            self.logger.warning('Key "{}" already exists in dict - old value was replaced with new value'.format(key))
+        return self.key_count()
+
+    def update(self, items: dict, **kwarg)->int:
+        """Validate and store many keys, taking every stripe lock only once. When any value fails validation, nothing
+        is stored.
+
+        :param items: dict of key -> value
+        :returns: int number of keys in the container
+        """
+        stripes = [None] * self.stripe_count
+        for key, value in items.items():
+            self._validate(data=value, key=key, **kwarg)
+            stripe = hash(key) % self.stripe_count
+            if stripes[stripe] is None:
+                stripes[stripe] = dict()
+            stripes[stripe][key] = value
+        # All involved stripes are locked together, so a snapshot never contains part of the update
+        involved = [stripe for stripe in range(self.stripe_count) if stripes[stripe] is not None]
+        for stripe in involved:
+            self._locks[stripe].acquire()
+        try:
+            # The epoch is read once, so either all or none of the stripes are copied
+            epoch = self._epoch
+            for stripe in involved:
+                self._writable_shard(stripe=stripe, epoch=epoch).update(stripes[stripe])
+            self._dirty = True
+        finally:
+            for stripe in reversed(involved):
+                self._locks[stripe].release()
+        return self.key_count()
+
+    def get(self, key: object, default: object=None)->object:
+        """Read a single key without locking
+        """
+        return self._shards[hash(key) % self.stripe_count].get(key, default)
+
+    def contains(self, key: object)->bool:
+        return key in self._shards[hash(key) % self.stripe_count]
+
+    def delete(self, key: object)->bool:
+        """:returns: bool True if the key was stored
+        """
+        stripe = hash(key) % self.stripe_count
+        with self._locks[stripe]:
+            if key in self._shards[stripe]:
+                del self._writable_shard(stripe=stripe, epoch=self._epoch)[key]
+                self._dirty = True
+                return True
+        return False
+
+    def key_count(self)->int:
+        return sum(map(len, self._shards))
+
+    def store_many(self, items: dict, **kwarg)->int:
+        """Store many keys, one store() at a time. Use update() to store them all or nothing.
+
+        :param items: dict of key -> value
+        :returns: int number of keys in the container
+        """
+        result = self.key_count()
+        for key, value in items.items():
+            result = self.store(data=value, key=key, **kwarg)
+        return result
+
+    def snapshot(self)->dict:
+        """:returns: dict with a copy of the published snapshot (see data). Keys are ordered by stripe, not by insertion.
+        """
+        return dict(self.data)
+
+    def merge_into(self, target: dict)->dict:
+        """Merge the published snapshot into a plain dict
+
+        :param target: dict to update - keys that are also in the container are replaced
+        :returns: dict the target
+        """
+        dict.update(target, self.data)
+        return target
+
+# EOF
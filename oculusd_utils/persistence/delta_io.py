@@ -0,0 +1,234 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Incremental (delta) persistence of dict and list containers in a single text file
+
+The file holds newline-delimited JSON records: a header line, the records of the last full snapshot, and the delta
+records appended after it. Writing a SnapshotDataContainer appends only what changed since the previous write, so
+the cost of a write is proportional to the number of changes instead of to the size of the container. Example:
+
+    >>> delta_io = DeltaFileIO(file_folder_path='/var/lib/my-app', file_name='events.ndjson')
+    >>> data = delta_io.read()              # a SnapshotDataContainer (empty when the file does not exist yet)
+    >>> data.store(data=event, key=event_id)
+    >>> delta_io.write(data=data)           # appends one record
+
+Records are JSON arrays:
+
+* ``["s", key, value_type, value]`` - a dict key was stored
+* ``["d", key]`` - a dict key was deleted
+* ``["a", value_type, value]`` - a list item was appended
+
+The value_type is "json", or "Decimal" for Decimal values (which are written as a string). Reading replays all
+records in order. When the number of delta records reaches compaction_ratio times the number of snapshot records
+(and at least min_compaction_records), the next write() rewrites the file as a full snapshot - written to a
+temporary file and renamed, so a crash leaves either the old or the new file. A line that was only partly written
+when the process crashed is dropped (and truncated) when the file is read.
+
+Containers that are not a SnapshotDataContainer, or that were not read from or written to this file before, are
+always written as a full snapshot.
+"""
+
+import os
+import json
+from decimal import Decimal
+from oculusd_utils.persistence import L, TextFileIO, GenericIOProcessor, GenericDataContainer
+from oculusd_utils.persistence.encoding import encode_key
+from oculusd_utils.persistence.snapshots import SnapshotDataContainer
+
+
+FORMAT_NAME = 'oculusd-delta'
+FORMAT_VERSION = 1
+
+
+def encode_delta_value(value: object)->list:
+    if isinstance(value, Decimal):
+        return ['Decimal', str(value)]
+    return ['json', value]
+
+
+def decode_delta_value(value_type: str, value: object)->object:
+    if value_type == 'Decimal':
+        return Decimal(value)
+    return value
+
+
+def store_record(key: object, value: object)->str:
+    encode_key(key=key)     # Only checks the key type
+    return json.dumps(['s', key] + encode_delta_value(value=value), separators=(',', ':'))
+
+
+def delete_record(key: object)->str:
+    return json.dumps(['d', key], separators=(',', ':'))
+
+
+def append_record(value: object)->str:
+    return json.dumps(['a'] + encode_delta_value(value=value), separators=(',', ':'))
+
+
+class DeltaFileIO(TextFileIO):
+
+    def __init__(
+        self,
+        file_folder_path: str,
+        file_name: str,
+        compaction_ratio: float=1.0,
+        min_compaction_records: int=1000,
+        sync_writes: bool=False,
+        logger=L
+    ):
+        """
+        :param file_folder_path: str with the directory of the file
+        :param file_name: str with the file name
+        :param compaction_ratio: float number of delta records, relative to the number of snapshot records, at which the next write is a full snapshot (default=1.0)
+        :param min_compaction_records: int minimum number of delta records before a write is a full snapshot (default=1000)
+        :param sync_writes: bool to fsync() the file after every write (default=False)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        super().__init__(file_folder_path=file_folder_path, file_name=file_name, enable_cache=False, logger=logger)
+        self.compaction_ratio = compaction_ratio
+        self.min_compaction_records = min_compaction_records
+        self.sync_writes = sync_writes
+        self.snapshot_records = 0
+        self.delta_records = 0
+        self._container = None      # The container of which all changes up to the last take_changes() are in the file
+
+    def needs_compaction(self)->bool:
+        return self.delta_records >= self.min_compaction_records and self.delta_records >= self.compaction_ratio * max(self.snapshot_records, 1)
+
+    def _replay(self)->tuple:
+        """:returns: tuple (data_type_name, data, snapshot record count, delta record count)
+        """
+        with open(self.uri, 'rb') as f:
+            content = f.read()
+        valid_size = content.rfind(b'\n') + 1
+        if valid_size < len(content):
+            self.logger.warning('Dropping a partly written record at the end of "{}"'.format(self.uri))
+            with open(self.uri, 'r+b') as f:
+                f.truncate(valid_size)
+        lines = content[:valid_size].decode('utf-8').splitlines()
+        if len(lines) == 0:
+            raise Exception('File "{}" has no header'.format(self.uri))
+        header = json.loads(lines[0])
+        if header.get('format') != FORMAT_NAME or header.get('data_type') not in ('dict', 'list'):
+            raise Exception('File "{}" is not a delta file'.format(self.uri))
+        snapshot_records = header.get('records', 0)
+        data_type_name = header['data_type']
+        if data_type_name == 'dict':
+            data = dict()
+            for line in lines[1:]:
+                record = json.loads(line)
+                if record[0] == 's':
+                    data[record[1]] = decode_delta_value(value_type=record[2], value=record[3])
+                elif record[0] == 'd':
+                    data.pop(record[1], None)
+                else:
+                    raise Exception('Unexpected record type "{}" in a dict file'.format(record[0]))
+        else:
+            data = list()
+            for line in lines[1:]:
+                record = json.loads(line)
+                if record[0] != 'a':
+                    raise Exception('Unexpected record type "{}" in a list file'.format(record[0]))
+                data.append(decode_delta_value(value_type=record[1], value=record[2]))
+        return (data_type_name, data, snapshot_records, len(lines) - 1 - snapshot_records, )
+
+    def read(self, read_processor: GenericIOProcessor=None, **kwarg)->GenericDataContainer:
+        """Replay the snapshot and the deltas in the file
+
+        :param read_processor: GenericIOProcessor to run on the result (default=None)
+        :param data_type: dict or list, the type of the empty container returned when the file does not exist (default=dict)
+
+        :returns: SnapshotDataContainer
+        """
+        if not os.path.exists(self.uri):
+            data_type = kwarg.get('data_type', dict)
+            data = SnapshotDataContainer(result_set_name=self.uri, data_type=data_type, logger=self.logger)
+            self.snapshot_records = 0
+            self.delta_records = 0
+            self._container = None
+        else:
+            data_type_name, items, self.snapshot_records, self.delta_records = self._replay()
+            data = SnapshotDataContainer(result_set_name=self.uri, data_type=dict if data_type_name == 'dict' else list, logger=self.logger)
+            data.data = items
+            data.mark_clean()
+            self._container = data
+            self.logger.info('{} records read ({} deltas).'.format(self.snapshot_records + self.delta_records, self.delta_records))
+        self.data_processing(data=data, processor=read_processor, **kwarg)
+        return data
+
+    def _write_snapshot(self, data_type_name: str, data: object):
+        records = [json.dumps({'format': FORMAT_NAME, 'version': FORMAT_VERSION, 'data_type': data_type_name, 'records': len(data)})]
+        if data_type_name == 'dict':
+            records.extend([store_record(key=key, value=value) for key, value in data.items()])
+        else:
+            records.extend([append_record(value=value) for value in data])
+        temp_path = '{}.tmp'.format(self.uri)
+        with open(temp_path, 'w') as f:
+            f.write('\n'.join(records))
+            f.write('\n')
+            if self.sync_writes is True:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, self.uri)
+        self.snapshot_records = len(data)
+        self.delta_records = 0
+        self.logger.info('Snapshot of {} records written.'.format(len(data)))
+
+    def _append(self, records: list):
+        if len(records) == 0:
+            return
+        with open(self.uri, 'a') as f:
+            f.write('\n'.join(records))
+            f.write('\n')
+            if self.sync_writes is True:
+                f.flush()
+                os.fsync(f.fileno())
+        self.delta_records = self.delta_records + len(records)
+        self.logger.info('{} delta records written.'.format(len(records)))
+
+    def write(self, data: GenericDataContainer, write_processor: GenericIOProcessor=None, **kwarg):
+        """Append the changes of a SnapshotDataContainer, or write a full snapshot
+
+        :param data: GenericDataContainer with dict or list data
+        :param write_processor: GenericIOProcessor to run after writing (default=None)
+        :param compact: bool which is an optional argument. If the keyword is present, a full snapshot is written
+        """
+        data_type_name = data.data_type.__name__
+        if data_type_name not in ('dict', 'list'):
+            raise Exception('DeltaFileIO only supports the dict and list data types')
+        container = self._container
+        # Until this write succeeds, the changes taken from the container are only in memory - a failed write makes
+        # the next write a full snapshot
+        self._container = None
+        if isinstance(data, SnapshotDataContainer):
+            write_snapshot = data is not container or 'compact' in kwarg or self.needs_compaction() or not os.path.exists(self.uri)
+            # Without a full snapshot only the changed keys are needed, and the dict of the container stays unshared
+            snapshot, changed, deleted, full = data.take_changes(changes_only=not write_snapshot)
+            if full is True or write_snapshot is True:
+                self._write_snapshot(data_type_name=data_type_name, data=snapshot)
+            elif data_type_name == 'dict':
+                records = [store_record(key=key, value=snapshot[key]) for key in changed]
+                records.extend([delete_record(key=key) for key in deleted])
+                self._append(records=records)
+            else:
+                self._append(records=[append_record(value=snapshot[index]) for index in changed])
+            self._container = data
+        else:
+            self._write_snapshot(data_type_name=data_type_name, data=data.data)
+        self.data_processing(data=data, processor=write_processor, **kwarg)
+
+    def compact(self)->int:
+        """Rewrite the file as a full snapshot
+
+        :returns: int number of delta records that were merged
+        """
+        if not os.path.exists(self.uri):
+            return 0
+        data_type_name, items, snapshot_records, delta_records = self._replay()
+        self._write_snapshot(data_type_name=data_type_name, data=items)
+        return delta_records
+
+# EOF
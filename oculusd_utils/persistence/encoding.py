@@ -0,0 +1,40 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Text encoding of container keys and values, shared by the persistent GenericIO implementations
+
+Keys are JSON encoded, so a str key "1" and an int key 1 stay different keys. Values are JSON encoded, except for
+Decimal values which keep their type (nested values follow the JSON types).
+"""
+
+import json
+from decimal import Decimal
+
+
+def encode_value(value: object)->tuple:
+    """:returns: tuple of (value_type, encoded value)
+    """
+    if isinstance(value, Decimal):
+        return 'Decimal', str(value)
+    return 'json', json.dumps(value, separators=(',', ':'))
+
+
+def decode_value(value_type: str, value: str)->object:
+    if value_type == 'Decimal':
+        return Decimal(value)
+    return json.loads(value)
+
+
+def encode_key(key: object)->str:
+    if key is not None and not isinstance(key, (str, int, float, )):
+        raise Exception('Keys of type "{}" can not be stored - expected str, int, float, bool or None'.format(type(key).__name__))
+    return json.dumps(key, separators=(',', ':'))
+
+
+def decode_key(key: str)->object:
+    return json.loads(key)
+
+# EOF
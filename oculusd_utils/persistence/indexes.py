@@ -0,0 +1,204 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Secondary indexes on the fields of the records (dicts) in a list container
+
+Finding records in a list of dicts is a linear scan. An IndexedListContainer keeps indexes on the fields named when
+it is created, and updates them on every store():
+
+    >>> data = IndexedListContainer(result_set_name='events', hash_indexes=('hostname', ), sorted_indexes=('timestamp', ))
+    >>> data.store_many(items=events)
+    >>> data.find(field='hostname', value='node-01')                   # O(1)
+    >>> data.find_range(field='timestamp', low=start, high=end)        # O(log n), plus the number of matches
+
+* A HashIndex maps every value of the field to the list indices of the records with that value - for equality
+  lookups
+* A SortedIndex keeps the values of the field in order, with bisect - for range queries (and equality lookups).
+  Records stored in field order are appended to the index; others are inserted, which moves the later entries
+
+Records without the field, or with None as its value, are not indexed. Every index is checked before a record is
+stored, so a value that can not be indexed (unhashable, or not comparable with the values already in a sorted index)
+raises an Exception and nothing is stored. Assigning the data attribute directly bypasses the indexes - call
+rebuild_indexes() afterwards.
+"""
+
+from bisect import bisect_left, bisect_right
+from oculusd_utils.persistence import L, GenericDataContainer, StringPool, MemoryBudget
+from oculusd_utils.security.validation import DataValidator
+
+
+class HashIndex:
+
+    def __init__(self, field: object):
+        self.field = field
+        self.positions = dict()     # value -> list of list indices
+
+    def prepare(self, record: object)->object:
+        """Check that the record can be indexed
+
+        :returns: object the value to index, or None when the record is not indexed
+        """
+        if not isinstance(record, dict):
+            return None
+        value = record.get(self.field)
+        if value is not None:
+            try:
+                hash(value)
+            except TypeError:
+                raise Exception('Value of field "{}" can not be indexed - it is not hashable'.format(self.field))
+        return value
+
+    def add(self, value: object, list_index: int):
+        positions = self.positions.get(value)
+        if positions is None:
+            self.positions[value] = [list_index]
+        else:
+            positions.append(list_index)
+
+    def lookup(self, value: object)->list:
+        """:returns: list of the list indices of the records with the value, in storage order
+        """
+        return list(self.positions.get(value, ()))
+
+    def clear(self):
+        self.positions = dict()
+
+
+class SortedIndex:
+
+    def __init__(self, field: object):
+        self.field = field
+        self.values = list()        # Sorted field values
+        self.positions = list()     # The list index of the record of every value
+
+    def prepare(self, record: object)->object:
+        """Check that the record can be indexed
+
+        :returns: object the value to index, or None when the record is not indexed
+        """
+        if not isinstance(record, dict):
+            return None
+        value = record.get(self.field)
+        if value is not None and len(self.values) > 0:
+            try:
+                value < self.values[-1]
+            except TypeError:
+                raise Exception('Value of field "{}" can not be indexed - it can not be compared with the indexed values'.format(self.field))
+        return value
+
+    def add(self, value: object, list_index: int):
+        if len(self.values) == 0 or not value < self.values[-1]:
+            self.values.append(value)
+            self.positions.append(list_index)
+        else:
+            insert_at = bisect_right(self.values, value)
+            self.values.insert(insert_at, value)
+            self.positions.insert(insert_at, list_index)
+
+    def lookup(self, value: object)->list:
+        return self.range(low=value, high=value)
+
+    def range(self, low: object=None, high: object=None, include_low: bool=True, include_high: bool=True)->list:
+        """:returns: list of the list indices of the records with a value from low to high, in field order (records with equal values in storage order)
+        """
+        start = 0
+        stop = len(self.values)
+        if low is not None:
+            start = bisect_left(self.values, low) if include_low else bisect_right(self.values, low)
+        if high is not None:
+            stop = bisect_right(self.values, high) if include_high else bisect_left(self.values, high)
+        return self.positions[start:stop]
+
+    def clear(self):
+        self.values = list()
+        self.positions = list()
+
+
+class IndexedListContainer(GenericDataContainer):
+
+    def __init__(
+        self,
+        result_set_name: str='anonymous',
+        data_validator: DataValidator=None,
+        hash_indexes: tuple=(),
+        sorted_indexes: tuple=(),
+        logger=L,
+        string_pool: StringPool=None,
+        memory_budget: MemoryBudget=None
+    ):
+        """
+        :param result_set_name: str (default='anonymous')
+        :param data_validator: DataValidator for every stored record (default=None)
+        :param hash_indexes: tuple of the fields with an index for equality lookups (default=())
+        :param sorted_indexes: tuple of the fields with an index for range queries (default=())
+        :param logger: OculusDLogger (default=OculusDLogger())
+        :param string_pool: StringPool used by store() to deduplicate the strings in the records (default=None)
+        :param memory_budget: MemoryBudget to which store() reports the size of the data - the indexes are not included (default=None)
+        """
+        super().__init__(
+            result_set_name=result_set_name,
+            data_type=list,
+            data_validator=data_validator,
+            logger=logger,
+            string_pool=string_pool,
+            memory_budget=memory_budget
+        )
+        self.hash_indexes = {field: HashIndex(field=field) for field in hash_indexes}
+        self.sorted_indexes = {field: SortedIndex(field=field) for field in sorted_indexes}
+        self._indexes = list(self.hash_indexes.values()) + list(self.sorted_indexes.values())
+
+    def _store_list(self, data: object, key: object=None, **kwarg)->int:
+        values = [index.prepare(record=data) for index in self._indexes]
+        result = super()._store_list(data=data, key=key, **kwarg)
+        list_index = len(self.data) - 1
+        for index, value in zip(self._indexes, values):
+            if value is not None:
+                index.add(value=value, list_index=list_index)
+        return result
+
+    def rebuild_indexes(self):
+        """Index all records again - needed after the data attribute was assigned directly
+        """
+        for index in self._indexes:
+            index.clear()
+        for list_index, record in enumerate(self.data):
+            for index in self._indexes:
+                value = index.prepare(record=record)
+                if value is not None:
+                    index.add(value=value, list_index=list_index)
+        self.logger.info('Indexes of "{}" rebuilt for {} records'.format(self.result_set_name, len(self.data)))
+
+    def find_indices(self, field: object, value: object)->list:
+        """:returns: list of the list indices of the records of which the field equals value
+        """
+        index = self.hash_indexes.get(field)
+        if index is None:
+            index = self.sorted_indexes.get(field)
+        if index is None:
+            raise Exception('Field "{}" has no index'.format(field))
+        return index.lookup(value=value)
+
+    def find(self, field: object, value: object)->list:
+        """:returns: list of the records of which the field equals value
+        """
+        data = self.data
+        return [data[list_index] for list_index in self.find_indices(field=field, value=value)]
+
+    def find_range_indices(self, field: object, low: object=None, high: object=None, include_low: bool=True, include_high: bool=True)->list:
+        """:returns: list of the list indices of the records of which the field is from low to high (None means unbounded), in field order
+        """
+        index = self.sorted_indexes.get(field)
+        if index is None:
+            raise Exception('Field "{}" has no sorted index'.format(field))
+        return index.range(low=low, high=high, include_low=include_low, include_high=include_high)
+
+    def find_range(self, field: object, low: object=None, high: object=None, include_low: bool=True, include_high: bool=True)->list:
+        """:returns: list of the records of which the field is from low to high (None means unbounded), in field order
+        """
+        data = self.data
+        return [data[list_index] for list_index in self.find_range_indices(field=field, low=low, high=high, include_low=include_low, include_high=include_high)]
+
+# EOF
@@ -0,0 +1,373 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""On demand loading of large JSON files that contain a single object (dict)
+
+Instead of parsing the whole file, one structural scan finds the byte range of the value of every top level key. The
+scan runs regular expressions over a memory map of the file: top level keys and scalar values are matched as a whole,
+nested values are skipped from bracket to bracket, and the file is never loaded as a whole. Values are decoded when
+they are accessed:
+
+    >>> lazy_io = LazyJsonFileIO(file_folder_path='/data', file_name='huge.json')
+    >>> data = lazy_io.read()                   # a dict GenericDataContainer - data.data is a LazyJsonDict
+    >>> data.data['customer-1234']              # reads and decodes only this value
+
+The key index is saved next to the file (as "<file name>.keyidx") together with the modification time and size of the
+file, so opening an unchanged file again skips the scan. The saved index is memory mapped and searched by key hash,
+so memory use grows with the number of keys that are accessed, not with the size of the file or the number of keys in
+it. When the index can not be written (for example in a read only directory) it is kept in memory as a dict.
+
+A LazyJsonDict is a MutableMapping and not a dict: keys can be added, changed and deleted in memory, and to_dict()
+returns a plain dict with all values (which decodes everything). Before a value is read, the modification time and
+size of the open file are compared with those of the file that was indexed; when the file was changed in place since
+read(), an Exception is raised instead of decoding a byte range that no longer matches. close() closes the file and the
+memory mapped index.
+"""
+
+import os
+import re
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+from collections.abc import Mapping, MutableMapping
+from oculusd_utils.persistence import L, TextFileIO, GenericIOProcessor, GenericDataContainer
+
+
+INDEX_SUFFIX = '.keyidx'
+INDEX_MAGIC = b'ODKIDX01'
+INDEX_HEADER = struct.Struct('<8sQQQQ')     # magic, mtime_ns and size of the JSON file, key count, offset of the keys
+INDEX_RECORD = struct.Struct('<QQQI')       # value start, value end, key offset, key length - in document order
+INDEX_HASH = struct.Struct('<QI')           # key hash, record number - sorted by hash
+STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+OBJECT_START = re.compile(rb'\s*\{\s*(\}?)')
+# A key of the top level object, up to the first character of its value
+KEY = re.compile(rb'\s*(' + STRING + rb')\s*:\s*', re.DOTALL)
+# A string or scalar value, followed by the separator
+SCALAR_VALUE = re.compile(rb'(?:' + STRING + rb'|[^"{}\[\],]*)\s*([,}])', re.DOTALL)
+SEPARATOR = re.compile(rb'\s*([,}])')
+# Everything up to and including the next bracket outside of a string literal, to skip nested values in few matches
+NEXT_BRACKET = re.compile(rb'[^"{}\[\]]*(?:' + STRING + rb'[^"{}\[\]]*)*[{}\[\]]', re.DOTALL)
+
+BACKSLASH = b'\\'
+CLOSING_BRACE = ord('}')
+OPENING = (ord('{'), ord('['), )
+
+
+def skip_nested_value(buffer, position: int)->int:
+    """:returns: int offset just after the container value that was opened right before the position
+    """
+    depth = 1
+    while depth > 0:
+        match = NEXT_BRACKET.match(buffer, position)
+        if match is None:
+            raise Exception('The JSON document is incomplete')
+        position = match.end()
+        if buffer[position - 1] in OPENING:
+            depth = depth + 1
+        else:
+            depth = depth - 1
+    return position
+
+
+def scan_key_ranges(buffer)->dict:
+    """Find the byte range of the value of every top level key of a JSON object. Nested values are skipped by
+    bracket matching, they are not validated.
+
+    :param buffer: bytes, mmap or other buffer with the JSON document
+    :returns: dict with the key as key and a tuple of (start, end) as value
+    """
+    ranges = dict()
+    match = OBJECT_START.match(buffer)
+    if match is None:
+        raise Exception('The JSON document is not an object')
+    if match.group(1):
+        return ranges
+    position = match.end()
+    size = len(buffer)
+    while True:
+        match = KEY.match(buffer, position)
+        if match is None:
+            raise Exception('Invalid JSON object at offset {}'.format(position))
+        raw_key = buffer[match.start(1) + 1:match.end(1) - 1]
+        if BACKSLASH in raw_key:
+            key = json.loads(b'"' + raw_key + b'"')
+        else:
+            key = raw_key.decode('utf-8')
+        value_start = match.end()
+        if value_start >= size:
+            raise Exception('The JSON document is incomplete')
+        if buffer[value_start] in OPENING:
+            match = SEPARATOR.match(buffer, skip_nested_value(buffer=buffer, position=value_start + 1))
+        else:
+            match = SCALAR_VALUE.match(buffer, value_start)
+        if match is None:
+            raise Exception('The JSON document is incomplete or invalid after offset {}'.format(value_start))
+        ranges[key] = (value_start, match.start(1), )
+        position = match.end()
+        if buffer[match.start(1)] == CLOSING_BRACE:
+            return ranges
+
+
+def key_hash(key: bytes)->int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+class KeyIndex(Mapping):
+    """A read only mapping of key -> (start, end) byte ranges, stored in a memory mapped index file. Lookups are a
+    binary search over the key hashes, so only the pages that are touched are loaded into memory.
+    """
+
+    def __init__(self, path: str, mtime_ns: int, size: int):
+        """
+        :param path: str path of the index file
+        :param mtime_ns: int modification time of the JSON file the index must belong to
+        :param size: int size of the JSON file the index must belong to
+        """
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._buffer) < INDEX_HEADER.size:
+            raise Exception('Invalid key index "{}"'.format(path))
+        magic, index_mtime_ns, index_size, self.count, self._keys_offset = INDEX_HEADER.unpack_from(self._buffer, 0)
+        if magic != INDEX_MAGIC or index_mtime_ns != mtime_ns or index_size != size:
+            raise Exception('Key index "{}" does not belong to the current version of the file'.format(path))
+        self._hashes_offset = INDEX_HEADER.size + self.count * INDEX_RECORD.size
+
+    @staticmethod
+    def write(path: str, mtime_ns: int, size: int, ranges: dict):
+        hashes = list()
+        key_offset = 0
+        keys_offset = INDEX_HEADER.size + len(ranges) * (INDEX_RECORD.size + INDEX_HASH.size)
+        # A unique temporary file, so that processes indexing the same file at the same time do not share one
+        descriptor, temporary_path = tempfile.mkstemp(prefix='{}.'.format(os.path.basename(path)), suffix='.tmp', dir=os.path.dirname(path) or '.')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, mtime_ns, size, len(ranges), keys_offset))
+                for record_number, (key, (start, end)) in enumerate(ranges.items()):
+                    key_bytes = key.encode('utf-8', 'surrogatepass')
+                    f.write(INDEX_RECORD.pack(start, end, key_offset, len(key_bytes)))
+                    hashes.append((key_hash(key=key_bytes), record_number, ))
+                    key_offset = key_offset + len(key_bytes)
+                hashes.sort()
+                for hash_value, record_number in hashes:
+                    f.write(INDEX_HASH.pack(hash_value, record_number))
+                hashes = None
+                for key in ranges:
+                    f.write(key.encode('utf-8', 'surrogatepass'))
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def _record(self, record_number: int)->tuple:
+        return INDEX_RECORD.unpack_from(self._buffer, INDEX_HEADER.size + record_number * INDEX_RECORD.size)
+
+    def _key_bytes(self, record: tuple)->bytes:
+        start = self._keys_offset + record[2]
+        return self._buffer[start:start + record[3]]
+
+    def __getitem__(self, key: object)->tuple:
+        if not isinstance(key, str):
+            raise KeyError(key)
+        key_bytes = key.encode('utf-8', 'surrogatepass')
+        hash_value = key_hash(key=key_bytes)
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if INDEX_HASH.unpack_from(self._buffer, self._hashes_offset + middle * INDEX_HASH.size)[0] < hash_value:
+                low = middle + 1
+            else:
+                high = middle
+        while low < self.count:
+            candidate_hash, record_number = INDEX_HASH.unpack_from(self._buffer, self._hashes_offset + low * INDEX_HASH.size)
+            if candidate_hash != hash_value:
+                break
+            record = self._record(record_number=record_number)
+            if self._key_bytes(record=record) == key_bytes:
+                return (record[0], record[1], )
+            low = low + 1
+        raise KeyError(key)
+
+    def __iter__(self):
+        for record_number in range(self.count):
+            yield self._key_bytes(record=self._record(record_number=record_number)).decode('utf-8', 'surrogatepass')
+
+    def __len__(self)->int:
+        return self.count
+
+    def close(self):
+        self._buffer.close()
+
+
+class LazyJsonDict(MutableMapping):
+    """A mapping of the top level keys of a JSON object file of which values are decoded on first access
+    """
+
+    def __init__(self, path: str, ranges: dict, cache_values: bool=True, signature: tuple=None):
+        """
+        :param path: str path of the JSON file
+        :param ranges: dict or KeyIndex of key -> (start, end) byte ranges
+        :param cache_values: bool - keep decoded values in memory (default=True)
+        :param signature: tuple of (mtime_ns, size) of the JSON file the ranges belong to (default=None, which does not check the file)
+        """
+        self.path = path
+        self.ranges = ranges
+        self.cache_values = cache_values
+        self.signature = signature
+        self.values = dict()    # decoded (or changed) values
+        self.deleted = set()
+        self._file = None
+
+    def _read(self, key: object)->object:
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+        if self.signature is not None:
+            stat_result = os.fstat(self._file.fileno())
+            if (stat_result.st_mtime_ns, stat_result.st_size, ) != self.signature:
+                raise Exception('"{}" has changed since it was indexed - read it again'.format(self.path))
+        start, end = self.ranges[key]
+        return json.loads(os.pread(self._file.fileno(), end - start, start))
+
+    def __getitem__(self, key: object)->object:
+        if key in self.values:
+            return self.values[key]
+        if key in self.deleted or key not in self.ranges:
+            raise KeyError(key)
+        value = self._read(key=key)
+        if self.cache_values is True:
+            self.values[key] = value
+        return value
+
+    def __setitem__(self, key: object, value: object):
+        self.deleted.discard(key)
+        self.values[key] = value
+
+    def __delitem__(self, key: object):
+        if key not in self:
+            raise KeyError(key)
+        self.values.pop(key, None)
+        if key in self.ranges:
+            self.deleted.add(key)
+
+    def __contains__(self, key: object)->bool:
+        return key in self.values or (key in self.ranges and key not in self.deleted)
+
+    def __iter__(self):
+        for key in self.ranges:
+            if key not in self.deleted:
+                yield key
+        for key in self.values:
+            if key not in self.ranges:
+                yield key
+
+    def __len__(self)->int:
+        return len(self.ranges) - len(self.deleted) + len([key for key in self.values if key not in self.ranges])
+
+    def loaded_count(self)->int:
+        """:returns: int number of values held in memory
+        """
+        return len(self.values)
+
+    def to_dict(self)->dict:
+        return {key: self[key] for key in self}
+
+    def close(self):
+        """Close the JSON file and the key index. Values that were not loaded can not be read afterwards.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if isinstance(self.ranges, KeyIndex):
+            self.ranges.close()
+
+
+class LazyJsonFileIO(TextFileIO):
+
+    def __init__(
+        self,
+        file_folder_path: str,
+        file_name: str,
+        persist_index: bool=True,
+        cache_values: bool=True,
+        cache_max_age: int=900,
+        enable_cache: bool=False,
+        logger=L
+    ):
+        """
+        :param file_folder_path: str with the directory of the file
+        :param file_name: str with the file name
+        :param persist_index: bool - save the key index next to the file and reuse it while the file is unchanged (default=True)
+        :param cache_values: bool - keep decoded values in memory (default=True)
+        :param cache_max_age: int number of seconds a cached container stays valid (default=900)
+        :param enable_cache: bool to enable caching of the container (default=False)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        super().__init__(file_folder_path=file_folder_path, file_name=file_name, cache_max_age=cache_max_age, enable_cache=enable_cache, logger=logger)
+        self.persist_index = persist_index
+        self.cache_values = cache_values
+        self.index_path = '{}{}'.format(self.uri, INDEX_SUFFIX)
+
+    def key_ranges(self, stat_result: os.stat_result=None)->Mapping:
+        """
+        :param stat_result: os.stat_result of the JSON file (default=None, which reads it)
+        :returns: KeyIndex from the saved index, or when the index is not persisted a dict of key -> (start, end) byte ranges from a new scan
+        """
+        if stat_result is None:
+            stat_result = os.stat(self.uri)
+        if self.persist_index is True:
+            try:
+                ranges = KeyIndex(path=self.index_path, mtime_ns=stat_result.st_mtime_ns, size=stat_result.st_size)
+                self.logger.debug('Using saved key index "{}"'.format(self.index_path))
+                return ranges
+            except Exception as e:
+                self.logger.debug('Key index not used: {}'.format(e))
+        if stat_result.st_size == 0:
+            raise Exception('The JSON document is empty')
+        with open(self.uri, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                ranges = scan_key_ranges(buffer=buffer)
+        self.logger.info('{} keys indexed in "{}"'.format(len(ranges), self.uri))
+        if self.persist_index is True:
+            try:
+                KeyIndex.write(path=self.index_path, mtime_ns=stat_result.st_mtime_ns, size=stat_result.st_size, ranges=ranges)
+                return KeyIndex(path=self.index_path, mtime_ns=stat_result.st_mtime_ns, size=stat_result.st_size)
+            except OSError as e:
+                self.logger.warning('Key index "{}" could not be saved: {}'.format(self.index_path, e))
+        return ranges
+
+    def read(self, read_processor: GenericIOProcessor=None, **kwarg)->GenericDataContainer:
+        """Open the JSON object file lazily
+
+        :param read_processor: GenericIOProcessor to run on the container (default=None)
+        :param force: bool which is an optional argument. If the keyword is present, any cached data will be ignored (cache will be cleared as well)
+
+        :returns: GenericDataContainer of data type dict, holding a LazyJsonDict
+        """
+        data = self.read_from_cache(**kwarg)
+        if data is not None:
+            return data
+        data = GenericDataContainer(result_set_name=self.uri, data_type=dict, logger=self.logger)
+        stat_result = os.stat(self.uri)
+        data.data = LazyJsonDict(
+            path=self.uri,
+            ranges=self.key_ranges(stat_result=stat_result),
+            cache_values=self.cache_values,
+            signature=(stat_result.st_mtime_ns, stat_result.st_size, )
+        )
+        self.update_cache(data=data, **kwarg)
+        self.data_processing(data=data, processor=read_processor, **kwarg)
+        return data
+
+    def write(self, data: GenericDataContainer, write_processor: GenericIOProcessor=None, **kwarg):
+        if isinstance(data.data, LazyJsonDict):
+            plain_data = GenericDataContainer(result_set_name=data.result_set_name, data_type=dict, logger=self.logger)
+            plain_data.data = data.data.to_dict()
+            data = plain_data
+        super().write(data=data, write_processor=write_processor, **kwarg)
+
+# EOF
@@ -0,0 +1,445 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""A log structured (Bitcask style) key value store for dict containers
+
+Every change is appended to the active segment file as one record, so persisting a single key costs O(size of the
+value) regardless of the size of the dict. An in memory index maps every key to the location of its latest value, so
+a point read is a single pread(). Example:
+
+    >>> log_io = LogStructuredIO(directory='/var/lib/my-app/settings')
+    >>> data = log_io.container(result_set_name='settings')    # a dict GenericDataContainer with the stored data
+    >>> data.store(data='dark', key='theme')                    # validated, then appended to the log
+    >>> log_io.get(key='theme')
+    'dark'
+
+Files in the directory:
+
+* "<id>.log" - segment files with records of (crc32, key size, value size, value type, key, value). A delete appends
+  a tombstone record. When the active segment reaches max_file_size a new one is started
+* "<id>.hint" - written by compaction next to every merged segment, with only the key locations. Opening a store reads
+  the hint files instead of scanning the (much larger) merged segments
+
+Compaction rewrites the live records of all segments except the active one into a single merged segment with a new
+id, and then removes the old segments. It runs in a background thread after start(), when the fraction of dead (overwritten or deleted)
+bytes reaches min_dead_ratio, or on demand with compact(). Writes and reads continue while the merged segment is
+written.
+
+A record that was only partly written when the process crashed fails its checksum - the active segment is truncated
+to the last complete record when the store is opened. Keys and values are encoded as described in
+oculusd_utils.persistence.encoding.
+"""
+
+import os
+import zlib
+import struct
+import threading
+from oculusd_utils.persistence import L, GenericIO, GenericIOProcessor, GenericDataContainer
+from oculusd_utils.persistence.encoding import encode_key, decode_key, encode_value, decode_value
+
+
+RECORD_HEADER = struct.Struct('<IIIB')  # crc32, key size, value size, value type
+HINT_HEADER = struct.Struct('<IQIB')    # key size, value offset, value size, value type
+VALUE_TYPES = {'json': 0, 'Decimal': 1}
+VALUE_TYPE_NAMES = {code: name for name, code in VALUE_TYPES.items()}
+TOMBSTONE = 255
+
+
+def encode_record(key: bytes, value: bytes, value_type: int)->bytes:
+    header_tail = RECORD_HEADER.pack(0, len(key), len(value), value_type)[4:]
+    crc = zlib.crc32(value, zlib.crc32(key, zlib.crc32(header_tail)))
+    return b''.join((struct.pack('<I', crc), header_tail, key, value, ))
+
+
+class LogStructuredDataContainer(GenericDataContainer):
+    """A dict GenericDataContainer of which every store() is also appended to a LogStructuredIO
+    """
+
+    def __init__(self, log_io, result_set_name: str='anonymous', data_validator=None, logger=L):
+        super().__init__(result_set_name=result_set_name, data_type=dict, data_validator=data_validator, logger=logger)
+        self.log_io = log_io
+
+    def _store_dict(self, data: object, key: object, **kwarg)->int:
+        size = super()._store_dict(data=data, key=key, **kwarg)
+        self.log_io.put(key=key, value=data)
+        return size
+
+
+class LogStructuredIO(GenericIO):
+
+    def __init__(
+        self,
+        directory: str,
+        max_file_size: int=64*1024*1024,
+        sync_writes: bool=False,
+        compaction_interval: float=60.0,
+        min_dead_ratio: float=0.5,
+        logger=L
+    ):
+        """
+        :param directory: str directory of the store (created when it does not exist)
+        :param max_file_size: int size in bytes from which a new segment file is started (default=64MiB)
+        :param sync_writes: bool - if True, every write is followed by an fsync() (default=False)
+        :param compaction_interval: float seconds between compaction checks of the background thread (default=60.0)
+        :param min_dead_ratio: float fraction of dead bytes from which the background thread compacts (default=0.5)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if max_file_size < 1:
+            raise Exception('max_file_size must be at least 1')
+        super().__init__(uri=directory, logger=logger)
+        self.max_file_size = max_file_size
+        self.sync_writes = sync_writes
+        self.compaction_interval = compaction_interval
+        self.min_dead_ratio = min_dead_ratio
+        self.index = dict()         # encoded key -> (file id, value offset, value size, value type, record size)
+        self.total_bytes = 0
+        self.dead_bytes = 0
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._fds = dict()          # file id -> file descriptor
+        self._active_id = None
+        self._active_size = 0
+        self._thread = None
+        self._stop_event = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, file_id: int, suffix: str='.log')->str:
+        return os.path.join(self.uri, '{:010d}{}'.format(file_id, suffix))
+
+    def _apply(self, key: str, entry: tuple):
+        previous = self.index.get(key)
+        if previous is not None:
+            self.dead_bytes = self.dead_bytes + previous[4]
+        self.total_bytes = self.total_bytes + entry[4]
+        if entry[3] == TOMBSTONE:
+            self.index.pop(key, None)
+            self.dead_bytes = self.dead_bytes + entry[4]
+        else:
+            self.index[key] = entry
+
+    def _scan(self, file_id: int, truncate: bool):
+        offset = 0
+        with open(self._path(file_id=file_id), 'rb') as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                crc, key_size, value_size, value_type = RECORD_HEADER.unpack(header)
+                body = f.read(key_size + value_size)
+                if len(body) < key_size + value_size or zlib.crc32(body, zlib.crc32(header[4:])) != crc:
+                    break
+                record_size = RECORD_HEADER.size + key_size + value_size
+                self._apply(key=body[:key_size].decode('utf-8'), entry=(file_id, offset + RECORD_HEADER.size + key_size, value_size, value_type, record_size, ))
+                offset = offset + record_size
+        size = os.fstat(self._fds[file_id]).st_size
+        if offset < size:
+            if truncate is True:
+                self.logger.warning('Truncating {} bytes of incomplete records from "{}"'.format(size - offset, self._path(file_id=file_id)))
+                os.ftruncate(self._fds[file_id], offset)
+            else:
+                self.logger.error('Corrupt record in "{}" at offset {} - the rest of the segment is ignored'.format(self._path(file_id=file_id), offset))
+        return offset
+
+    def _load_hints(self, file_id: int):
+        with open(self._path(file_id=file_id, suffix='.hint'), 'rb') as f:
+            hints = f.read()
+        offset = 0
+        record_bytes = 0
+        while offset + HINT_HEADER.size <= len(hints):
+            key_size, value_offset, value_size, value_type = HINT_HEADER.unpack_from(hints, offset)
+            offset = offset + HINT_HEADER.size
+            key = hints[offset:offset + key_size].decode('utf-8')
+            offset = offset + key_size
+            record_size = RECORD_HEADER.size + key_size + value_size
+            self._apply(key=key, entry=(file_id, value_offset, value_size, value_type, record_size, ))
+            record_bytes = record_bytes + record_size
+        # A merged segment only holds the hinted records - any difference is unreachable data
+        self.total_bytes = self.total_bytes + os.fstat(self._fds[file_id]).st_size - record_bytes
+
+    def _load(self):
+        file_ids = list()
+        for file_name in os.listdir(self.uri):
+            if file_name.endswith('.tmp'):
+                os.remove(os.path.join(self.uri, file_name))    # left behind by an interrupted compaction
+            elif file_name.endswith('.log') and file_name[:-4].isdigit():
+                file_ids.append(int(file_name[:-4]))
+        file_ids.sort()
+        if len(file_ids) == 0:
+            file_ids.append(1)
+        for file_id in file_ids:
+            self._fds[file_id] = os.open(self._path(file_id=file_id), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            is_active = file_id == file_ids[-1]
+            if not is_active and os.path.exists(self._path(file_id=file_id, suffix='.hint')):
+                self._load_hints(file_id=file_id)
+            else:
+                size = self._scan(file_id=file_id, truncate=is_active)
+                if is_active:
+                    self._active_size = size
+        self._active_id = file_ids[-1]
+        self.logger.info('Opened "{}" with {} keys in {} segments'.format(self.uri, len(self.index), len(file_ids)))
+
+    def _roll(self):
+        """Start a new active segment. Must be called while holding the lock
+        """
+        if self.sync_writes is False:
+            os.fsync(self._fds[self._active_id])
+        self._active_id = self._active_id + 1
+        self._fds[self._active_id] = os.open(self._path(file_id=self._active_id), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self._active_size = 0
+
+    def _append(self, records: list):
+        """Append (encoded key, record, value size, value type) tuples. Must be called while holding the lock
+        """
+        batch = list()
+        batch_size = 0
+        for key, record, value_size, value_type in records:
+            if self._active_size + batch_size + len(record) > self.max_file_size and self._active_size + batch_size > 0:
+                self._write(batch=batch)
+                batch = list()
+                batch_size = 0
+                self._roll()
+            batch.append((key, record, value_size, value_type, ))
+            batch_size = batch_size + len(record)
+        self._write(batch=batch)
+
+    def _write(self, batch: list):
+        if len(batch) == 0:
+            return
+        data = memoryview(b''.join([record for key, record, value_size, value_type in batch]))
+        fd = self._fds[self._active_id]
+        while len(data) > 0:
+            data = data[os.write(fd, data):]
+        if self.sync_writes is True:
+            os.fsync(fd)
+        for key, record, value_size, value_type in batch:
+            value_offset = self._active_size + len(record) - value_size
+            self._apply(key=key, entry=(self._active_id, value_offset, value_size, value_type, len(record), ))
+            self._active_size = self._active_size + len(record)
+
+    def _encode(self, key: object, value: object)->tuple:
+        encoded_key = encode_key(key=key)
+        value_type, encoded_value = encode_value(value=value)
+        key_bytes = encoded_key.encode('utf-8')
+        value_bytes = encoded_value.encode('utf-8')
+        return (encoded_key, encode_record(key=key_bytes, value=value_bytes, value_type=VALUE_TYPES[value_type]), len(value_bytes), VALUE_TYPES[value_type], )
+
+    def _tombstone(self, encoded_key: str)->tuple:
+        return (encoded_key, encode_record(key=encoded_key.encode('utf-8'), value=b'', value_type=TOMBSTONE), 0, TOMBSTONE, )
+
+    def put(self, key: object, value: object):
+        """Store a single key - one record is appended
+        """
+        record = self._encode(key=key, value=value)
+        with self._lock:
+            self._append(records=[record])
+
+    def put_many(self, items: dict):
+        """Store several keys with one write() call per segment
+        """
+        records = [self._encode(key=key, value=value) for key, value in items.items()]
+        with self._lock:
+            self._append(records=records)
+
+    def delete(self, key: object)->bool:
+        """:returns: bool True if the key was stored
+        """
+        encoded_key = encode_key(key=key)
+        with self._lock:
+            if encoded_key not in self.index:
+                return False
+            self._append(records=[self._tombstone(encoded_key=encoded_key)])
+        return True
+
+    def _read_value(self, entry: tuple)->object:
+        value = os.pread(self._fds[entry[0]], entry[2], entry[1])
+        return decode_value(value_type=VALUE_TYPE_NAMES[entry[3]], value=value.decode('utf-8'))
+
+    def get(self, key: object, default: object=None)->object:
+        """Point read of a single key
+        """
+        encoded_key = encode_key(key=key)
+        with self._lock:
+            entry = self.index.get(encoded_key)
+            if entry is None:
+                return default
+            return self._read_value(entry=entry)
+
+    def contains(self, key: object)->bool:
+        return encode_key(key=key) in self.index
+
+    def keys(self)->list:
+        with self._lock:
+            return [decode_key(key=key) for key in self.index]
+
+    def key_count(self)->int:
+        return len(self.index)
+
+    def read(self, read_processor: GenericIOProcessor=None, **kwarg)->GenericDataContainer:
+        """Read all keys into a dict container. Values are read in file order.
+
+        :param read_processor: GenericIOProcessor to run after the data was read (default=None)
+        :param result_set_name: str which is an optional argument for the name of the container (default=the directory)
+
+        :returns: GenericDataContainer
+        """
+        data = GenericDataContainer(result_set_name=kwarg.get('result_set_name', self.uri), data_type=dict, logger=self.logger)
+        with self._lock:
+            entries = sorted(self.index.items(), key=lambda item: (item[1][0], item[1][1], ))
+            values = {key: self._read_value(entry=entry) for key, entry in entries}
+            data.data = {decode_key(key=key): values[key] for key in self.index}
+        self.logger.info('{} keys read from "{}"'.format(len(data.data), self.uri))
+        if read_processor is not None:
+            if isinstance(read_processor, GenericIOProcessor):
+                read_processor.process(data=data, **kwarg)
+            else:
+                self.logger.error('Skipping processor - wrong type. Expected a GenericIOProcessor')
+        return data
+
+    def write(self, data: GenericDataContainer, write_processor: GenericIOProcessor=None, **kwarg):
+        """Replace the stored dict with the content of a dict container: every key is appended and keys that are not
+        in the container are deleted. To persist single key changes, use put() or a container from container().
+
+        :param data: GenericDataContainer of data type dict
+        :param write_processor: GenericIOProcessor to run after the data was written (default=None)
+        """
+        if not isinstance(data, GenericDataContainer) or data.data_type.__name__ != 'dict':
+            raise Exception('Expected a GenericDataContainer storing a dict')
+        records = [self._encode(key=key, value=value) for key, value in data.data.items()]
+        new_keys = set([record[0] for record in records])
+        with self._lock:
+            records.extend([self._tombstone(encoded_key=key) for key in self.index if key not in new_keys])
+            self._append(records=records)
+        self.logger.info('{} records written to "{}"'.format(len(records), self.uri))
+        if write_processor is not None:
+            if isinstance(write_processor, GenericIOProcessor):
+                write_processor.process(data=data, **kwarg)
+            else:
+                self.logger.error('Skipping processor - wrong type. Expected a GenericIOProcessor')
+
+    def container(self, result_set_name: str='anonymous', data_validator=None)->LogStructuredDataContainer:
+        """:returns: LogStructuredDataContainer holding the stored data, of which every store() is persisted
+        """
+        data = LogStructuredDataContainer(log_io=self, result_set_name=result_set_name, data_validator=data_validator, logger=self.logger)
+        data.data = self.read().data
+        return data
+
+    def needs_compaction(self)->bool:
+        return self.total_bytes > 0 and self.dead_bytes / self.total_bytes >= self.min_dead_ratio
+
+    def _sync_directory(self):
+        """fsync() the directory, so renamed and removed files are durable
+        """
+        fd = os.open(self.uri, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _remove_segments(self, file_ids: list):
+        """Remove merged segments, oldest first. Must be called while holding the lock
+        """
+        for file_id in file_ids:
+            os.close(self._fds.pop(file_id))
+            os.remove(self._path(file_id=file_id))
+            if os.path.exists(self._path(file_id=file_id, suffix='.hint')):
+                os.remove(self._path(file_id=file_id, suffix='.hint'))
+
+    def compact(self)->int:
+        """Merge all segments except the active one into a single segment with only the live records
+
+        The merged segment gets a new id, higher than the ids of the segments it replaces and lower than the id of the
+        active segment. Until the old segments are removed, their records (including the tombstones) are shadowed by
+        the merged segment and replayed in the same order, so a crash at any point can not bring a deleted key back.
+
+        :returns: int number of bytes reclaimed
+        """
+        with self._compaction_lock:
+            with self._lock:
+                if self._active_size > 0:
+                    self._roll()
+                merged_ids = sorted([file_id for file_id in self._fds if file_id != self._active_id])
+                if len(merged_ids) == 0:
+                    return 0
+                snapshot = {key: entry for key, entry in self.index.items() if entry[0] in merged_ids}
+                if len(merged_ids) == 1 and sum([entry[4] for entry in snapshot.values()]) == os.fstat(self._fds[merged_ids[0]]).st_size:
+                    return 0    # Already a single segment without dead records
+                total_bytes_before = self.total_bytes
+                # The (empty) active segment becomes the merged segment, and writes continue in a new one
+                target_id = self._active_id
+                self._roll()
+            # Segments other than the active one are never modified, so they can be read without holding the lock
+            new_entries = dict()
+            offset = 0
+            with open(self._path(file_id=target_id, suffix='.log.tmp'), 'wb') as data_file, open(self._path(file_id=target_id, suffix='.hint.tmp'), 'wb') as hint_file:
+                for key, entry in sorted(snapshot.items(), key=lambda item: (item[1][0], item[1][1], )):
+                    key_bytes = key.encode('utf-8')
+                    value_bytes = os.pread(self._fds[entry[0]], entry[2], entry[1])
+                    record = encode_record(key=key_bytes, value=value_bytes, value_type=entry[3])
+                    data_file.write(record)
+                    value_offset = offset + RECORD_HEADER.size + len(key_bytes)
+                    hint_file.write(HINT_HEADER.pack(len(key_bytes), value_offset, len(value_bytes), entry[3]))
+                    hint_file.write(key_bytes)
+                    new_entries[key] = (target_id, value_offset, len(value_bytes), entry[3], len(record), )
+                    offset = offset + len(record)
+                data_file.flush()
+                os.fsync(data_file.fileno())
+                hint_file.flush()
+                os.fsync(hint_file.fileno())
+            with self._lock:
+                os.rename(self._path(file_id=target_id, suffix='.log.tmp'), self._path(file_id=target_id))
+                os.close(self._fds[target_id])
+                self._fds[target_id] = os.open(self._path(file_id=target_id), os.O_RDWR | os.O_APPEND)
+                for key, entry in new_entries.items():
+                    if self.index.get(key) == snapshot[key]:
+                        self.index[key] = entry
+                os.rename(self._path(file_id=target_id, suffix='.hint.tmp'), self._path(file_id=target_id, suffix='.hint'))
+                self._sync_directory()
+                self._remove_segments(file_ids=merged_ids)
+                self._sync_directory()
+                self.total_bytes = sum([os.fstat(fd).st_size for fd in self._fds.values()])
+                self.dead_bytes = self.total_bytes - sum([entry[4] for entry in self.index.values()])
+                reclaimed = total_bytes_before - self.total_bytes
+        self.logger.info('Compacted {} segments of "{}" - {} bytes reclaimed'.format(len(merged_ids), self.uri, reclaimed))
+        return reclaimed
+
+    def sync(self):
+        with self._lock:
+            os.fsync(self._fds[self._active_id])
+
+    def _run(self):
+        while not self._stop_event.wait(self.compaction_interval):
+            try:
+                if self.needs_compaction():
+                    self.compact()
+            except Exception as e:  # pragma: no cover
+                self.logger.error('Compaction failed: {}'.format(e))
+
+    def start(self):
+        """Start the background compaction thread
+        """
+        if self._thread is None:
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='LogStructuredIO', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self)->bool:
+        return self._thread is not None
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds = dict()
+
+# EOF
@@ -0,0 +1,205 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Streaming reads and writes of newline-delimited JSON (NDJSON) files
+
+Records are read lazily, one line at a time, and validated as they stream - memory use does not depend on the size of
+the file. Example:
+
+    >>> ndjson_io = NDJsonIO(file_folder_path='/data', file_name='events.ndjson', data_validator=EventValidator())
+    >>> for batch in ndjson_io.batches(batch_size=10000):     # list GenericDataContainers
+    ...     process(batch.data)
+    >>> with ndjson_io.writer(append=True) as writer:
+    ...     for event in new_events():
+    ...         writer.write_record(record=event)
+
+Writers collect the UTF-8 encoded records in memory and write them in chunks of at least buffer_size bytes. read() returns
+all records in a single list container and is only meant for files that fit in memory.
+"""
+
+import os
+import json
+from oculusd_utils.persistence import L, GenericIO, GenericIOProcessor, GenericDataContainer
+from oculusd_utils.security.validation import DataValidator
+
+
+class NDJsonWriter:
+    """Buffered NDJSON record writer. Use it as a context manager, or call close() when done.
+    """
+
+    def __init__(self, uri: str, append: bool=False, buffer_size: int=1024*1024, logger=L):
+        self.uri = uri
+        self.buffer_size = buffer_size
+        self.logger = logger
+        self.record_count = 0
+        self._buffer = list()
+        self._buffered_bytes = 0
+        self._encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+        self._file = open(uri, 'ab' if append is True else 'wb')
+
+    def write_record(self, record: object):
+        line = (self._encoder.encode(record) + '\n').encode('utf-8')
+        self._buffer.append(line)
+        self._buffered_bytes = self._buffered_bytes + len(line)
+        self.record_count = self.record_count + 1
+        if self._buffered_bytes >= self.buffer_size:
+            self.flush()
+
+    def write_records(self, records: object)->int:
+        """:param records: iterable of records, for example a generator
+        :returns: int number of records written
+        """
+        count = 0
+        for record in records:
+            self.write_record(record=record)
+            count = count + 1
+        return count
+
+    def flush(self):
+        if len(self._buffer) > 0:
+            self._file.write(b''.join(self._buffer))
+            self._buffer = list()
+            self._buffered_bytes = 0
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed is False:
+            self.flush()
+            self._file.close()
+            self.logger.info('{} records written to "{}"'.format(self.record_count, self.uri))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class NDJsonIO(GenericIO):
+
+    def __init__(
+        self,
+        file_folder_path: str,
+        file_name: str,
+        data_validator: DataValidator=None,
+        skip_invalid: bool=False,
+        batch_size: int=1000,
+        buffer_size: int=1024*1024,
+        logger=L
+    ):
+        """
+        :param file_folder_path: str with the directory of the file
+        :param file_name: str with the file name
+        :param data_validator: DataValidator used to validate every record as it is read (default=None)
+        :param skip_invalid: bool to skip (and log) records that fail validation, instead of raising an Exception (default=False)
+        :param batch_size: int default number of records per batch (default=1000)
+        :param buffer_size: int number of bytes read, or buffered by writers, at a time (default=1048576)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if data_validator is not None and not isinstance(data_validator, DataValidator):
+            raise Exception('Invalid data validator type. Expected an implementation of DataValidator')
+        if batch_size < 1:
+            raise Exception('batch_size must be at least 1')
+        super().__init__(uri='{}{}{}'.format(file_folder_path, os.sep, file_name), logger=logger)
+        self.data_validator = data_validator
+        self.skip_invalid = skip_invalid
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.skipped_count = 0
+
+    def records(self, **kwarg):
+        """Generator of the validated records in the file. Blank lines are ignored.
+
+        :param kwarg: passed on to the DataValidator
+        """
+        decode = json.JSONDecoder().decode
+        validator = self.data_validator
+        line_number = 0
+        with open(self.uri, 'rb', buffering=self.buffer_size) as f:
+            for line in f:
+                line_number = line_number + 1
+                if line.isspace():
+                    continue
+                try:
+                    record = decode(line.decode('utf-8'))
+                except ValueError:
+                    if self.skip_invalid is True:
+                        self.logger.warning('Skipping line {} of "{}" - not valid JSON'.format(line_number, self.uri))
+                        self.skipped_count = self.skipped_count + 1
+                        continue
+                    raise Exception('Line {} of "{}" is not valid JSON'.format(line_number, self.uri))
+                if validator is not None and not validator.validate(data=record, **kwarg):
+                    if self.skip_invalid is True:
+                        self.logger.warning('Skipping line {} of "{}" - validation failed'.format(line_number, self.uri))
+                        self.skipped_count = self.skipped_count + 1
+                        continue
+                    raise Exception('Record validation failed on line {}'.format(line_number))
+                yield record
+
+    def _container(self, records: list)->GenericDataContainer:
+        # The records were validated as they were read - they are not validated again
+        data = GenericDataContainer(result_set_name=self.uri, data_type=list, logger=self.logger)
+        data.data = records
+        return data
+
+    def batches(self, batch_size: int=None, **kwarg):
+        """Generator of list GenericDataContainers with up to batch_size records each
+
+        :param batch_size: int number of records per container (default=None, which uses the batch_size of the instance)
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
+        batch = list()
+        for record in self.records(**kwarg):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield self._container(records=batch)
+                batch = list()
+        if len(batch) > 0:
+            yield self._container(records=batch)
+
+    def read(self, read_processor: GenericIOProcessor=None, **kwarg)->GenericDataContainer:
+        """Read all records into a single list container
+
+        :param read_processor: GenericIOProcessor to run on the result (default=None)
+        :returns: GenericDataContainer
+        """
+        data = self._container(records=list(self.records(**kwarg)))
+        self.logger.info('{} records read.'.format(len(data.data)))
+        if read_processor is not None:
+            if isinstance(read_processor, GenericIOProcessor):
+                read_processor.process(data=data, **kwarg)
+            else:
+                self.logger.error('Skipping processor - wrong type. Expected a GenericIOProcessor')
+        return data
+
+    def writer(self, append: bool=False)->NDJsonWriter:
+        """:param append: bool to add records to the end of the file instead of replacing it (default=False)
+        """
+        return NDJsonWriter(uri=self.uri, append=append, buffer_size=self.buffer_size, logger=self.logger)
+
+    def write(self, data: GenericDataContainer, write_processor: GenericIOProcessor=None, **kwarg):
+        """Write every item of a list or tuple container as one record, or a dict container as a single record
+
+        :param data: GenericDataContainer
+        :param write_processor: GenericIOProcessor to run after writing (default=None)
+        :param append: bool which is an optional argument. If the keyword is present and True, records are added to the end of the file
+        """
+        data_type_name = data.data_type.__name__
+        if data_type_name not in ('list', 'tuple', 'dict'):
+            raise Exception('NDJsonIO only supports the list, tuple and dict data types')
+        with self.writer(append=kwarg.get('append', False)) as writer:
+            if data_type_name == 'dict':
+                writer.write_record(record=data.data)
+            else:
+                writer.write_records(records=data.data)
+        if write_processor is not None:
+            if isinstance(write_processor, GenericIOProcessor):
+                write_processor.process(data=data, **kwarg)
+            else:
+                self.logger.error('Skipping processor - wrong type. Expected a GenericIOProcessor')
+
+# EOF
@@ -0,0 +1,129 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Scalar containers for values that are updated very often, such as counters and gauges
+
+A GenericDataContainer with an int, float or Decimal data type checks the type of every stored value with a chain of
+isinstance() calls, and NumberDataValidator.validate() then checks the type again before it compares the value with
+the keyword arguments. A ScalarDataContainer does this work once:
+
+* The conversion for an input type is looked up once and then kept in a small cache (type -> function), so storing
+  an int in an int container costs one dict lookup
+* The validation parameters are given when the container is created. With a NumberDataValidator they are turned into
+  a single comparison function; other validators are called with the bound parameters
+
+Example:
+
+    >>> gauge = ScalarDataContainer(result_set_name='cpu_load', data_type=float, data_validator=NumberDataValidator(), validation_parameters={'min_value': 0.0})
+    >>> gauge.store(data=0.75)
+    1
+
+Keyword arguments given to store() replace the bound validation parameters for that call, which is as slow as a
+GenericDataContainer. The stored value only changes when validation passes.
+"""
+
+from decimal import Decimal
+from oculusd_utils.persistence import L, GenericDataContainer, parse_int
+from oculusd_utils.security.validation import DataValidator, NumberDataValidator
+
+
+def _same(data: object)->object:
+    return data
+
+
+# The conversions per container data type and input type. Other input types are rejected.
+CONVERSIONS = {
+    int: {int: _same, float: int, str: parse_int},
+    float: {float: _same, int: float, str: float},
+    Decimal: {Decimal: _same, str: Decimal, int: Decimal, float: Decimal},
+}
+
+
+def number_range_check(data_type: object, min_value: object=None, max_value: object=None):
+    """Build the check NumberDataValidator.validate() does for the data type and the bound parameters, as one function
+
+    :returns: function(value)->bool, or None when there is nothing to check
+    """
+    if data_type is Decimal:
+        for value in (min_value, max_value, ):
+            if value is not None and not isinstance(value, Decimal):
+                raise Exception('min_value and max_value parameters must be a Decimal')
+        if min_value is not None and max_value is not None:
+            return lambda value: not value.compare(min_value) < 0 and not value.compare(max_value) > 0
+        if min_value is not None:
+            return lambda value: not value.compare(min_value) < 0
+        if max_value is not None:
+            return lambda value: not value.compare(max_value) > 0
+        return None
+    if min_value is not None and max_value is not None:
+        return lambda value: not value < min_value and not value > max_value
+    if min_value is not None:
+        return lambda value: not value < min_value
+    if max_value is not None:
+        return lambda value: not value > max_value
+    return None
+
+
+class ScalarDataContainer(GenericDataContainer):
+
+    def __init__(
+        self,
+        result_set_name: str='anonymous',
+        data_type: object=int,
+        data_validator: DataValidator=None,
+        validation_parameters: dict=None,
+        logger=L
+    ):
+        """
+        :param result_set_name: str (default='anonymous')
+        :param data_type: int, float or Decimal (default=int)
+        :param data_validator: DataValidator (default=None)
+        :param validation_parameters: dict of keyword arguments for the validator, for example {'min_value': 0} (default=None)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if data_type not in CONVERSIONS:
+            raise Exception('ScalarDataContainer only supports the int, float and Decimal data types')
+        super().__init__(result_set_name=result_set_name, data_type=data_type, data_validator=data_validator, logger=logger)
+        self.validation_parameters = dict() if validation_parameters is None else dict(validation_parameters)
+        self._conversions = dict()
+        self._check = None
+        self._failure_message = None    # Logged when the check fails - other validators log their own messages
+        if type(data_validator) is NumberDataValidator and set(self.validation_parameters.keys()) <= {'min_value', 'max_value'}:
+            self._check = number_range_check(data_type=data_type, **self.validation_parameters)
+            self._failure_message = 'Decimal validation failed' if data_type is Decimal else 'Number validation failed'
+        elif data_validator is not None:
+            validate = data_validator.validate
+            parameters = self.validation_parameters
+            self._check = lambda value: validate(data=value, **parameters)
+
+    def _conversion(self, input_type: object):
+        conversion = self._conversions.get(input_type)
+        if conversion is None:
+            conversion = CONVERSIONS[self.data_type].get(input_type)
+            if conversion is None:
+                raise Exception('Can not store a "{}" in a {} container'.format(input_type.__name__, self.data_type.__name__))
+            self._conversions[input_type] = conversion
+        return conversion
+
+    def store(self, data: object, key: object=None, **kwarg)->int:
+        conversion = self._conversions.get(type(data))
+        if conversion is None:
+            conversion = self._conversion(input_type=type(data))
+        value = conversion(data)
+        if len(kwarg) > 0:
+            if self.data_validator is not None:
+                parameters = dict(self.validation_parameters)
+                parameters.update(kwarg)
+                if self.data_validator.validate(data=value, **parameters) is False:
+                    raise Exception('Input validation failed')
+        elif self._check is not None and not self._check(value):
+            if self._failure_message is not None:
+                self.logger.error(self._failure_message)
+            raise Exception('Input validation failed')
+        self.data = value
+        return 1
+
+# EOF
@@ -0,0 +1,337 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""A cross-process cache for file data, backed by memory mapped files in /dev/shm
+
+Intended for pre-fork worker pools: one process loads a file and all processes read the same (shared) memory pages,
+instead of each worker keeping its own copy. Usage:
+
+    >>> cache = SharedMemoryCache(name='my-app')      # create before forking the workers
+    >>> tfio = TextFileIO(file_folder_path='/data', file_name='big.json', enable_cache=True, cache_backend=cache)
+    >>> tfio.read()                                     # the first reader loads the file, all others read shared memory
+    >>> buffer = cache.get_buffer(key=tfio.uri)         # or zero-copy access to the raw bytes (read only memoryview)
+
+Layout of the cache directory:
+
+* "index" - a small memory mapped file with a header and a fixed number of slots. Every slot holds the digest of a
+  key, the version stamp and size of the data and the (monotonic) time it was stored
+* "<digest>-<version>.dat" - one file per cached value, never modified after it was published
+
+Concurrency and crash safety:
+
+* writers serialise on an flock() of the index file. The kernel releases the lock when a process dies, so a crashed
+  worker can never block the others
+* data files are written to a temporary file and renamed into place before the slot is updated, so a crash while
+  writing never exposes partial data. Temporary files are only written with the lock held, so the temporary files
+  left behind by a crashed writer are removed when the next process opens the cache
+* slots are updated with a sequence counter (seqlock): the counter is odd while a slot is being written. Readers do
+  not lock - they retry when the counter changed while reading, and treat a slot that stays odd (a writer crashed
+  half way) as empty. The next writer of that slot repairs it
+* replaced data files are unlinked, but processes that still have the old version mapped keep a valid mapping
+
+The monotonic clock used for max_age is system wide on Linux, so ages are comparable between processes. It restarts
+at boot: an entry stored before a reboot (when the cache directory is not cleared at boot) has a negative age and is
+treated as expired when a max_age is given. POSIX only.
+"""
+
+import os
+import mmap
+import struct
+import hashlib
+import tempfile
+import time
+from oculusd_utils.persistence import L, CacheBackend
+
+
+INDEX_MAGIC = b'ODCSHM01'
+HEADER_FORMAT = '<8sQQ'             # magic, slot count, last version stamp
+HEADER_SIZE = 64
+SLOT_FORMAT = '<QQQd16s'            # sequence counter, version, size, stored at (monotonic), key digest
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+EMPTY_DIGEST = b'\x00' * 16
+MAX_PROBES = 16
+MAX_READ_RETRIES = 64
+
+
+def default_cache_directory()->str:
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()    # pragma: no cover
+
+
+def key_digest(key: str)->bytes:
+    return hashlib.blake2b('{}'.format(key).encode('utf-8'), digest_size=16).digest()
+
+
+class SharedMemoryCache(CacheBackend):
+
+    def __init__(self, name: str='default', slot_count: int=1024, directory: str=None, clock=time.monotonic, logger=L):
+        """
+        :param name: str name of the cache. All processes using the same name (and directory) share the cache
+        :param slot_count: int maximum number of cached values - only used by the process that creates the cache (default=1024)
+        :param directory: str parent directory of the cache (default=/dev/shm if it exists, otherwise the temporary directory)
+        :param clock: callable returning a system wide monotonic time in seconds (default=time.monotonic)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        try:
+            import fcntl
+        except ImportError:     # pragma: no cover
+            raise Exception('SharedMemoryCache requires a POSIX operating system')
+        self._fcntl = fcntl
+        if directory is None:
+            directory = default_cache_directory()
+        self.path = os.path.join(directory, 'odc-cache-{}'.format(name))
+        self.clock = clock
+        self.logger = logger
+        os.makedirs(self.path, exist_ok=True)
+        self.index_path = os.path.join(self.path, 'index')
+        self._pid = None
+        self._index_fd = None
+        self._index = None
+        self._mapped = dict()   # digest -> (version, mmap) of this process
+        self._open_index(slot_count=slot_count)
+
+    def _open_index(self, slot_count: int):
+        fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._fcntl.flock(fd, self._fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size < HEADER_SIZE:
+                os.ftruncate(fd, HEADER_SIZE + slot_count * SLOT_SIZE)
+                os.pwrite(fd, struct.pack(HEADER_FORMAT, INDEX_MAGIC, slot_count, 0), 0)
+            magic, existing_slot_count, last_version = struct.unpack(HEADER_FORMAT, os.pread(fd, struct.calcsize(HEADER_FORMAT), 0))
+            if magic != INDEX_MAGIC:
+                raise Exception('"{}" is not a shared memory cache index'.format(self.index_path))
+            self.slot_count = existing_slot_count
+            self._index = mmap.mmap(fd, HEADER_SIZE + existing_slot_count * SLOT_SIZE)
+            self._remove_temporary_files()
+        finally:
+            self._fcntl.flock(fd, self._fcntl.LOCK_UN)
+        self._index_fd = fd
+        self._pid = os.getpid()
+
+    def _remove_temporary_files(self):
+        # Called with the lock held: no other process is writing, so every temporary file was left by a crashed writer
+        for file_name in os.listdir(self.path):
+            if file_name.startswith('.tmp-'):
+                try:
+                    os.unlink(os.path.join(self.path, file_name))
+                    self.logger.warning('Removed temporary file "{}" left by a crashed writer'.format(file_name))
+                except FileNotFoundError:     # pragma: no cover
+                    pass
+
+    def _ensure_process(self):
+        """flock() locks belong to the open file description, which is shared with forked children - every process
+        needs its own descriptor to be excluded from the others
+        """
+        if self._pid != os.getpid():
+            # The inherited index mapping is shared memory and stays valid - only the lock descriptor is replaced
+            self._index_fd = os.open(self.index_path, os.O_RDWR)
+            self._mapped = dict()
+            self._pid = os.getpid()
+
+    def _slot_offset(self, slot: int)->int:
+        return HEADER_SIZE + slot * SLOT_SIZE
+
+    def _read_slot(self, slot: int)->tuple:
+        """Consistent (lock free) read of a slot
+
+        :returns: tuple of (version, size, stored_at, digest) or None if the slot is being written or was left in an inconsistent state
+        """
+        offset = self._slot_offset(slot=slot)
+        for attempt in range(MAX_READ_RETRIES):
+            sequence, version, size, stored_at, digest = struct.unpack_from(SLOT_FORMAT, self._index, offset)
+            if sequence % 2 == 1:
+                time.sleep(0)
+                continue
+            if struct.unpack_from('<Q', self._index, offset)[0] == sequence:
+                return version, size, stored_at, digest
+        return None
+
+    def _write_slot(self, slot: int, version: int, size: int, stored_at: float, digest: bytes):
+        """Must be called while holding the index lock
+        """
+        offset = self._slot_offset(slot=slot)
+        sequence = struct.unpack_from('<Q', self._index, offset)[0]
+        if sequence % 2 == 0:
+            sequence = sequence + 1
+        struct.pack_into('<Q', self._index, offset, sequence)
+        struct.pack_into(SLOT_FORMAT, self._index, offset, sequence, version, size, stored_at, digest)
+        struct.pack_into('<Q', self._index, offset, sequence + 1)
+
+    def _probe(self, digest: bytes):
+        start = int.from_bytes(digest[:8], 'little') % self.slot_count
+        for probe in range(min(MAX_PROBES, self.slot_count)):
+            yield (start + probe) % self.slot_count
+
+    def _find(self, digest: bytes)->tuple:
+        """:returns: tuple of (slot, version, size, stored_at) or None
+        """
+        for slot in self._probe(digest=digest):
+            slot_data = self._read_slot(slot=slot)
+            if slot_data is None:
+                continue
+            if slot_data[3] == digest:
+                return slot, slot_data[0], slot_data[1], slot_data[2]
+            if slot_data[3] == EMPTY_DIGEST:
+                return None
+        return None
+
+    def _data_path(self, digest: bytes, version: int)->str:
+        return os.path.join(self.path, '{}-{}.dat'.format(digest.hex(), version))
+
+    def _lock(self):
+        self._ensure_process()
+        self._fcntl.flock(self._index_fd, self._fcntl.LOCK_EX)
+
+    def _unlock(self):
+        self._fcntl.flock(self._index_fd, self._fcntl.LOCK_UN)
+
+    def _remove_data_file(self, digest: bytes, version: int):
+        if digest != EMPTY_DIGEST and version > 0:
+            try:
+                os.unlink(self._data_path(digest=digest, version=version))
+            except FileNotFoundError:
+                pass
+
+    def put(self, key: str, data: bytes)->int:
+        """Store the bytes for a key, replacing any older version
+
+        :returns: int version stamp of the stored data
+        """
+        digest = key_digest(key=key)
+        self._lock()
+        try:
+            magic, slot_count, last_version = struct.unpack_from(HEADER_FORMAT, self._index, 0)
+            version = last_version + 1
+            struct.pack_into(HEADER_FORMAT, self._index, 0, magic, slot_count, version)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.rename(tmp_path, self._data_path(digest=digest, version=version))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            target_slot = None
+            for slot in self._probe(digest=digest):
+                slot_data = self._read_slot(slot=slot)
+                if slot_data is None or slot_data[3] in (digest, EMPTY_DIGEST):
+                    target_slot = slot
+                    break
+            if target_slot is None:
+                # All probed slots are taken by other keys - evict the entry stored the longest time ago
+                target_slot = min(self._probe(digest=digest), key=lambda slot: self._read_slot(slot=slot)[2])
+            old_slot_data = self._read_slot(slot=target_slot)
+            self._write_slot(slot=target_slot, version=version, size=len(data), stored_at=self.clock(), digest=digest)
+            if old_slot_data is not None:
+                self._remove_data_file(digest=old_slot_data[3], version=old_slot_data[0])
+        finally:
+            self._unlock()
+        self.logger.debug('Stored {} bytes for key "{}" with version {}'.format(len(data), key, version))
+        return version
+
+    def version(self, key: str)->int:
+        """:returns: int version stamp of the current data of the key, or 0 if the key is not cached
+        """
+        found = self._find(digest=key_digest(key=key))
+        if found is None:
+            return 0
+        return found[1]
+
+    def get_buffer(self, key: str, max_age: float=None)->memoryview:
+        """Zero-copy access to the cached bytes
+
+        :param key: str
+        :param max_age: float maximum age in seconds (default=None, which means no age limit)
+        :returns: read only memoryview of the shared data, or None if the key is not cached (or too old)
+        """
+        self._ensure_process()
+        digest = key_digest(key=key)
+        found = self._find(digest=digest)
+        if found is None:
+            return None
+        slot, version, size, stored_at = found
+        if version == 0:
+            return None     # invalidated
+        if max_age is not None:
+            age = self.clock() - stored_at
+            if age < 0 or age >= max_age:
+                return None     # Too old, or stored before the monotonic clock was reset by a reboot
+        if size == 0:
+            return memoryview(b'')
+        mapped = self._mapped.get(digest)
+        if mapped is None or mapped[0] != version:
+            try:
+                with open(self._data_path(digest=digest, version=version), 'rb') as f:
+                    mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                return None     # replaced or invalidated after the index was read
+            if mapped is not None:
+                self._close_mapping(mapping=mapped[1])
+            self._mapped[digest] = (version, mapping, )
+            mapped = self._mapped[digest]
+        return memoryview(mapped[1])
+
+    def get(self, key: str, max_age: float=None)->bytes:
+        buffer = self.get_buffer(key=key, max_age=max_age)
+        if buffer is None:
+            return None
+        return buffer.tobytes()
+
+    def get_text(self, key: str, max_age: float=None)->str:
+        """Decodes the shared bytes into a new str on every call, which is a copy - use get_buffer() for zero-copy access
+        """
+        buffer = self.get_buffer(key=key, max_age=max_age)
+        if buffer is None:
+            return None
+        return str(buffer, 'utf-8')
+
+    def put_text(self, key: str, text: str, signature: tuple=None)->int:
+        """Store the UTF-8 encoded text - entries expire by age, so the signature is not used
+        """
+        return self.put(key=key, data=text.encode('utf-8'))
+
+    def invalidate(self, key: str):
+        digest = key_digest(key=key)
+        self._lock()
+        try:
+            found = self._find(digest=digest)
+            if found is not None:
+                slot, version, size, stored_at = found
+                # Keep the slot occupied with a version of 0 so that probing for other keys continues past it
+                self._write_slot(slot=slot, version=0, size=0, stored_at=0.0, digest=digest)
+                self._remove_data_file(digest=digest, version=version)
+        finally:
+            self._unlock()
+
+    def _close_mapping(self, mapping):
+        try:
+            mapping.close()
+        except BufferError:
+            pass    # memoryviews handed out are still alive - the mapping is released when they are garbage collected
+
+    def close(self):
+        """Release the resources of this process. The cache itself remains available to other processes.
+        """
+        for version, mapping in self._mapped.values():
+            self._close_mapping(mapping=mapping)
+        self._mapped = dict()
+        if self._index is not None:
+            self._close_mapping(mapping=self._index)
+            self._index = None
+        if self._index_fd is not None:
+            os.close(self._index_fd)
+            self._index_fd = None
+
+    def destroy(self):
+        """Close the cache and remove all its files. Call this only from the process that owns the cache.
+        """
+        self.close()
+        for file_name in os.listdir(self.path):
+            os.unlink(os.path.join(self.path, file_name))
+        os.rmdir(self.path)
+
+# EOF
@@ -0,0 +1,215 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Copy-on-write snapshots and dirty tracking for dict and list containers
+
+A snapshot is a read-only view of the data at the time it was taken. Taking one does not copy anything - the container
+only remembers that its current dict is shared, and the first change after the snapshot copies it (once) before
+changing it. Lists are not copied at all, because a list container only grows and a list snapshot only sees its own
+length. Readers can keep using a snapshot for as long as they like without any locking, and writers never wait
+for them. Example:
+
+    >>> data = SnapshotDataContainer(result_set_name='events', data_type=dict, data_validator=MyValidator())
+    >>> data.store(data=event, key=event_id)
+    >>> view = data.snapshot()          # read-only, never changes
+    >>> data.store(data=other_event, key=other_event_id)
+    >>> other_event_id in view
+    False
+
+The container also tracks what changed since the last call to take_changes(): the stored and deleted dict keys, or
+the new list indices. Backends can use this to write only what changed:
+
+    >>> snapshot, changed, deleted, full = data.take_changes(changes_only=True)
+    >>> if full:
+    ...     write_everything(snapshot)
+    ... else:
+    ...     write_keys({key: snapshot[key] for key in changed}, deleted)
+
+The first change after a dict snapshot copies the whole dict, which is O(n). A backend that only writes the changed
+keys should call take_changes(changes_only=True): unless a full write is needed, its snapshot then only holds the
+changed keys, the dict is not shared, and the next store() does not copy it.
+
+A list container only grows through store(), so its changes are always the indices from the previous length onwards.
+Assigning the data attribute directly replaces everything and makes the next take_changes() report a full write.
+"""
+
+import threading
+from types import MappingProxyType
+from collections.abc import Sequence
+from oculusd_utils.persistence import L, GenericDataContainer
+from oculusd_utils.security.validation import DataValidator
+
+
+class ListSnapshot(Sequence):
+    """A read-only view of a list. Items appended to the list after the snapshot was taken are not visible.
+    """
+
+    def __init__(self, items: list, length: int=None):
+        self._items = items
+        self._length = len(items) if length is None else length
+
+    def __len__(self)->int:
+        return self._length
+
+    def __getitem__(self, index: object)->object:
+        if isinstance(index, slice):
+            return [self._items[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index = index + self._length
+        if index < 0 or index >= self._length:
+            raise IndexError('list index out of range')
+        return self._items[index]
+
+    def __eq__(self, other: object)->bool:
+        if isinstance(other, (ListSnapshot, list, tuple, )):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self)->str:
+        return 'ListSnapshot({!r})'.format(list(self))
+
+
+class SnapshotDataContainer(GenericDataContainer):
+
+    def __init__(self, result_set_name: str='anonymous', data_type: object=dict, data_validator: DataValidator=None, logger=L):
+        """
+        :param result_set_name: str (default='anonymous')
+        :param data_type: dict or list (default=dict)
+        :param data_validator: DataValidator (default=None)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if data_type.__name__ not in ('dict', 'list'):
+            raise Exception('SnapshotDataContainer only supports the dict and list data types')
+        self._lock = threading.Lock()
+        self._data = None
+        self._shared = False
+        self.version = 0
+        self._changed_keys = set()
+        self._deleted_keys = set()
+        self._clean_length = 0
+        self._full_write = False
+        super().__init__(result_set_name=result_set_name, data_type=data_type, data_validator=data_validator, logger=logger)
+        self._full_write = False
+
+    @property
+    def data(self)->object:
+        """The live dict or list. It must not be changed directly - use store() and delete(), or snapshot() for a
+        stable view.
+        """
+        return self._data
+
+    @data.setter
+    def data(self, value: object):
+        with self._lock:
+            self._data = value
+            self._shared = False
+            self._changed_keys = set()
+            self._deleted_keys = set()
+            self._clean_length = 0
+            self._full_write = True
+            self.version = self.version + 1
+
+    def _unshare(self):
+        # Called with the lock held, before every change: a snapshot still uses the current object
+        if self._shared is True:
+            self._data = self._data.copy()
+            self._shared = False
+
+    def _store_dict(self, data: object, key: object, **kwarg)->int:
+        with self._lock:
+            self._unshare()
+            result = super()._store_dict(data=data, key=key, **kwarg)
+            self._changed_keys.add(key)
+            self._deleted_keys.discard(key)
+            self.version = self.version + 1
+        return result
+
+    def _store_list(self, data: object, key: object=None, **kwarg)->int:
+        with self._lock:
+            self._unshare()
+            result = super()._store_list(data=data, key=key, **kwarg)
+            self.version = self.version + 1
+        return result
+
+    def delete(self, key: object)->bool:
+        """Delete a dict key
+
+        :returns: bool True if the key was stored
+        """
+        if self.data_type.__name__ != 'dict':
+            raise Exception('delete() is only supported for the dict data type')
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._unshare()
+            del self._data[key]
+            self._changed_keys.discard(key)
+            self._deleted_keys.add(key)
+            self.version = self.version + 1
+        return True
+
+    def _snapshot(self)->object:
+        # Called with the lock held
+        if self.data_type.__name__ == 'dict':
+            self._shared = True
+            return MappingProxyType(self._data)
+        # A list only grows, and a ListSnapshot only sees its own length - the list can be shared without copying
+        return ListSnapshot(items=self._data)
+
+    def snapshot(self)->object:
+        """:returns: a read-only view of the current data - a mapping for dict containers, or a ListSnapshot for list containers
+        """
+        with self._lock:
+            return self._snapshot()
+
+    def is_dirty(self)->bool:
+        return self._full_write is True or len(self._changed_keys) > 0 or len(self._deleted_keys) > 0 or (
+            self.data_type.__name__ == 'list' and len(self._data) > self._clean_length
+        )
+
+    def dirty_keys(self)->set:
+        """:returns: set of dict keys stored, or list indices appended, since the last take_changes()
+        """
+        if self.data_type.__name__ == 'list':
+            return set(range(self._clean_length, len(self._data)))
+        return set(self._changed_keys)
+
+    def deleted_keys(self)->set:
+        return set(self._deleted_keys)
+
+    def mark_clean(self):
+        """Forget all tracked changes, for example after the data was loaded from storage
+        """
+        with self._lock:
+            self._changed_keys = set()
+            self._deleted_keys = set()
+            self._clean_length = len(self._data)
+            self._full_write = False
+
+    def take_changes(self, changes_only: bool=False)->tuple:
+        """Take a snapshot together with the changes made since the previous call, and start tracking again
+
+        :param changes_only: bool for dict containers: unless full is True, the snapshot only holds the changed keys, so that the dict is not shared and the next change does not copy it (default=False)
+        :returns: tuple (snapshot, changed, deleted, full) where changed is a sorted list of list indices or a set of dict keys, deleted is a set of dict keys and full is True when everything must be written
+        """
+        with self._lock:
+            if self.data_type.__name__ == 'list':
+                snapshot = self._snapshot()
+                changed = list(range(self._clean_length, len(snapshot)))
+            else:
+                changed = self._changed_keys
+                if changes_only is True and self._full_write is False:
+                    snapshot = MappingProxyType({key: self._data[key] for key in changed})
+                else:
+                    snapshot = self._snapshot()
+            result = (snapshot, changed, self._deleted_keys, self._full_write, )
+            self._changed_keys = set()
+            self._deleted_keys = set()
+            self._clean_length = len(self._data)
+            self._full_write = False
+        return result
+
+# EOF
@@ -0,0 +1,293 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""List containers that can grow larger than memory by paging older items out to disk
+
+A SpillableListContainer is a list GenericDataContainer whose data is a SpillableList instead of a list. The calling
+code does not change - store() appends, and data supports len(), iteration, indexing and slicing:
+
+    >>> data = SpillableListContainer(result_set_name='readings', max_memory_items=1000000, typecode='d')
+    >>> for reading in sensor_stream():
+    ...     data.store(data=reading)
+    >>> data.data[-1], sum(data.data)
+
+Items are kept in fixed-size chunks of chunk_size items. Only the newest chunks (up to max_memory_items items) stay in
+memory; older chunks are written to a temporary file, in the order they were stored:
+
+* With a typecode ('d' for floats, 'q' for integers) the chunks are array.array values, written as raw bytes at
+  fixed offsets. Spilled items are read through an mmap of the file, one item at a time - nothing is decoded that is
+  not used
+* Without a typecode the chunks are lists of any picklable values, pickled one chunk at a time. Reading a spilled item
+  loads its whole chunk, so the last cache_chunks loaded chunks are kept in a small LRU cache
+
+Iteration reads every spilled chunk once, in order, without filling the cache. The spill file is private to the
+instance and is deleted by close(), or when the instance is garbage collected.
+
+A SpillableList compares equal to a list or tuple with the same items, and its repr() is that of the list. It is not
+a list subclass, so json.dumps() does not accept it - use json.dumps(list(items)), or write the items one per line
+with NDJsonIO. The writers in this package (TextFileIO, NDJsonIO, SQLiteIO, DeltaFileIO) iterate over the items.
+"""
+
+import os
+import mmap
+import pickle
+import struct
+import tempfile
+import weakref
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from oculusd_utils.persistence import L, GenericDataContainer, MemoryBudget, deep_size
+from oculusd_utils.security.validation import DataValidator
+
+
+NUMERIC_TYPECODES = ('b', 'B', 'h', 'H', 'i', 'I', 'l', 'L', 'q', 'Q', 'f', 'd', )
+
+
+def _close_spill_file(spill_file: object, path: str):
+    spill_file.close()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class SpillableList(Sequence):
+
+    def __init__(
+        self,
+        chunk_size: int=1000,
+        max_memory_items: int=100000,
+        typecode: str=None,
+        cache_chunks: int=4,
+        directory: str=None,
+        measure: bool=False
+    ):
+        """
+        :param chunk_size: int number of items per chunk (default=1000)
+        :param max_memory_items: int number of items kept in memory before the oldest chunks are spilled - at least one chunk is always kept (default=100000)
+        :param typecode: str array.array typecode for numeric items, for example 'd' or 'q' (default=None, which allows any picklable item)
+        :param cache_chunks: int number of spilled chunks kept in memory after they were read (default=4)
+        :param directory: str directory of the spill file (default=None, which uses the system temporary directory)
+        :param measure: bool to measure the size of every item as it is stored, instead of in memory_usage() - only used without a typecode (default=False)
+        """
+        if chunk_size < 1:
+            raise Exception('chunk_size must be at least 1')
+        if typecode is not None and typecode not in NUMERIC_TYPECODES:
+            raise Exception('Unsupported typecode "{}". Expected one of {}'.format(typecode, NUMERIC_TYPECODES))
+        self.chunk_size = chunk_size
+        self.max_memory_items = max_memory_items
+        self.typecode = typecode
+        self.cache_chunks = cache_chunks
+        self.measure = measure
+        self.spilled_chunk_count = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._itemsize = None if typecode is None else array(typecode).itemsize
+        self._hot_chunks = [self._new_chunk()]
+        self._hot_bytes = [0]
+        self._chunk_offsets = list()    # (offset, size) of every spilled chunk, when not numeric
+        self._file_size = 0
+        self._cache = OrderedDict()     # chunk number -> list
+        self._map = None
+        self._length = 0
+        descriptor, self.path = tempfile.mkstemp(prefix='oculusd-spill-', suffix='.bin', dir=directory)
+        self._file = os.fdopen(descriptor, 'w+b')
+        self._finalizer = weakref.finalize(self, _close_spill_file, self._file, self.path)
+
+    def _new_chunk(self)->object:
+        if self.typecode is None:
+            return list()
+        return array(self.typecode)
+
+    def __len__(self)->int:
+        return self._length
+
+    def append(self, value: object):
+        chunk = self._hot_chunks[-1]
+        chunk.append(value)
+        if self.measure is True:
+            self._hot_bytes[-1] += deep_size(value)
+        self._length += 1
+        if len(chunk) >= self.chunk_size:
+            self._hot_chunks.append(self._new_chunk())
+            self._hot_bytes.append(0)
+            if (len(self._hot_chunks) - 1) * self.chunk_size > self.max_memory_items:
+                self._spill_chunk()
+
+    def extend(self, values: object):
+        for value in values:
+            self.append(value)
+
+    def _spill_chunk(self):
+        """Write the oldest (full) chunk in memory to the spill file
+        """
+        chunk = self._hot_chunks.pop(0)
+        self._hot_bytes.pop(0)
+        self._file.seek(self._file_size)
+        if self.typecode is None:
+            encoded = pickle.dumps(chunk, protocol=pickle.HIGHEST_PROTOCOL)
+            self._chunk_offsets.append((self._file_size, len(encoded), ))
+        else:
+            encoded = chunk.tobytes()
+        self._file.write(encoded)
+        self._file_size += len(encoded)
+        self.spilled_chunk_count += 1
+
+    def spill(self)->int:
+        """Spill all full chunks that are still in memory - only the chunk that is being filled is kept
+
+        :returns: int number of chunks spilled
+        """
+        count = len(self._hot_chunks) - 1
+        for i in range(count):
+            self._spill_chunk()
+        return count
+
+    def memory_usage(self)->int:
+        """:returns: int approximate number of bytes of the items in memory (the chunk cache is not included)
+        """
+        if self.typecode is not None:
+            return sum([len(chunk) for chunk in self._hot_chunks]) * self._itemsize
+        if self.measure is True:
+            return sum(self._hot_bytes) + sum([chunk.__sizeof__() for chunk in self._hot_chunks])
+        return sum([deep_size(chunk) for chunk in self._hot_chunks])
+
+    def _read_spilled_item(self, index: int)->object:
+        if self.typecode is not None:
+            if self._map is None or len(self._map) < self._file_size:
+                self._file.flush()
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), self._file_size, access=mmap.ACCESS_READ)
+            return struct.unpack_from(self.typecode, self._map, index * self._itemsize)[0]
+        chunk_number, position = divmod(index, self.chunk_size)
+        chunk = self._cache.get(chunk_number)
+        if chunk is None:
+            self.cache_misses += 1
+            chunk = self._load_chunk(chunk_number=chunk_number)
+            self._cache[chunk_number] = chunk
+            if len(self._cache) > self.cache_chunks:
+                self._cache.popitem(last=False)
+        else:
+            self.cache_hits += 1
+            self._cache.move_to_end(chunk_number)
+        return chunk[position]
+
+    def _load_chunk(self, chunk_number: int)->object:
+        self._file.flush()
+        if self.typecode is None:
+            offset, size = self._chunk_offsets[chunk_number]
+            self._file.seek(offset)
+            return pickle.loads(self._file.read(size))
+        size = self.chunk_size * self._itemsize
+        self._file.seek(chunk_number * size)
+        chunk = array(self.typecode)
+        chunk.frombytes(self._file.read(size))
+        return chunk
+
+    def __getitem__(self, index: object)->object:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index = index + self._length
+        if index < 0 or index >= self._length:
+            raise IndexError('list index out of range')
+        spilled_length = self.spilled_chunk_count * self.chunk_size
+        if index >= spilled_length:
+            chunk_number, position = divmod(index - spilled_length, self.chunk_size)
+            return self._hot_chunks[chunk_number][position]
+        return self._read_spilled_item(index=index)
+
+    def __iter__(self):
+        chunk_number = 0
+        while chunk_number < self.spilled_chunk_count:
+            yield from self._load_chunk(chunk_number=chunk_number)
+            chunk_number += 1
+        for chunk in list(self._hot_chunks):
+            yield from chunk
+
+    def __eq__(self, other: object)->bool:
+        if isinstance(other, (SpillableList, list, tuple, )):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self)->str:
+        # The same text as the repr() of a list with the items, so that writers that format the data (TextFileIO)
+        # write the same file for both. Every spilled chunk is read.
+        return '[{}]'.format(', '.join([repr(item) for item in self]))
+
+    def close(self):
+        """Delete the spill file. The items in memory stay available, the spilled items do not.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._finalizer()
+
+
+class SpillableListContainer(GenericDataContainer):
+
+    def __init__(
+        self,
+        result_set_name: str='anonymous',
+        data_validator: DataValidator=None,
+        chunk_size: int=1000,
+        max_memory_items: int=100000,
+        typecode: str=None,
+        cache_chunks: int=4,
+        directory: str=None,
+        logger=L,
+        memory_budget: MemoryBudget=None
+    ):
+        """
+        :param result_set_name: str (default='anonymous')
+        :param data_validator: DataValidator for every stored item (default=None)
+        :param chunk_size: int number of items per chunk (default=1000)
+        :param max_memory_items: int number of items kept in memory before the oldest chunks are spilled (default=100000)
+        :param typecode: str array.array typecode for numeric items, for example 'd' or 'q' (default=None, which allows any picklable item)
+        :param cache_chunks: int number of spilled chunks kept in memory after they were read (default=4)
+        :param directory: str directory of the spill file (default=None, which uses the system temporary directory)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        :param memory_budget: MemoryBudget - when it is over its limit, all full chunks are spilled (default=None)
+        """
+        super().__init__(result_set_name=result_set_name, data_type=list, data_validator=data_validator, logger=logger)
+        self.data = SpillableList(
+            chunk_size=chunk_size,
+            max_memory_items=max_memory_items,
+            typecode=typecode,
+            cache_chunks=cache_chunks,
+            directory=directory,
+            measure=memory_budget is not None
+        )
+        self.memory_budget = memory_budget
+        if memory_budget is not None:
+            self.memory_size = self._data_size()
+            memory_budget.register(owner=self, name=result_set_name, size=self.memory_size)
+
+    def _store_tracked(self, data: object, key: object=None, **kwarg)->int:
+        result = self._store(data=data, key=key, **kwarg)
+        self._resize(size=self._data_size())
+        return result
+
+    def _data_size(self)->int:
+        return self.data.memory_usage()
+
+    def release_memory(self)->int:
+        """Spill all full chunks - called by the MemoryBudget when it is over its limit
+
+        :returns: int number of bytes released
+        """
+        size = self.memory_usage()
+        chunk_count = self.data.spill()
+        if chunk_count > 0:
+            self.logger.info('Spilled {} chunks of "{}"'.format(chunk_count, self.result_set_name))
+        if self.memory_budget is not None:
+            self._resize(size=self._data_size())
+        return size - self.data.memory_usage()
+
+    def close(self):
+        self.data.close()
+
+# EOF
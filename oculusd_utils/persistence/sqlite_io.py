@@ -0,0 +1,298 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""A GenericIO implementation that persists GenericDataContainer instances in a SQLite database
+
+Every container is stored as a result set (identified by its result_set_name) with one row per item: dict containers
+have a row per key, list and tuple containers a row per element and str and numeric containers a single row. This
+allows dict containers to be read per key, without loading the whole result set:
+
+    >>> sqlite_io = SQLiteIO(db_path='/var/lib/my-app/data.db')
+    >>> sqlite_io.write(data=container)                                 # one transaction, batched inserts
+    >>> sqlite_io.read(result_set_name='users').data                    # the complete dict
+    >>> sqlite_io.read_keys(keys=('alice', ), result_set_name='users').data
+
+Performance notes:
+
+* every thread gets its own connection (sqlite3 connections must not be shared between threads), opened on first use
+  and kept for the lifetime of the SQLiteIO instance
+* the database uses WAL mode, so readers never block the writer and the other way around
+* all SQL statements are built once per instance - the sqlite3 module keeps them prepared in its per connection
+  statement cache
+* writes use executemany() in batches of batch_size rows, inside one transaction per write() or write_many() call
+
+Keys and values are encoded as described in oculusd_utils.persistence.encoding
+"""
+
+import re
+import sqlite3
+import threading
+from oculusd_utils.persistence import L, DATA_TYPES, GenericIO, GenericIOProcessor, GenericDataContainer
+from oculusd_utils.persistence.encoding import encode_key, decode_key, encode_value, decode_value
+
+
+TABLE_NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+MAX_VARIABLES_PER_QUERY = 500
+
+
+def position_key(position: int)->str:
+    # Never a valid JSON document, so it can not collide with an encoded dict key
+    return '#{}'.format(position)
+
+
+class SQLiteIO(GenericIO):
+
+    def __init__(self, db_path: str, table_name: str='containers', batch_size: int=1000, timeout: float=30.0, logger=L):
+        """
+        :param db_path: str path of the database file (created when it does not exist)
+        :param table_name: str prefix of the tables to use (default='containers')
+        :param batch_size: int number of rows per executemany() call (default=1000)
+        :param timeout: float seconds to wait for a lock held by another connection (default=30.0)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if TABLE_NAME_PATTERN.match('{}'.format(table_name)) is None:
+            raise Exception('Invalid table name "{}"'.format(table_name))
+        if batch_size < 1:
+            raise Exception('batch_size must be at least 1')
+        super().__init__(uri=db_path, logger=logger)
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = list()
+        self._connections_lock = threading.Lock()
+        sets_table = '{}_sets'.format(table_name)
+        items_table = '{}_items'.format(table_name)
+        self._sql_create = (
+            'CREATE TABLE IF NOT EXISTS {} (result_set_name TEXT PRIMARY KEY, data_type TEXT NOT NULL)'.format(sets_table),
+            '''CREATE TABLE IF NOT EXISTS {} (
+                result_set_name TEXT NOT NULL,
+                item_key TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                value_type TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (result_set_name, item_key)
+            ) WITHOUT ROWID'''.format(items_table),
+            # put_item() looks up the last position of a result set, and reads are ordered by position
+            'CREATE INDEX IF NOT EXISTS {0}_position ON {0} (result_set_name, position)'.format(items_table),
+        )
+        self._sql_select_set = 'SELECT data_type FROM {} WHERE result_set_name = ?'.format(sets_table)
+        self._sql_select_set_names = 'SELECT result_set_name FROM {} ORDER BY result_set_name'.format(sets_table)
+        self._sql_upsert_set = 'INSERT OR REPLACE INTO {} (result_set_name, data_type) VALUES (?, ?)'.format(sets_table)
+        self._sql_delete_set = 'DELETE FROM {} WHERE result_set_name = ?'.format(sets_table)
+        self._sql_select_items = 'SELECT item_key, value_type, value FROM {} WHERE result_set_name = ? ORDER BY position'.format(items_table)
+        self._sql_upsert_item = (
+            'INSERT INTO {0} (result_set_name, item_key, position, value_type, value) '
+            'VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM {0} WHERE result_set_name = ?), ?, ?) '
+            'ON CONFLICT (result_set_name, item_key) DO UPDATE SET value_type = excluded.value_type, value = excluded.value'
+        ).format(items_table)
+        self._sql_insert_item = 'INSERT OR REPLACE INTO {} (result_set_name, item_key, position, value_type, value) VALUES (?, ?, ?, ?, ?)'.format(items_table)
+        self._sql_select_keys = 'SELECT item_key, value_type, value FROM {} WHERE result_set_name = ? AND item_key IN ({{}}) ORDER BY position'.format(items_table)
+        self._sql_delete_items = 'DELETE FROM {} WHERE result_set_name = ?'.format(items_table)
+        self._sql_delete_item = 'DELETE FROM {} WHERE result_set_name = ? AND item_key = ?'.format(items_table)
+        connection = self.connection()
+        with connection:
+            for statement in self._sql_create:
+                connection.execute(statement)
+
+    def connection(self)->sqlite3.Connection:
+        """:returns: sqlite3.Connection of the calling thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.uri, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+            self.logger.debug('New connection to "{}" (pool size {})'.format(self.uri, len(self._connections)))
+        return connection
+
+    def close(self):
+        """Close the connections of all threads
+        """
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = list()
+        self._local = threading.local()
+
+    def _rows(self, data: GenericDataContainer, result_set_name: str):
+        data_type_name = data.data_type.__name__
+        if data_type_name == 'dict':
+            for position, (key, value) in enumerate(data.data.items()):
+                yield (result_set_name, encode_key(key=key), position, ) + encode_value(value=value)
+        elif data_type_name in ('list', 'tuple'):
+            for position, value in enumerate(data.data):
+                yield (result_set_name, position_key(position=position), position, ) + encode_value(value=value)
+        elif data.data is not None:
+            yield (result_set_name, position_key(position=0), 0, ) + encode_value(value=data.data)
+
+    def _write_rows(self, connection: sqlite3.Connection, rows)->int:
+        row_count = 0
+        batch = list()
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                connection.executemany(self._sql_insert_item, batch)
+                row_count = row_count + len(batch)
+                batch = list()
+        if len(batch) > 0:
+            connection.executemany(self._sql_insert_item, batch)
+            row_count = row_count + len(batch)
+        return row_count
+
+    def _write_container(self, connection: sqlite3.Connection, data: GenericDataContainer, result_set_name: str)->int:
+        if not isinstance(data, GenericDataContainer):
+            raise Exception('Expected a GenericDataContainer')
+        connection.execute(self._sql_delete_items, (result_set_name, ))
+        connection.execute(self._sql_upsert_set, (result_set_name, data.data_type.__name__, ))
+        return self._write_rows(connection=connection, rows=self._rows(data=data, result_set_name=result_set_name))
+
+    def write_many(self, containers: list)->int:
+        """Write several containers in one transaction. Each container replaces the stored result set with the same name.
+
+        :param containers: list of GenericDataContainer
+        :returns: int number of rows written
+        """
+        connection = self.connection()
+        row_count = 0
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for data in containers:
+                row_count = row_count + self._write_container(connection=connection, data=data, result_set_name=data.result_set_name)
+            connection.execute('COMMIT')
+        except:
+            connection.execute('ROLLBACK')
+            raise
+        self.logger.info('{} rows written for {} result sets'.format(row_count, len(containers)))
+        return row_count
+
+    def write(self, data: GenericDataContainer, write_processor: GenericIOProcessor=None, **kwarg):
+        """Write a container in one transaction, replacing the stored result set with the same name
+
+        :param data: GenericDataContainer
+        :param write_processor: GenericIOProcessor to run after the data was written (default=None)
+        :param result_set_name: str which is an optional argument to store the data under another name than data.result_set_name
+        """
+        if not isinstance(data, GenericDataContainer):
+            raise Exception('Expected a GenericDataContainer')
+        result_set_name = kwarg.get('result_set_name', data.result_set_name)
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row_count = self._write_container(connection=connection, data=data, result_set_name=result_set_name)
+            connection.execute('COMMIT')
+        except:
+            connection.execute('ROLLBACK')
+            raise
+        self.logger.info('{} rows written for result set "{}"'.format(row_count, result_set_name))
+        if write_processor is not None:
+            if isinstance(write_processor, GenericIOProcessor):
+                write_processor.process(data=data, **kwarg)
+            else:
+                self.logger.error('Skipping processor - wrong type. Expected a GenericIOProcessor')
+
+    def put_item(self, key: object, value: object, result_set_name: str):
+        """Insert or replace a single key of a stored dict result set (created when it does not exist), in its own
+        transaction. New keys are added at the end, replaced keys keep their position.
+        """
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(self._sql_select_set, (result_set_name, )).fetchone()
+            if row is None:
+                connection.execute(self._sql_upsert_set, (result_set_name, 'dict', ))
+            elif row[0] != 'dict':
+                raise Exception('Result set "{}" does not store a dict'.format(result_set_name))
+            connection.execute(self._sql_upsert_item, (result_set_name, encode_key(key=key), result_set_name, ) + encode_value(value=value))
+            connection.execute('COMMIT')
+        except:
+            connection.execute('ROLLBACK')
+            raise
+
+    def delete_item(self, key: object, result_set_name: str):
+        connection = self.connection()
+        connection.execute(self._sql_delete_item, (result_set_name, encode_key(key=key), ))
+
+    def delete(self, result_set_name: str):
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(self._sql_delete_items, (result_set_name, ))
+            connection.execute(self._sql_delete_set, (result_set_name, ))
+            connection.execute('COMMIT')
+        except:     # pragma: no cover
+            connection.execute('ROLLBACK')
+            raise
+
+    def result_set_names(self)->list:
+        return [row[0] for row in self.connection().execute(self._sql_select_set_names)]
+
+    def _data_type_name(self, connection: sqlite3.Connection, result_set_name: str)->str:
+        row = connection.execute(self._sql_select_set, (result_set_name, )).fetchone()
+        if row is None:
+            raise Exception('Result set "{}" not found'.format(result_set_name))
+        return row[0]
+
+    def read(self, read_processor: GenericIOProcessor=None, **kwarg)->GenericDataContainer:
+        """Read a complete result set. The data was validated when it was stored and is not validated again.
+
+        :param read_processor: GenericIOProcessor to run after the data was read (default=None)
+        :param result_set_name: str name of the result set to read (default='anonymous')
+
+        :returns: GenericDataContainer
+        """
+        result_set_name = kwarg.get('result_set_name', 'anonymous')
+        connection = self.connection()
+        data_type_name = self._data_type_name(connection=connection, result_set_name=result_set_name)
+        data = GenericDataContainer(result_set_name=result_set_name, data_type=DATA_TYPES[data_type_name], logger=self.logger)
+        rows = connection.execute(self._sql_select_items, (result_set_name, ))
+        if data_type_name == 'dict':
+            data.data = {decode_key(key=item_key): decode_value(value_type=value_type, value=value) for item_key, value_type, value in rows}
+        elif data_type_name in ('list', 'tuple'):
+            data.data = [decode_value(value_type=value_type, value=value) for item_key, value_type, value in rows]
+            if data_type_name == 'tuple':
+                data.data = tuple(data.data)
+        else:
+            row = rows.fetchone()
+            data.data = None if row is None else decode_value(value_type=row[1], value=row[2])
+        self.logger.info('Result set "{}" read'.format(result_set_name))
+        if read_processor is not None:
+            if isinstance(read_processor, GenericIOProcessor):
+                read_processor.process(data=data, **kwarg)
+            else:
+                self.logger.error('Skipping processor - wrong type. Expected a GenericIOProcessor')
+        return data
+
+    def read_keys(self, keys: tuple, result_set_name: str)->GenericDataContainer:
+        """Read selected keys of a stored dict result set, without loading the rest of the result set. Keys that are
+        not stored are left out of the result.
+
+        :param keys: tuple of keys
+        :param result_set_name: str
+        :returns: GenericDataContainer of data type dict
+        """
+        connection = self.connection()
+        if self._data_type_name(connection=connection, result_set_name=result_set_name) != 'dict':
+            raise Exception('Result set "{}" does not store a dict'.format(result_set_name))
+        data = GenericDataContainer(result_set_name=result_set_name, data_type=dict, logger=self.logger)
+        encoded_keys = [encode_key(key=key) for key in keys]
+        for start in range(0, len(encoded_keys), MAX_VARIABLES_PER_QUERY):
+            chunk = encoded_keys[start:start + MAX_VARIABLES_PER_QUERY]
+            sql = self._sql_select_keys.format(','.join('?' * len(chunk)))
+            for item_key, value_type, value in connection.execute(sql, [result_set_name] + chunk):
+                data.data[decode_key(key=item_key)] = decode_value(value_type=value_type, value=value)
+        return data
+
+    def read_key(self, key: object, result_set_name: str, default: object=None)->object:
+        """:returns: the value of one key of a stored dict result set, or the default when the key is not stored
+        """
+        data = self.read_keys(keys=(key, ), result_set_name=result_set_name)
+        return data.data.get(key, default)
+
+# EOF
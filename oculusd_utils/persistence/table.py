@@ -0,0 +1,349 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""A columnar table container, and a CSV GenericIO for it
+
+Instead of a list of dicts, a TableDataContainer keeps one column per field: int and float columns are arrays of
+machine numbers (8 bytes per value, no Python object per value), str and Decimal columns are lists. The schema maps
+every column to its type and the parameters of the matching validator:
+
+    >>> schema = {
+    ...     'name': (str, {'min_length': 1, 'max_length': 64, 'start_with_alpha': False}),  # StringDataValidator
+    ...     'age': (int, {'min_value': 0, 'max_value': 150}),                                 # NumberDataValidator
+    ...     'score': (float, {}),
+    ... }
+    >>> table = TableDataContainer(result_set_name='people', schema=schema)
+    >>> table.extend(rows=[{'name': 'Alice', 'age': 30, 'score': 1.5}, {'name': 'Bob', 'age': 40, 'score': 2.0}])
+    2
+    >>> table.column(name='age')
+    array('q', [30, 40])
+
+Appended values are validated a column at a time, with the same rules as StringDataValidator and NumberDataValidator
+(see validate_column()). A batch is only added when every value in it passed validation. project() returns a table
+with a subset of the columns without copying them.
+"""
+
+import os
+import csv
+import math
+import itertools
+from array import array
+from decimal import Decimal
+from oculusd_utils.persistence import L, GenericIO, GenericIOProcessor, GenericDataContainer
+from oculusd_utils.security.validation import validate_string
+
+
+ARRAY_TYPECODES = {
+    'int': 'q',
+    'float': 'd',
+}
+COLUMN_TYPES = ('str', 'int', 'float', 'Decimal', )
+STRING_PARAMETERS = ('min_length', 'max_length', 'start_with_alpha', 'contain_at_least_one_space', 'can_be_none', )
+NUMBER_PARAMETERS = ('min_value', 'max_value', )
+
+
+def new_column(column_type: object, values: object=()):
+    typecode = ARRAY_TYPECODES.get(column_type.__name__)
+    if typecode is not None:
+        return array(typecode, values)
+    return list(values)
+
+
+def _first_invalid_string(values: object, parameters: dict)->int:
+    for index, value in enumerate(values):
+        if not validate_string(input_str=value, **parameters):
+            return index
+    return -1
+
+
+def validate_column(column_type: object, values: object, parameters: dict)->int:
+    """Validate all values of a column in one pass
+
+    str values are checked like StringDataValidator (with the same defaults), and int, float and Decimal values like
+    NumberDataValidator: a value passes when min_value <= value <= max_value.
+
+    :param column_type: str, int, float or Decimal
+    :param values: sequence of values, for int and float columns usually an array
+    :param parameters: dict of validator parameters
+    :returns: int index of the first invalid value, or -1 when all values are valid
+    """
+    if len(values) == 0:
+        return -1
+    if column_type.__name__ == 'str':
+        min_length = parameters.get('min_length', 1)
+        max_length = parameters.get('max_length', 255)
+        can_be_none = parameters.get('can_be_none', False)
+        # Fast path: type checks and lengths with builtins, only the remaining rules per value
+        if can_be_none is False and all(isinstance(value, str) for value in values):
+            lengths = list(map(len, values))
+            if min(lengths) >= min_length and max(lengths) <= max_length:
+                start_with_alpha = parameters.get('start_with_alpha', True)
+                contain_at_least_one_space = parameters.get('contain_at_least_one_space', False)
+                if (start_with_alpha is False or all(value[:1].isalpha() or value == '' for value in values)) and (
+                    contain_at_least_one_space is False or all(' ' in value for value in values)
+                ):
+                    return -1
+        return _first_invalid_string(values=values, parameters=parameters)
+    # Number columns: the column minimum and maximum decide, the position is only searched when validation fails
+    min_value = parameters.get('min_value')
+    max_value = parameters.get('max_value')
+    if column_type.__name__ == 'float' and any(map(math.isnan, values)):
+        # min() and max() are not reliable with NaN values in the column - NaN values pass, like in NumberDataValidator
+        for index, value in enumerate(values):
+            if (min_value is not None and value < min_value) or (max_value is not None and value > max_value):
+                return index
+        return -1
+    if min_value is not None and min(values) < min_value:
+        return next(index for index, value in enumerate(values) if value < min_value)
+    if max_value is not None and max(values) > max_value:
+        return next(index for index, value in enumerate(values) if value > max_value)
+    return -1
+
+
+def convert_column(column_type: object, values: object)->object:
+    """Convert the values of one column to the column storage (an array for int and float columns)
+    """
+    if column_type.__name__ in ARRAY_TYPECODES:
+        try:
+            return new_column(column_type=column_type, values=values)
+        except (TypeError, OverflowError):
+            for index, value in enumerate(values):
+                if type(value).__name__ != column_type.__name__ and not (column_type.__name__ == 'float' and isinstance(value, int)):
+                    raise Exception('Expected a {} but got "{}" in row {}'.format(column_type.__name__, type(value).__name__, index))
+            raise Exception('Value out of range for a {} column'.format(column_type.__name__))
+    if column_type.__name__ == 'Decimal':
+        for index, value in enumerate(values):
+            if not isinstance(value, Decimal):
+                raise Exception('Expected a Decimal but got "{}" in row {}'.format(type(value).__name__, index))
+    return list(values)
+
+
+class TableDataContainer(GenericDataContainer):
+
+    def __init__(self, result_set_name: str='anonymous', schema: dict=None, read_only: bool=False, logger=L):
+        """
+        :param result_set_name: str (default='anonymous')
+        :param schema: dict of column name -> tuple (column type, dict of validator parameters). The column type is str, int, float or Decimal
+        :param read_only: bool to refuse appends, as for projections that share their columns (default=False)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if schema is None or len(schema) == 0:
+            raise Exception('A table needs a schema with at least one column')
+        self.schema = dict()
+        for name, column_spec in schema.items():
+            column_type, parameters = column_spec
+            if column_type.__name__ not in COLUMN_TYPES:
+                raise Exception('Column "{}" has unsupported type "{}" - expected one of {}'.format(name, column_type.__name__, COLUMN_TYPES))
+            allowed = STRING_PARAMETERS if column_type.__name__ == 'str' else NUMBER_PARAMETERS
+            for parameter in parameters:
+                if parameter not in allowed:
+                    raise Exception('Column "{}" has unknown validator parameter "{}"'.format(name, parameter))
+            if column_type.__name__ == 'Decimal':
+                # NumberDataValidator requires Decimal limits for Decimal values
+                parameters = {key: Decimal(value) for key, value in parameters.items()}
+            self.schema[name] = (column_type, dict(parameters), )
+        self.columns = {name: new_column(column_type=column_spec[0]) for name, column_spec in self.schema.items()}
+        self.read_only = read_only
+        super().__init__(result_set_name=result_set_name, data_type=dict, logger=logger)
+
+    @property
+    def data(self)->dict:
+        """The columns, as a dict of column name -> array or list
+        """
+        return self.columns
+
+    @data.setter
+    def data(self, value: dict):
+        if value is None or len(value) == 0:
+            return
+        self._set_columns(columns=value)
+
+    def _set_columns(self, columns: dict):
+        # Restores columns without validation, for example from storage that was validated when written
+        lengths = set([len(values) for values in columns.values()])
+        if set(columns) != set(self.schema) or len(lengths) > 1:
+            raise Exception('Expected equally long columns {}'.format(tuple(self.schema)))
+        self.columns = {name: convert_column(column_type=self.schema[name][0], values=columns[name]) for name in self.schema}
+
+    def row_count(self)->int:
+        return len(next(iter(self.columns.values())))
+
+    def column_names(self)->tuple:
+        return tuple(self.schema)
+
+    def column(self, name: str)->object:
+        """:returns: the array or list of the column - not a copy, so it must not be changed
+        """
+        if name not in self.columns:
+            raise Exception('Column "{}" not found'.format(name))
+        return self.columns[name]
+
+    def extend_columns(self, columns: dict)->int:
+        """Validate and add a batch of values, given per column
+
+        :param columns: dict of column name -> sequence of values, for every column of the schema
+        :returns: int number of rows in the table
+        """
+        if self.read_only is True:
+            raise Exception('Table "{}" is read only'.format(self.result_set_name))
+        if set(columns) != set(self.schema):
+            raise Exception('Expected values for the columns {} but got {}'.format(tuple(self.schema), tuple(columns)))
+        lengths = set([len(values) for values in columns.values()])
+        if len(lengths) > 1:
+            raise Exception('All columns must have the same number of values')
+        converted = dict()
+        for name, column_spec in self.schema.items():
+            values = convert_column(column_type=column_spec[0], values=columns[name])
+            try:
+                invalid_index = validate_column(column_type=column_spec[0], values=values, parameters=column_spec[1])
+            except TypeError:
+                invalid_index = 0
+            if invalid_index >= 0:
+                raise Exception('Validation failed for column "{}" in row {} of the batch'.format(name, invalid_index))
+            converted[name] = values
+        for name, values in converted.items():
+            self.columns[name].extend(values)
+        self.logger.info('{} rows added to table "{}"'.format(len(next(iter(converted.values()))), self.result_set_name))
+        return self.row_count()
+
+    def extend(self, rows: list)->int:
+        """Validate and add rows
+
+        :param rows: list of dicts with a value for every column
+        :returns: int number of rows in the table
+        """
+        try:
+            columns = {name: [row[name] for row in rows] for name in self.schema}
+        except KeyError as e:
+            raise Exception('Row without a value for column {}'.format(e))
+        return self.extend_columns(columns=columns)
+
+    def store(self, data: object, key: object=None, **kwarg)->int:
+        """Validate and add a single row (a dict with a value for every column). Use extend() or extend_columns() for
+        many rows.
+        """
+        if not isinstance(data, dict):
+            raise Exception('Expected a row dict but got "{}"'.format(type(data).__name__))
+        return self.extend(rows=[data])
+
+    def row(self, index: int)->dict:
+        return {name: values[index] for name, values in self.columns.items()}
+
+    def rows(self):
+        """Generator of the rows, as dicts
+        """
+        names = tuple(self.columns)
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+    def project(self, names: tuple)->'TableDataContainer':
+        """A read only table with a subset of the columns. The columns are shared, not copied.
+        """
+        for name in names:
+            if name not in self.schema:
+                raise Exception('Column "{}" not found'.format(name))
+        table = TableDataContainer(
+            result_set_name=self.result_set_name,
+            schema={name: self.schema[name] for name in names},
+            read_only=True,
+            logger=self.logger
+        )
+        table.columns = {name: self.columns[name] for name in names}
+        return table
+
+
+class CsvTableIO(GenericIO):
+
+    def __init__(self, file_folder_path: str, file_name: str, schema: dict, chunk_size: int=10000, dialect: str='excel', logger=L):
+        """
+        :param file_folder_path: str with the directory of the file
+        :param file_name: str with the file name
+        :param schema: dict of the TableDataContainer schema. The file must have a header row with (at least) these columns
+        :param chunk_size: int number of rows converted and validated at a time (default=10000)
+        :param dialect: str csv module dialect (default='excel')
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if chunk_size < 1:
+            raise Exception('chunk_size must be at least 1')
+        super().__init__(uri='{}{}{}'.format(file_folder_path, os.sep, file_name), logger=logger)
+        self.schema = schema
+        self.chunk_size = chunk_size
+        self.dialect = dialect
+
+    def _convert(self, name: str, values: list, first_line: int)->object:
+        column_type = self.schema[name][0]
+        if column_type.__name__ == 'str':
+            return values
+        try:
+            return new_column(column_type=column_type, values=map(column_type, values))
+        except Exception:
+            for index, value in enumerate(values):
+                try:
+                    column_type(value)
+                except Exception:
+                    raise Exception('Line {}: value "{}" of column "{}" is not a valid {}'.format(first_line + index, value, name, column_type.__name__))
+            raise   # pragma: no cover
+
+    def chunks(self, chunk_size: int=None):
+        """Generator of TableDataContainers with up to chunk_size rows each
+        """
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+        with open(self.uri, 'r', newline='') as f:
+            reader = csv.reader(f, dialect=self.dialect)
+            header = next(reader, None)
+            if header is None:
+                return
+            positions = dict()
+            for name in self.schema:
+                if name not in header:
+                    raise Exception('Column "{}" not found in the header of "{}"'.format(name, self.uri))
+                positions[name] = header.index(name)
+            line = 2
+            while True:
+                rows = list(itertools.islice(reader, chunk_size))
+                if len(rows) == 0:
+                    break
+                table = TableDataContainer(result_set_name=self.uri, schema=self.schema, logger=self.logger)
+                try:
+                    columns = {name: [row[position] for row in rows] for name, position in positions.items()}
+                except IndexError:
+                    raise Exception('Line {} to {} of "{}" has a row with missing columns'.format(line, line + len(rows) - 1, self.uri))
+                table.extend_columns(columns={name: self._convert(name=name, values=values, first_line=line) for name, values in columns.items()})
+                line = line + len(rows)
+                yield table
+
+    def read(self, read_processor: GenericIOProcessor=None, **kwarg)->GenericDataContainer:
+        """Read the whole file into one TableDataContainer, validating chunk_size rows at a time
+
+        :returns: TableDataContainer
+        """
+        data = TableDataContainer(result_set_name=self.uri, schema=self.schema, logger=self.logger)
+        for chunk in self.chunks():
+            for name, values in chunk.columns.items():
+                data.columns[name].extend(values)
+        self.logger.info('{} rows read.'.format(data.row_count()))
+        if read_processor is not None:
+            if isinstance(read_processor, GenericIOProcessor):
+                read_processor.process(data=data, **kwarg)
+            else:
+                self.logger.error('Skipping processor - wrong type. Expected a GenericIOProcessor')
+        return data
+
+    def write(self, data: GenericDataContainer, write_processor: GenericIOProcessor=None, **kwarg):
+        if not isinstance(data, TableDataContainer):
+            raise Exception('Expected a TableDataContainer')
+        with open(self.uri, 'w', newline='') as f:
+            writer = csv.writer(f, dialect=self.dialect)
+            writer.writerow(data.column_names())
+            writer.writerows(zip(*data.columns.values()))
+        if write_processor is not None:
+            if isinstance(write_processor, GenericIOProcessor):
+                write_processor.process(data=data, **kwarg)
+            else:
+                self.logger.error('Skipping processor - wrong type. Expected a GenericIOProcessor')
+
+# EOF
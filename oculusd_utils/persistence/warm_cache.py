@@ -0,0 +1,239 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""A persistent cache of parsed GenericDataContainer results that survives a restart
+
+Entries are stored in a SQLite database, keyed by (path, parser). Every entry records the modification time (in
+nanoseconds) and size of the file it was parsed from, and is only returned while the file still has that modification
+time and size. The parser is a free form name for the way the file was turned into a container - for example 'text'
+for the plain text read by TextFileIO, or 'json' for a dict parsed from it.
+
+Typical usage at service startup:
+
+    >>> cache = WarmStartCache(db_path='/var/cache/my-app/warm.db')
+    >>> cache.warm_up()                                 # bulk load all entries whose files did not change
+    >>> tfio = TextFileIO(file_folder_path='/data', file_name='big.json', enable_cache=True, cache_backend=cache)
+    >>> tfio.read()                                     # served from memory, or read (and stored) lazily
+
+Or for parsed results:
+
+    >>> data = cache.get_container(path='/data/big.json', parser='json')
+    >>> if data is None:
+    ...     signature = file_signature(path='/data/big.json')
+    ...     data = parse_my_file('/data/big.json')
+    ...     cache.put_container(path='/data/big.json', data=data, parser='json', signature=signature)
+
+The signature is taken before the file is parsed: when the file changes while it is parsed, put_container() sees a
+different signature and does not cache the result.
+
+Every get_container() returns a new container. Dicts, lists and tuples are kept pickled in memory and unpickled for
+every call, so changing the returned data never changes the cache.
+
+Values are serialised with pickle, so the database file must be as trusted as the code itself - never point a
+WarmStartCache to a file other users can write to.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+from oculusd_utils.persistence import L, DATA_TYPES, CacheBackend, GenericDataContainer
+
+
+TEXT_PARSER = 'text'
+MUTABLE_TYPE_NAMES = ('dict', 'list', 'tuple', )  # Kept pickled in memory, so that every caller gets its own copy
+
+
+def file_signature(path: str)->tuple:
+    """Returns the tuple (mtime_ns, size) of the file, or None if the file does not exist
+    """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size, )
+
+
+class WarmStartCache(CacheBackend):
+
+    def __init__(self, db_path: str, logger=L):
+        """
+        :param db_path: str path of the SQLite database file (created when it does not exist)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        self.db_path = db_path
+        self.logger = logger
+        self.entries = dict()   # (path, parser) -> (signature, data_type_name, data or pickled data) of the warmed up entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            '''CREATE TABLE IF NOT EXISTS entries (
+                path TEXT NOT NULL,
+                parser TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                data_type TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                PRIMARY KEY (path, parser)
+            )'''
+        )
+        self._connection.commit()
+
+    def _container(self, path: str, data_type_name: str, data: object)->GenericDataContainer:
+        # The data was validated when it was first stored - it is restored without validating again
+        container = GenericDataContainer(result_set_name=path, data_type=DATA_TYPES[data_type_name], logger=self.logger)
+        if data_type_name in MUTABLE_TYPE_NAMES:
+            data = pickle.loads(data)
+        container.data = data
+        return container
+
+    def _entry(self, signature: tuple, data_type_name: str, payload: bytes)->tuple:
+        if data_type_name in MUTABLE_TYPE_NAMES:
+            return (signature, data_type_name, payload, )
+        return (signature, data_type_name, pickle.loads(payload), )
+
+    def _drop(self, path: str, parser: str, error: Exception):
+        self.logger.warning('Dropping unreadable cache entry for "{}" ({}): {}'.format(path, parser, error))
+        self.entries.pop((path, parser, ), None)
+        with self._lock:
+            self._connection.execute('DELETE FROM entries WHERE path = ? AND parser = ?', (path, parser, ))
+            self._connection.commit()
+
+    def warm_up(self, parsers: tuple=None)->int:
+        """Load all entries whose files did not change into memory, and delete the entries of changed or removed files
+
+        :param parsers: tuple of parser names to load (default=None, which loads all parsers)
+        :returns: int number of entries loaded
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT path, parser, mtime_ns, size, data_type, payload FROM entries').fetchall()
+        signatures = dict()
+        stale = list()
+        loaded = 0
+        for path, parser, mtime_ns, size, data_type_name, payload in rows:
+            if path not in signatures:
+                signatures[path] = file_signature(path=path)
+            if signatures[path] != (mtime_ns, size, ) or data_type_name not in DATA_TYPES:
+                stale.append((path, parser, ))
+                continue
+            if parsers is not None and parser not in parsers:
+                continue
+            try:
+                entry = self._entry(signature=signatures[path], data_type_name=data_type_name, payload=payload)
+            except Exception as e:
+                self.logger.warning('Dropping unreadable cache entry for "{}" ({}): {}'.format(path, parser, e))
+                stale.append((path, parser, ))
+                continue
+            self.entries[(path, parser, )] = entry
+            loaded = loaded + 1
+        if len(stale) > 0:
+            with self._lock:
+                self._connection.executemany('DELETE FROM entries WHERE path = ? AND parser = ?', stale)
+                self._connection.commit()
+        self.logger.info('Warm start cache loaded {} entries ({} stale entries removed)'.format(loaded, len(stale)))
+        return loaded
+
+    def get_container(self, path: str, parser: str=TEXT_PARSER)->GenericDataContainer:
+        """:returns: GenericDataContainer for the current version of the file, or None when there is no such entry
+        """
+        signature = file_signature(path=path)
+        if signature is None:
+            self.entries.pop((path, parser, ), None)
+            return None
+        entry = self.entries.get((path, parser, ))
+        if entry is None or entry[0] != signature:
+            with self._lock:
+                row = self._connection.execute(
+                    'SELECT data_type, payload FROM entries WHERE path = ? AND parser = ? AND mtime_ns = ? AND size = ?',
+                    (path, parser, signature[0], signature[1], )
+                ).fetchone()
+            if row is None or row[0] not in DATA_TYPES:
+                self.entries.pop((path, parser, ), None)
+                return None
+            try:
+                entry = self._entry(signature=signature, data_type_name=row[0], payload=row[1])
+            except Exception as e:
+                self._drop(path=path, parser=parser, error=e)
+                return None
+            self.entries[(path, parser, )] = entry
+        try:
+            return self._container(path=path, data_type_name=entry[1], data=entry[2])
+        except Exception as e:
+            self._drop(path=path, parser=parser, error=e)
+            return None
+
+    def put_container(self, path: str, data: GenericDataContainer, parser: str=TEXT_PARSER, signature: tuple=None):
+        """Store a parsed result
+
+        :param path: str path of the file the data was parsed from
+        :param data: GenericDataContainer
+        :param parser: str name of the parser (default='text')
+        :param signature: tuple (mtime_ns, size) of the file, taken before it was parsed (default=None, which reads the current signature - only safe when the file can not have changed since it was parsed)
+        """
+        if not isinstance(data, GenericDataContainer):
+            raise Exception('Expected a GenericDataContainer')
+        data_type_name = data.data_type.__name__
+        if data_type_name not in DATA_TYPES:    # pragma: no cover
+            raise Exception('Data type "{}" can not be cached'.format(data_type_name))
+        current_signature = file_signature(path=path)
+        if current_signature is None:
+            self.logger.warning('Not caching "{}" - the file does not exist'.format(path))
+            return
+        if signature is None:
+            signature = current_signature
+        elif signature != current_signature:
+            self.logger.info('Not caching "{}" - the file changed after it was read'.format(path))
+            return
+        payload = pickle.dumps(data.data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO entries (path, parser, mtime_ns, size, data_type, payload) VALUES (?, ?, ?, ?, ?, ?)',
+                (path, parser, signature[0], signature[1], data_type_name, payload, )
+            )
+            self._connection.commit()
+        self.entries[(path, parser, )] = (signature, data_type_name, payload if data_type_name in MUTABLE_TYPE_NAMES else data.data, )
+
+    def invalidate(self, key: str, parser: str=None):
+        """Remove the entries of a file
+
+        :param key: str path of the file
+        :param parser: str name of the parser (default=None, which removes the entries of all parsers)
+        """
+        with self._lock:
+            if parser is None:
+                self._connection.execute('DELETE FROM entries WHERE path = ?', (key, ))
+            else:
+                self._connection.execute('DELETE FROM entries WHERE path = ? AND parser = ?', (key, parser, ))
+            self._connection.commit()
+        for entry_key in list(self.entries):
+            if entry_key[0] == key and (parser is None or entry_key[1] == parser):
+                del self.entries[entry_key]
+
+    def get_text(self, key: str, max_age: float=None)->str:
+        """CacheBackend implementation for TextFileIO. Entries are validated against the file modification time and
+        size, which stays meaningful across restarts - max_age is ignored.
+        """
+        data = self.get_container(path=key, parser=TEXT_PARSER)
+        if data is None or data.data_type.__name__ != 'str':
+            return None
+        return data.data
+
+    def put_text(self, key: str, text: str, signature: tuple=None):
+        data = GenericDataContainer(result_set_name=key, data_type=str, logger=self.logger)
+        data.data = text
+        self.put_container(path=key, data=data, parser=TEXT_PARSER, signature=signature)
+
+    def entry_count(self)->int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+# EOF
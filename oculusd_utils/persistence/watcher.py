@@ -0,0 +1,256 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Proactive invalidation of TextFileIO caches when the underlying files change
+
+The CacheWatcher keeps a registry of watched files grouped per directory and polls them in batches:
+
+* on Windows, directories with several watched files are listed once with os.scandir(), which returns the stat data
+  with the directory listing itself
+* on Linux and other POSIX systems DirEntry.stat() still makes one stat() call per file, so listing the directory
+  would only add calls - every watched file is checked with a plain os.stat() (unless min_files_for_scandir is set)
+* every poll() checks at most batch_size files, continuing round-robin where the previous poll() stopped - also within
+  a directory, so a directory with more watched files than batch_size is split over several polls. When a part of a
+  directory is checked with os.scandir() the whole directory is still listed
+
+A file is considered changed when its modification time (in nanoseconds), size or inode changes, or when it appears or
+disappears. Example:
+
+    >>> watcher = CacheWatcher(poll_interval=1.0)
+    >>> tfio = TextFileIO(file_folder_path='/etc/myapp', file_name='config.json', enable_cache=True, cache_max_age=86400)
+    >>> watcher.watch(text_file_io=tfio)
+    >>> watcher.subscribe(callback=lambda uri, previous, current: print('{} changed'.format(uri)))
+    >>> watcher.start()
+"""
+
+import os
+import weakref
+import threading
+from oculusd_utils.persistence import L, TextFileIO, MIN_PATHS_FOR_SCANDIR
+
+
+def file_signature(stat_result)->tuple:
+    """Returns the tuple (mtime_ns, size, inode) identifying a version of a file
+    """
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino, )
+
+
+def read_file_signature(path: str)->tuple:
+    """Returns the signature of the file, or None if the file does not exist
+    """
+    try:
+        return file_signature(os.stat(path))
+    except OSError:
+        return None
+
+
+class WatchedFile:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.signature = read_file_signature(path=path)
+        self.text_file_ios = weakref.WeakSet()
+        self.callbacks = list()
+
+
+class CacheWatcher:
+    """Polls watched files and invalidates (or refreshes) the caches of the TextFileIO instances that read them
+    """
+
+    def __init__(
+        self,
+        poll_interval: float=1.0,
+        batch_size: int=256,
+        refresh: bool=False,
+        min_files_for_scandir: int=None,
+        logger=L
+    ):
+        """
+        :param poll_interval: float seconds between polls of the background thread (default=1.0)
+        :param batch_size: int maximum number of files checked per poll (default=256)
+        :param refresh: bool - if True, changed files are read again with read(force=True) instead of only invalidating the cache (default=False)
+        :param min_files_for_scandir: int number of watched files in a directory from which the directory is listed with os.scandir() instead of calling os.stat() per file (default=None, which means MIN_PATHS_FOR_SCANDIR on Windows and never on other systems)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if batch_size < 1:
+            raise Exception('batch_size must be at least 1')
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.refresh = refresh
+        if min_files_for_scandir is None and os.name == 'nt':
+            min_files_for_scandir = MIN_PATHS_FOR_SCANDIR
+        self.min_files_for_scandir = min_files_for_scandir
+        self.logger = logger
+        self.directories = dict()   # directory -> dict(file name -> WatchedFile)
+        self.subscribers = list()
+        self._lock = threading.RLock()
+        self._directory_cursor = 0
+        self._file_cursor = 0       # Position within the directory at the directory cursor
+        self._thread = None
+        self._stop_event = None
+
+    def _split(self, path: str)->tuple:
+        path = os.path.abspath(path)
+        return os.path.dirname(path), os.path.basename(path)
+
+    def watch_path(self, path: str, callback=None)->WatchedFile:
+        """Watch a file without a TextFileIO instance
+
+        :param path: str file path
+        :param callback: optional callable(uri, previous_signature, current_signature) only called for changes of this file
+        :returns: WatchedFile
+        """
+        directory, file_name = self._split(path=path)
+        with self._lock:
+            files = self.directories.setdefault(directory, dict())
+            watched_file = files.get(file_name)
+            if watched_file is None:
+                watched_file = WatchedFile(path=os.path.join(directory, file_name))
+                files[file_name] = watched_file
+                self.logger.debug('Watching "{}"'.format(watched_file.path))
+            if callback is not None:
+                watched_file.callbacks.append(callback)
+        return watched_file
+
+    def watch(self, text_file_io: TextFileIO, callback=None)->WatchedFile:
+        """Watch the file of a TextFileIO instance. The instance is only weakly referenced.
+
+        :param text_file_io: TextFileIO
+        :param callback: optional callable(uri, previous_signature, current_signature) only called for changes of this file
+        :returns: WatchedFile
+        """
+        if not isinstance(text_file_io, TextFileIO):
+            raise Exception('Expected a TextFileIO')
+        watched_file = self.watch_path(path=text_file_io.uri, callback=callback)
+        with self._lock:
+            watched_file.text_file_ios.add(text_file_io)
+        return watched_file
+
+    def unwatch(self, path: str):
+        directory, file_name = self._split(path=path)
+        with self._lock:
+            files = self.directories.get(directory)
+            if files is not None:
+                files.pop(file_name, None)
+                if len(files) == 0:
+                    self.directories.pop(directory)
+
+    def watched_count(self)->int:
+        with self._lock:
+            return sum([len(files) for files in self.directories.values()])
+
+    def subscribe(self, callback):
+        """Register a callable(uri, previous_signature, current_signature) that is called for every detected change.
+        A signature is the tuple (mtime_ns, size, inode), or None when the file does not exist.
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def _current_signatures(self, directory: str, files: dict)->dict:
+        if self.min_files_for_scandir is None or len(files) < self.min_files_for_scandir:
+            return {file_name: read_file_signature(path=watched_file.path) for file_name, watched_file in files.items()}
+        signatures = dict.fromkeys(files)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name in signatures:
+                        try:
+                            signatures[entry.name] = file_signature(entry.stat())
+                        except OSError:     # pragma: no cover
+                            pass            # pragma: no cover
+        except OSError:
+            pass    # directory removed - all files are gone
+        return signatures
+
+    def _notify(self, watched_file: WatchedFile, previous: tuple, current: tuple):
+        for text_file_io in list(watched_file.text_file_ios):
+            if self.refresh is True and current is not None and text_file_io.enable_cache is True:
+                try:
+                    text_file_io.read(force=True)
+                except Exception as e:  # pragma: no cover
+                    self.logger.error('Refresh of "{}" failed: {}'.format(watched_file.path, e))
+                    text_file_io.invalidate_cache()
+            else:
+                text_file_io.invalidate_cache()
+        for callback in watched_file.callbacks + self.subscribers:
+            try:
+                callback(watched_file.path, previous, current)
+            except Exception as e:
+                self.logger.error('Subscriber failed for "{}": {}'.format(watched_file.path, e))
+
+    def poll(self, max_files: int=None)->int:
+        """Check the next batch of watched files
+
+        :param max_files: int maximum number of files to check (default=None, which means batch_size)
+        :returns: int number of changed files found
+        """
+        if max_files is None:
+            max_files = self.batch_size
+        with self._lock:
+            directories = [(directory, list(files.items()), ) for directory, files in self.directories.items()]
+        if len(directories) == 0:
+            return 0
+        # Never more than all files, so that no file is checked twice in one poll
+        max_files = min(max_files, sum([len(files) for directory, files in directories]))
+        changes = list()
+        checked = 0
+        cursor = self._directory_cursor % len(directories)
+        offset = self._file_cursor
+        while checked < max_files:
+            directory, files = directories[cursor]
+            if offset >= len(files):
+                offset = 0      # Files were unwatched since the previous poll
+            batch = dict(files[offset:offset + max_files - checked])
+            for file_name, signature in self._current_signatures(directory=directory, files=batch).items():
+                watched_file = batch[file_name]
+                if signature != watched_file.signature:
+                    changes.append((watched_file, watched_file.signature, signature, ))
+                    watched_file.signature = signature
+            checked = checked + len(batch)
+            offset = offset + len(batch)
+            if offset >= len(files):
+                offset = 0
+                cursor = (cursor + 1) % len(directories)
+        self._directory_cursor = cursor
+        self._file_cursor = offset
+        for watched_file, previous, current in changes:
+            self.logger.info('Change detected for "{}"'.format(watched_file.path))
+            self._notify(watched_file=watched_file, previous=previous, current=current)
+        return len(changes)
+
+    def poll_all(self)->int:
+        """Check all watched files once
+
+        :returns: int number of changed files found
+        """
+        return self.poll(max_files=self.watched_count())
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:  # pragma: no cover
+                self.logger.error('Poll failed: {}'.format(e))
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='CacheWatcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self)->bool:
+        return self._thread is not None
+
+# EOF
@@ -10,6 +10,20 @@ from oculusd_utils import OculusDLogger
 L = OculusDLogger()
 
 
+def build_mask(secret_length: int, use_fixed_mask_length: bool=True, mask_length: int=8, mask_char: str='*')->str:
+    """The mask that replaces a secret - shared by mask_sensitive_string() and the SecretRedactor. It does not log, so
+    it can be called from a logging filter.
+
+    :param secret_length: int number of characters of the secret
+    :returns: str with mask_length mask characters, or as many as the secret has when use_fixed_mask_length is False - empty for an empty secret
+    """
+    if secret_length == 0:
+        return ''
+    if use_fixed_mask_length is True:
+        return '{}'.format(mask_char) * mask_length
+    return '{}'.format(mask_char) * secret_length
+
+
 def mask_sensitive_string(
     input_str: str,
     mask_flag: bool=True,
@@ -22,13 +36,10 @@ def mask_sensitive_string(
     if input_str is not None:
         if not isinstance(input_str, str):
             input_str = '{}'.format(input_str)
-        if len(input_str) > 0:
-            if use_fixed_mask_length is True and mask_flag is True:
-                result = '{}'.format(mask_char) * mask_length
-            elif use_fixed_mask_length is False and mask_flag is True:
-                result = '{}'.format(mask_char) * len(input_str)
-            elif mask_flag is False:
-                result = input_str
+        if mask_flag is True:
+            result = build_mask(secret_length=len(input_str), use_fixed_mask_length=use_fixed_mask_length, mask_length=mask_length, mask_char=mask_char)
+        elif mask_flag is False:
+            result = input_str
     else:
         logger_impl.error('input_str was None - returning empty string (trying to fail gracefully)')
         return ''
@@ -0,0 +1,189 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""Validation of very large inputs in a pool of worker processes
+
+The DataValidator implementations are pure Python, so validating millions of values keeps a single core busy. A
+ParallelValidator splits the values into shards and validates the shards in a ProcessPoolExecutor:
+
+    >>> with ParallelValidator(validator=NumberDataValidator(), parameters={'min_value': 0}, max_workers=8) as runner:
+    ...     report = runner.validate_many(values=array('d', readings))
+    >>> report.invalid_count, report.failed_indices[:10]
+
+* The validator and its parameters are sent to every worker once, when the worker starts - not with every shard
+* Numeric inputs given as an array.array are copied once into shared memory. The workers read their shard from
+  there, so only the shard boundaries are sent to them
+* Other sequences are sent shard by shard. At most two shards per worker are submitted at a time, so only those
+  shards are copied into the pool's queue - not the whole input
+* The results of the shards are merged in input order. A value for which the validator raises an Exception counts as
+  failed
+
+Inputs smaller than one shard are validated in the calling process, without starting a pool.
+"""
+
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from oculusd_utils.security.validation import L, DataValidator
+
+
+# Set in every worker process by _init_worker()
+_worker_validator = None
+_worker_parameters = None
+
+
+def _init_worker(validator: DataValidator, parameters: dict):
+    global _worker_validator, _worker_parameters
+    _worker_validator = validator
+    _worker_parameters = parameters
+
+
+def _validate_values(validator: DataValidator, parameters: dict, values: object, offset: int)->list:
+    """:returns: list of the indices (plus offset) of the values that failed validation
+    """
+    failed_indices = list()
+    validate = validator.validate
+    for index, value in enumerate(values):
+        try:
+            passed = validate(data=value, **parameters)
+        except Exception:
+            passed = False
+        if not passed:
+            failed_indices.append(index + offset)
+    return failed_indices
+
+
+def _validate_shard(values: list, offset: int)->list:
+    return _validate_values(validator=_worker_validator, parameters=_worker_parameters, values=values, offset=offset)
+
+
+def _validate_shared_shard(memory_name: str, typecode: str, start: int, stop: int)->list:
+    memory = shared_memory.SharedMemory(name=memory_name)
+    itemsize = array(typecode).itemsize
+    try:
+        view = memory.buf[start * itemsize:stop * itemsize].cast(typecode)
+        try:
+            # tolist() converts the shard to Python numbers in C, so the view can be released before the memory is closed
+            values = view.tolist()
+        finally:
+            view.release()
+    finally:
+        memory.close()
+    return _validate_values(validator=_worker_validator, parameters=_worker_parameters, values=values, offset=start)
+
+
+class ValidationReport:
+    """The merged result of a ParallelValidator run
+    """
+
+    def __init__(self, total: int, failed_indices: list):
+        self.total = total
+        self.failed_indices = failed_indices
+        self.invalid_count = len(failed_indices)
+        self.valid_count = total - self.invalid_count
+
+    def passed(self)->bool:
+        return self.invalid_count == 0
+
+
+class ParallelValidator:
+
+    def __init__(self, validator: DataValidator, parameters: dict=None, max_workers: int=None, shard_size: int=100000, logger=L):
+        """
+        :param validator: DataValidator - it must be picklable, as it is sent to the worker processes
+        :param parameters: dict of keyword arguments for validator.validate() (default=None)
+        :param max_workers: int number of worker processes (default=None, which uses the number of CPUs)
+        :param shard_size: int number of values per shard (default=100000)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        if not isinstance(validator, DataValidator):
+            raise Exception('Invalid data validator type. Expected an implementation of DataValidator')
+        if shard_size < 1:
+            raise Exception('shard_size must be at least 1')
+        self.validator = validator
+        self.parameters = dict() if parameters is None else dict(parameters)
+        self.max_workers = max_workers
+        self.shard_size = shard_size
+        self.logger = logger
+        self._executor = None
+
+    def _get_executor(self)->ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.validator, self.parameters, )
+            )
+        return self._executor
+
+    def _run_shards(self, executor: ProcessPoolExecutor, submit_shard: object, shards: list)->list:
+        """Submit the shards with at most two shards per worker in flight
+
+        :param submit_shard: function(executor, start, stop)->Future
+        :returns: list of the results of the shards, in shard order
+        """
+        window = 2 * (self.max_workers if self.max_workers is not None else (os.cpu_count() or 1))
+        pending = deque()
+        results = list()
+        for start, stop in shards:
+            if len(pending) >= window:
+                results.append(pending.popleft().result())
+            pending.append(submit_shard(executor, start, stop))
+        while len(pending) > 0:
+            results.append(pending.popleft().result())
+        return results
+
+    def validate_many(self, values: object)->ValidationReport:
+        """Validate all values
+
+        :param values: sequence of values, or an array.array of numbers
+        :returns: ValidationReport with the failing indices in input order
+        """
+        total = len(values)
+        if total <= self.shard_size:
+            return ValidationReport(total=total, failed_indices=_validate_values(validator=self.validator, parameters=self.parameters, values=values, offset=0))
+        shards = [(start, min(start + self.shard_size, total), ) for start in range(0, total, self.shard_size)]
+        executor = self._get_executor()
+        if isinstance(values, array):
+            memory = shared_memory.SharedMemory(create=True, size=max(total * values.itemsize, 1))
+            try:
+                memory.buf[:total * values.itemsize] = memoryview(values).cast('B')
+                results = self._run_shards(
+                    executor=executor,
+                    submit_shard=lambda pool, start, stop: pool.submit(_validate_shared_shard, memory.name, values.typecode, start, stop),
+                    shards=shards
+                )
+            finally:
+                memory.close()
+                memory.unlink()
+        else:
+            results = self._run_shards(
+                executor=executor,
+                submit_shard=lambda pool, start, stop: pool.submit(_validate_shard, values[start:stop], start),
+                shards=shards
+            )
+        failed_indices = list()
+        for shard_failed_indices in results:
+            failed_indices.extend(shard_failed_indices)
+        self.logger.info('{} values validated in {} shards - {} failed'.format(total, len(shards), len(failed_indices)))
+        return ValidationReport(total=total, failed_indices=failed_indices)
+
+    def close(self):
+        """Stop the worker processes
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+# EOF
@@ -0,0 +1,196 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""String validation rules, compiled once into as few checks as possible
+
+validate_string() checks its rules with separate Python branches for every value. StringRules takes the same rules
+plus allowed characters, a regular expression, prefixes, suffixes and forbidden substrings, and compiles them when
+the rules are created:
+
+* The check function is composed from a tuple of predicates, one for every rule that is set - rules that are not
+  set cost nothing
+* The length bounds become one chained comparison
+* When forbidden substrings are given, they are merged with the prefix, suffix, space and character rules into a
+  single regular expression, matched with one fullmatch() call
+* Otherwise every rule is a single C-level call: frozenset.issuperset() for the allowed characters, str.startswith()
+  and str.endswith() with tuples for prefixes and suffixes
+* A pattern is compiled on its own and matched with its own fullmatch(), so it means the same as in re.fullmatch()
+
+Example:
+
+    >>> rules = StringRules(max_length=32, allowed_characters=string.ascii_letters + string.digits + '-', forbidden_substrings=('--', ))
+    >>> validator = RuleStringDataValidator(rules=rules)
+    >>> validator.validate(data='node-01')
+    True
+
+The defaults of the length, start_with_alpha, contain_at_least_one_space and can_be_none rules are the same as in
+validate_string(), and a StringRules with only those rules gives the same results.
+"""
+
+import re
+from operator import methodcaller
+from oculusd_utils.security.validation import L, StringDataValidator
+
+
+RULE_NAMES = (
+    'min_length', 'max_length', 'start_with_alpha', 'contain_at_least_one_space', 'can_be_none', 'allowed_characters',
+    'pattern', 'prefixes', 'suffixes', 'forbidden_substrings',
+)
+
+
+class StringRules:
+
+    def __init__(
+        self,
+        min_length: int=1,
+        max_length: int=255,
+        start_with_alpha: bool=True,
+        contain_at_least_one_space: bool=False,
+        can_be_none: bool=False,
+        allowed_characters: str=None,
+        pattern: str=None,
+        prefixes: tuple=None,
+        suffixes: tuple=None,
+        forbidden_substrings: tuple=None
+    ):
+        """
+        :param min_length: int (default=1)
+        :param max_length: int (default=255)
+        :param start_with_alpha: bool the first character must be a letter (default=True)
+        :param contain_at_least_one_space: bool (default=False)
+        :param can_be_none: bool None passes validation (default=False)
+        :param allowed_characters: str with every allowed character, for example string.ascii_letters + string.digits - an empty str only allows the empty string (default=None, which allows all characters)
+        :param pattern: str regular expression the whole value must match (default=None)
+        :param prefixes: tuple of str - the value must start with one of them, at least one (default=None)
+        :param suffixes: tuple of str - the value must end with one of them, at least one (default=None)
+        :param forbidden_substrings: tuple of str the value must not contain - an empty tuple forbids nothing (default=None)
+        """
+        if isinstance(prefixes, str):
+            prefixes = (prefixes, )
+        if isinstance(suffixes, str):
+            suffixes = (suffixes, )
+        if isinstance(forbidden_substrings, str):
+            forbidden_substrings = (forbidden_substrings, )
+        for name, values in (('prefixes', prefixes, ), ('suffixes', suffixes, ), ):
+            if values is not None and len(values) == 0:
+                raise Exception('{} must contain at least one value - use None to allow any value'.format(name))
+        if forbidden_substrings is not None and len(forbidden_substrings) == 0:
+            forbidden_substrings = None
+        self.min_length = min_length
+        self.max_length = max_length
+        self.start_with_alpha = start_with_alpha
+        self.contain_at_least_one_space = contain_at_least_one_space
+        self.can_be_none = can_be_none
+        self.allowed_characters = allowed_characters
+        self.pattern = pattern
+        self.prefixes = None if prefixes is None else tuple(prefixes)
+        self.suffixes = None if suffixes is None else tuple(suffixes)
+        self.forbidden_substrings = None if forbidden_substrings is None else tuple(forbidden_substrings)
+        self.regex = None
+        self.pattern_regex = None
+        # check(value)->bool, composed for these rules
+        self.check = self._compile()
+
+    def parameters(self)->dict:
+        return {name: getattr(self, name) for name in RULE_NAMES}
+
+    def _compile(self):
+        """Compose the check function from one predicate per rule that is set. Every predicate is a bound method of a
+        compiled regular expression, a frozenset or a str method, or a small closure.
+        """
+        can_be_none = self.can_be_none is True
+        min_length = int(self.min_length)
+        max_length = int(self.max_length)
+        predicates = [lambda value: min_length <= len(value) <= max_length]
+        if self.start_with_alpha:
+            # str.isalpha() has no exact regular expression equivalent, so this stays a separate check
+            predicates.append(lambda value: not value or value[0].isalpha())
+        if self.forbidden_substrings is not None:
+            # The generated rules are merged into one regular expression. DOTALL is scoped to the generated parts.
+            lookaheads = list()
+            if self.prefixes is not None:
+                lookaheads.append('(?=(?:{}))'.format('|'.join([re.escape(prefix) for prefix in self.prefixes])))
+            if self.suffixes is not None:
+                lookaheads.append('(?=(?s:.*)(?:{})\\Z)'.format('|'.join([re.escape(suffix) for suffix in self.suffixes])))
+            lookaheads.append('(?!(?s:.*)(?:{}))'.format('|'.join([re.escape(substring) for substring in self.forbidden_substrings])))
+            if self.contain_at_least_one_space:
+                lookaheads.append('(?=(?s:.*) )')
+            if self.allowed_characters == '':
+                lookaheads.append('(?=\\Z)')   # "[]" is not a valid character set - only the empty string passes
+            elif self.allowed_characters is not None:
+                lookaheads.append('(?=[{}]*\\Z)'.format(''.join([re.escape(character) for character in sorted(set(self.allowed_characters))])))
+            self.regex = re.compile('{}(?s:.*)'.format(''.join(lookaheads)))
+            predicates.append(self.regex.fullmatch)
+        else:
+            if self.allowed_characters is not None:
+                predicates.append(frozenset(self.allowed_characters).issuperset)
+            if self.prefixes is not None:
+                predicates.append(methodcaller('startswith', self.prefixes))
+            if self.suffixes is not None:
+                predicates.append(methodcaller('endswith', self.suffixes))
+            if self.contain_at_least_one_space:
+                predicates.append(methodcaller('__contains__', ' '))
+        if self.pattern is not None:
+            # Compiled on its own, so its inline flags and the meaning of "." are exactly those of re.fullmatch()
+            self.pattern_regex = re.compile(self.pattern)
+            predicates.append(self.pattern_regex.fullmatch)
+        predicates = tuple(predicates)
+
+        def check(value: object)->bool:
+            if value is None:
+                return can_be_none
+            if not isinstance(value, str):
+                return False
+            for predicate in predicates:
+                if not predicate(value):
+                    return False
+            return True
+
+        return check
+
+    def failed_indices(self, values: object)->list:
+        """:returns: list of the indices of the values that did not pass
+        """
+        check = self.check
+        return [index for index, value in enumerate(values) if not check(value)]
+
+
+class RuleStringDataValidator(StringDataValidator):
+    """A StringDataValidator that checks values against compiled StringRules. Keyword arguments of validate() with the
+    names of rules replace those rules - every combination is compiled once and then reused, for up to max_compiled
+    combinations (the oldest is dropped first).
+    """
+
+    def __init__(self, rules: StringRules=None, max_compiled: int=128, logger=L):
+        """
+        :param rules: StringRules (default=None, which uses the validate_string() defaults)
+        :param max_compiled: int number of compiled rule combinations kept (default=128)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        super().__init__(logger=logger)
+        self.rules = StringRules() if rules is None else rules
+        self.max_compiled = max_compiled
+        self._compiled = dict()
+
+    def validate(self, data: object, **kwarg)->bool:
+        if len(kwarg) == 0:
+            return self.rules.check(data)
+        overrides = tuple(sorted([(name, value, ) for name, value in kwarg.items() if name in RULE_NAMES]))
+        try:
+            rules = self._compiled.get(overrides)
+        except TypeError:
+            raise Exception('Rule parameters must be hashable - use tuples instead of lists')
+        if rules is None:
+            parameters = self.rules.parameters()
+            parameters.update(dict(overrides))
+            rules = StringRules(**parameters)
+            if len(self._compiled) >= self.max_compiled:
+                del self._compiled[next(iter(self._compiled))]
+            self._compiled[overrides] = rules
+            self.logger.debug('Compiled string rules for {}'.format(overrides))
+        return rules.check(data)
+
+# EOF
@@ -5,15 +5,149 @@
 # https://www.gnu.org/licenses/lgpl-3.0.txt
 
 import re
+import itertools
+import threading
 import traceback
 from oculusd_utils import OculusDLogger
 from decimal import Decimal
 
 
 L = OculusDLogger()
+_cached_validator_ids = itertools.count()
 
 
-def is_valid_email(email):
+class ValidationCache:
+    """A bounded cache of validation results, with CLOCK eviction
+
+    Results are keyed by (value type, value, validation parameters). Only values of the types in CACHEABLE_TYPES are
+    cached, and str and bytes values only up to max_value_length, so the cache never keeps large values alive. Other
+    values, including unhashable ones, are always validated.
+
+    CLOCK keeps a "referenced" flag per entry instead of maintaining a least recently used order: a hit only sets the
+    flag (no lock, no reordering), and eviction skips (and clears) flagged entries, which approximates LRU.
+    """
+
+    CACHEABLE_TYPES = frozenset(('str', 'bytes', 'int', 'float', 'bool', 'Decimal', 'NoneType', ))
+
+    def __init__(self, max_size: int=10000, max_value_length: int=256):
+        """
+        :param max_size: int maximum number of cached results (default=10000)
+        :param max_value_length: int maximum length of cached str and bytes values (default=256)
+        """
+        if max_size < 1:
+            raise Exception('max_size must be at least 1')
+        self.max_size = max_size
+        self.max_value_length = max_value_length
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self._entries = dict()      # key -> [result, referenced]
+        self._ring = list()         # keys in CLOCK order
+        self._hand = 0
+        self._lock = threading.Lock()
+
+    def key(self, value: object, parameters: object)->tuple:
+        """:param value: object the validated value
+        :param parameters: object with everything else the result depends on - it must be hashable to cache the result
+        :returns: tuple cache key, or None when the result must not be cached
+        """
+        type_name = type(value).__name__
+        if type_name not in self.CACHEABLE_TYPES or (type_name in ('str', 'bytes', ) and len(value) > self.max_value_length):
+            self.uncacheable += 1
+            return None
+        return (type_name, value, parameters, )    # The type is part of the key, because 1, 1.0 and True are equal dict keys
+
+    def get(self, key: tuple)->object:
+        """:returns: the cached result, or None when it is not cached (or key is None)
+        """
+        if key is None:
+            return None
+        try:
+            entry = self._entries.get(key)
+        except TypeError:
+            self.uncacheable += 1   # An unhashable value, or unhashable parameters
+            return None
+        if entry is None:
+            self.misses += 1
+            return None
+        entry[1] = True
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: tuple, result: object):
+        if key is not None and result is not None:
+            try:
+                self._insert(key=key, result=result)
+            except TypeError:
+                pass
+
+    def _insert(self, key: tuple, result: object):
+        with self._lock:
+            if key in self._entries:
+                return
+            if len(self._ring) < self.max_size:
+                self._ring.append(key)
+            else:
+                while True:
+                    old_key = self._ring[self._hand]
+                    old_entry = self._entries[old_key]
+                    if old_entry[1] is True:
+                        old_entry[1] = False
+                        self._hand = (self._hand + 1) % self.max_size
+                        continue
+                    del self._entries[old_key]
+                    self._ring[self._hand] = key
+                    self._hand = (self._hand + 1) % self.max_size
+                    break
+            self._entries[key] = [result, False]
+
+    def size(self)->int:
+        return len(self._entries)
+
+    def hit_rate(self)->float:
+        """:returns: float fraction of the cacheable lookups that were served from the cache
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+    def statistics(self)->dict:
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'uncacheable': self.uncacheable,
+            'hit_rate': self.hit_rate(),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries = dict()
+            self._ring = list()
+            self._hand = 0
+            self.hits = 0
+            self.misses = 0
+            self.uncacheable = 0
+
+
+def is_valid_email(email, cache: ValidationCache=None):
+    """
+    :param email: str email address
+    :param cache: ValidationCache to look up and store the result in (default=None)
+    """
+    if cache is None:
+        return _is_valid_email(email)
+    key = cache.key(value=email, parameters='email')
+    result = cache.get(key=key)
+    if result is None:
+        result = _is_valid_email(email)
+        cache.put(key=key, result=result)
+    return result
+
+
+def _is_valid_email(email):
     L.debug('email={}'.format(email))   # pragma: no cover
     if ' ' in email:
         return False
@@ -189,4 +323,52 @@ class NumberDataValidator(DataValidator):
             return self._validate_str(data=data, **kwarg)
         raise Exception('Unsupported number type')
 
+
+class CachedDataValidator(DataValidator):
+    """Memoises the results of another DataValidator - useful for fields with few distinct values, such as country
+    codes or status strings:
+
+        >>> validator = CachedDataValidator(validator=StringDataValidator(), cache=ValidationCache(max_size=1000))
+        >>> validator.validate(data='NL', max_length=2)     # validated and cached
+        >>> validator.validate(data='NL', max_length=2)     # from the cache
+        >>> validator.cache.hit_rate()
+        0.5
+
+    The keyword arguments are part of the cache key, sorted by name, so their order does not matter. Keyword
+    arguments given with the value in defaults are left out of the key, so they share the entry of a call that omits
+    them. Side effects of the wrapped validator, like log messages, only happen when a value is not found in the cache.
+    """
+
+    def __init__(self, validator: DataValidator, cache: ValidationCache=None, defaults: dict=None, logger=L):
+        """
+        :param validator: DataValidator of which the results are cached
+        :param cache: ValidationCache - may be shared by several CachedDataValidators (default=None, which creates a ValidationCache with the default size)
+        :param defaults: dict of the keyword arguments the validator uses when they are not given, for example {'min_length': 1, 'max_length': 255} (default=None)
+        :param logger: OculusDLogger (default=OculusDLogger())
+        """
+        super().__init__(logger=logger)
+        if not isinstance(validator, DataValidator):
+            raise Exception('Invalid data validator type. Expected an implementation of DataValidator')
+        self.validator = validator
+        self.cache = ValidationCache() if cache is None else cache
+        self.defaults = dict() if defaults is None else dict(defaults)
+        # Separates the results of validators sharing one cache (unlike id(), never reused for another validator)
+        self._validator_id = next(_cached_validator_ids)
+
+    def validate(self, data: object, **kwarg)->bool:
+        parameters = tuple(sorted(kwarg.items()))
+        if len(self.defaults) > 0:
+            defaults = self.defaults
+            parameters = tuple([
+                (name, value, ) for name, value in parameters
+                if name not in defaults or not (type(value) is type(defaults[name]) and value == defaults[name])
+            ])
+        key = self.cache.key(value=data, parameters=(self._validator_id, parameters, ))
+        result = self.cache.get(key=key)
+        if result is None:
+            # Exceptions raised by the validator are not cached
+            result = self.validator.validate(data=data, **kwarg)
+            self.cache.put(key=key, result=result)
+        return result
+
 # EOF
@@ -17,10 +17,31 @@ Usage
 """
 
 import unittest
-from tests.test_logging import TestOculusDLogger, TestGetUtcTimestamp
+from tests.test_logging import TestOculusDLogger, TestGetUtcTimestamp, TestCoarseClock
 from tests.test_security import TestInitFunctions
 from tests.test_validation import TestEmailValidation, TestStringValidation, TestDataValidator, TestStringDataValidator, TestNumberDataValidator
-from tests.test_persistence import TestGenericDataContainer, TestGenericIOProcessor, TestGenericIO, TestTextFileIO, TestValidateFileExistIOProcessor
+from tests.test_persistence import TestGenericDataContainer, TestGenericIOProcessor, TestGenericIO, TestTextFileIO, TestValidateFileExistIOProcessor, TestStringPool, TestMemoryBudget
+from tests.test_import_time import TestImportTime
+from tests.test_redaction import TestSecretRedactor, TestSecretRedactionFilter
+from tests.test_json_logging import TestJsonLogFormatter, TestOculusDLoggerStructuredOutput
+from tests.test_logging import TestLogRateLimit
+from tests.test_watcher import TestCacheWatcher
+from tests.test_shared_cache import TestSharedMemoryCache
+from tests.test_warm_cache import TestWarmStartCache
+from tests.test_sqlite_io import TestSQLiteIO
+from tests.test_log_store import TestLogStructuredIO
+from tests.test_lazy_json import TestScanKeyRanges, TestLazyJsonFileIO
+from tests.test_concurrent import TestConcurrentDictContainer
+from tests.test_snapshots import TestSnapshotDataContainer
+from tests.test_delta_io import TestDeltaFileIO
+from tests.test_ndjson_io import TestNDJsonIO
+from tests.test_table import TestValidateColumn, TestTableDataContainer, TestCsvTableIO
+from tests.test_parallel_validation import TestParallelValidator
+from tests.test_validation import TestValidationCache
+from tests.test_string_rules import TestStringRules
+from tests.test_spill import TestSpillableList, TestSpillableListContainer, TestSpillableListContainerWriters
+from tests.test_indexes import TestIndexedListContainer
+from tests.test_scalars import TestScalarDataContainer
 
 
 def suite():
@@ -36,6 +57,12 @@ def suite():
 
     suite.addTest(TestGetUtcTimestamp('test_get_utc_timestamp_without_decimal'))
     suite.addTest(TestGetUtcTimestamp('test_get_utc_timestamp_with_decimal'))
+    suite.addTest(TestGetUtcTimestamp('test_get_utc_timestamp_matches_wall_clock'))
+    suite.addTest(TestGetUtcTimestamp('test_get_monotonic_timestamp'))
+
+    suite.addTest(TestCoarseClock('test_coarse_clock_not_started_reads_real_clock'))
+    suite.addTest(TestCoarseClock('test_coarse_clock_started_returns_cached_values'))
+    suite.addTest(TestCoarseClock('test_coarse_clock_invalid_resolution_expect_exception'))
 
     suite.addTest(TestInitFunctions('test_mask_str1_defaults'))
     suite.addTest(TestInitFunctions('test_mask_none_string_defaults'))
@@ -139,6 +166,8 @@ def suite():
     suite.addTest(TestTextFileIO('test_text_file_io_basic_text_data_read_without_cache'))
     suite.addTest(TestTextFileIO('test_text_file_io_basic_text_data_read_with_cache'))
     suite.addTest(TestTextFileIO('test_text_file_io_basic_text_data_read_with_cache_force_refresh'))
+    suite.addTest(TestTextFileIO('test_text_file_io_cache_expiry_uses_injected_clock'))
+    suite.addTest(TestTextFileIO('test_text_file_io_invalidate_cache'))
     suite.addTest(TestTextFileIO('test_text_file_io_multi_line_text_data_read_without_cache'))
     suite.addTest(TestTextFileIO('test_text_file_io_empty_text_data_read_without_cache'))
     suite.addTest(TestTextFileIO('test_text_file_io_basic_text_data_read_without_cache_with_read_processor'))
@@ -172,6 +201,245 @@ def suite():
     suite.addTest(TestValidateFileExistIOProcessor('test_validate_file_exists_io_processor_test_non_existing_file_expect_exception'))
     suite.addTest(TestValidateFileExistIOProcessor('test_validate_file_exists_io_processor_test_invalid_generic_data_container_expect_exception'))
     suite.addTest(TestValidateFileExistIOProcessor('test_validate_file_exists_io_processor_test_invalid_generic_data_container_value_type_expect_exception'))
+    suite.addTest(TestValidateFileExistIOProcessor('test_validate_file_exists_io_processor_bulk'))
+    suite.addTest(TestValidateFileExistIOProcessor('test_validate_file_exists_io_processor_bulk_invalid_input_expect_exception'))
+    suite.addTest(TestValidateFileExistIOProcessor('test_validate_file_exists_io_processor_cache'))
+    suite.addTest(TestValidateFileExistIOProcessor('test_validate_file_exists_io_processor_lists_large_directory_only_when_cheaper'))
+    suite.addTest(TestValidateFileExistIOProcessor('test_validate_file_exists_io_processor_cache_size_limit'))
+
+    suite.addTest(TestImportTime('test_import_package_does_not_import_sub_packages'))
+    suite.addTest(TestImportTime('test_import_persistence_skips_lazy_modules'))
+    suite.addTest(TestImportTime('test_import_persistence_import_time_cap'))
+    suite.addTest(TestImportTime('test_import_package_attaches_no_handler'))
+    suite.addTest(TestImportTime('test_lazy_sub_package_attribute'))
+    suite.addTest(TestImportTime('test_lazy_home'))
+
+    suite.addTest(TestSecretRedactor('test_redact_key_value_password'))
+    suite.addTest(TestSecretRedactor('test_redact_json_api_key'))
+    suite.addTest(TestSecretRedactor('test_redact_bearer_token'))
+    suite.addTest(TestSecretRedactor('test_redact_url_credentials'))
+    suite.addTest(TestSecretRedactor('test_redact_jwt_and_aws_key'))
+    suite.addTest(TestSecretRedactor('test_redact_literal_secret'))
+    suite.addTest(TestSecretRedactor('test_redact_add_literal_and_pattern'))
+    suite.addTest(TestSecretRedactor('test_redact_add_pattern_with_anchors_keeps_prefilter'))
+    suite.addTest(TestSecretRedactor('test_redact_pattern_without_anchors_disables_prefilter'))
+    suite.addTest(TestSecretRedactor('test_redact_no_secrets_returns_same_message'))
+    suite.addTest(TestSecretRedactor('test_redact_variable_mask_length'))
+    suite.addTest(TestSecretRedactor('test_redact_masks_like_mask_sensitive_string'))
+    suite.addTest(TestSecretRedactor('test_redact_mask_flag_false'))
+    suite.addTest(TestSecretRedactor('test_redact_no_patterns'))
+    suite.addTest(TestSecretRedactor('test_redact_invalid_pattern_expect_exception'))
+    suite.addTest(TestSecretRedactor('test_redact_global_inline_flag_expect_exception'))
+
+    suite.addTest(TestSecretRedactionFilter('test_filter_with_oculusd_logger'))
+    suite.addTest(TestSecretRedactionFilter('test_filter_with_record_args'))
+    suite.addTest(TestSecretRedactionFilter('test_filter_with_non_string_message'))
+
+    suite.addTest(TestJsonLogFormatter('test_json_formatter_basic_record'))
+    suite.addTest(TestJsonLogFormatter('test_json_formatter_without_host_and_service'))
+    suite.addTest(TestJsonLogFormatter('test_json_formatter_timestamp_cached_per_second'))
+    suite.addTest(TestJsonLogFormatter('test_json_formatter_exception'))
+
+    suite.addTest(TestOculusDLoggerStructuredOutput('test_structured_output_without_debug'))
+    suite.addTest(TestOculusDLoggerStructuredOutput('test_structured_output_with_debug_caller_fields'))
+    suite.addTest(TestOculusDLoggerStructuredOutput('test_structured_output_is_per_handler'))
+    suite.addTest(TestOculusDLoggerStructuredOutput('test_disable_structured_output_restores_text'))
+
+    suite.addTest(TestLogRateLimit('test_rate_limit_first_n_then_suppress'))
+    suite.addTest(TestLogRateLimit('test_rate_limit_per_level'))
+    suite.addTest(TestLogRateLimit('test_rate_limit_debug_level'))
+    suite.addTest(TestLogRateLimit('test_rate_limit_summary_after_interval'))
+    suite.addTest(TestLogRateLimit('test_rate_limit_invalid_parameters_expect_exception'))
+    suite.addTest(TestLogRateLimit('test_rate_limit_summary_with_none_message'))
+
+    suite.addTest(TestCacheWatcher('test_watcher_invalidates_cache_on_change'))
+    suite.addTest(TestCacheWatcher('test_watcher_refresh_mode'))
+    suite.addTest(TestCacheWatcher('test_watcher_scandir_directory_with_subscribers'))
+    suite.addTest(TestCacheWatcher('test_watcher_new_file_detected'))
+    suite.addTest(TestCacheWatcher('test_watcher_batches_round_robin'))
+    suite.addTest(TestCacheWatcher('test_watcher_splits_large_directory_over_polls'))
+    suite.addTest(TestCacheWatcher('test_watcher_unwatch'))
+    suite.addTest(TestCacheWatcher('test_watcher_failing_subscriber_does_not_stop_others'))
+    suite.addTest(TestCacheWatcher('test_watcher_background_thread'))
+    suite.addTest(TestCacheWatcher('test_watcher_invalid_parameters_expect_exception'))
+
+    suite.addTest(TestSharedMemoryCache('test_put_and_get'))
+    suite.addTest(TestSharedMemoryCache('test_replace_bumps_version_and_removes_old_file'))
+    suite.addTest(TestSharedMemoryCache('test_invalidate'))
+    suite.addTest(TestSharedMemoryCache('test_max_age'))
+    suite.addTest(TestSharedMemoryCache('test_entry_from_before_a_reboot_is_expired'))
+    suite.addTest(TestSharedMemoryCache('test_temporary_files_of_crashed_writer_are_removed'))
+    suite.addTest(TestSharedMemoryCache('test_eviction_when_full'))
+    suite.addTest(TestSharedMemoryCache('test_shared_between_processes'))
+    suite.addTest(TestSharedMemoryCache('test_worker_crash_while_holding_lock'))
+    suite.addTest(TestSharedMemoryCache('test_half_written_slot_is_ignored_and_repaired'))
+    suite.addTest(TestSharedMemoryCache('test_invalid_index_file_expect_exception'))
+    suite.addTest(TestSharedMemoryCache('test_text_file_io_with_shared_cache'))
+    suite.addTest(TestSharedMemoryCache('test_text_file_io_with_shared_cache_force_and_write'))
+    suite.addTest(TestSharedMemoryCache('test_cache_backend_base_class_expect_exception'))
+    suite.addTest(TestSharedMemoryCache('test_text_file_io_invalid_cache_backend_expect_exception'))
+
+    suite.addTest(TestWarmStartCache('test_put_and_get_container_survives_restart'))
+    suite.addTest(TestWarmStartCache('test_lazy_get_without_warm_up'))
+    suite.addTest(TestWarmStartCache('test_changed_file_is_not_served'))
+    suite.addTest(TestWarmStartCache('test_removed_file'))
+    suite.addTest(TestWarmStartCache('test_warm_up_selected_parsers'))
+    suite.addTest(TestWarmStartCache('test_unreadable_entry_is_dropped'))
+    suite.addTest(TestWarmStartCache('test_unreadable_dict_entry_is_dropped_on_get'))
+    suite.addTest(TestWarmStartCache('test_returned_data_is_a_copy'))
+    suite.addTest(TestWarmStartCache('test_file_changed_after_read_is_not_cached'))
+    suite.addTest(TestWarmStartCache('test_invalidate'))
+    suite.addTest(TestWarmStartCache('test_put_invalid_data_expect_exception'))
+    suite.addTest(TestWarmStartCache('test_text_file_io_with_warm_start_cache'))
+    suite.addTest(TestWarmStartCache('test_text_file_io_write_is_cached'))
+
+    suite.addTest(TestSQLiteIO('test_write_and_read_all_types'))
+    suite.addTest(TestSQLiteIO('test_write_replaces_result_set'))
+    suite.addTest(TestSQLiteIO('test_read_keys_without_loading_everything'))
+    suite.addTest(TestSQLiteIO('test_put_and_delete_item'))
+    suite.addTest(TestSQLiteIO('test_next_position_uses_index'))
+    suite.addTest(TestSQLiteIO('test_write_many_in_one_transaction'))
+    suite.addTest(TestSQLiteIO('test_failed_write_is_rolled_back'))
+    suite.addTest(TestSQLiteIO('test_delete_and_missing_result_set'))
+    suite.addTest(TestSQLiteIO('test_processors'))
+    suite.addTest(TestSQLiteIO('test_connection_per_thread'))
+    suite.addTest(TestSQLiteIO('test_invalid_parameters_expect_exception'))
+
+    suite.addTest(TestLogStructuredIO('test_put_get_delete_and_reopen'))
+    suite.addTest(TestLogStructuredIO('test_single_key_update_cost'))
+    suite.addTest(TestLogStructuredIO('test_container_store_appends'))
+    suite.addTest(TestLogStructuredIO('test_write_replaces_content'))
+    suite.addTest(TestLogStructuredIO('test_segments_compaction_and_hint_files'))
+    suite.addTest(TestLogStructuredIO('test_crash_during_compaction_does_not_resurrect_deleted_keys'))
+    suite.addTest(TestLogStructuredIO('test_truncated_record_is_removed_on_open'))
+    suite.addTest(TestLogStructuredIO('test_background_compaction'))
+    suite.addTest(TestLogStructuredIO('test_invalid_parameters_expect_exception'))
+
+    suite.addTest(TestScanKeyRanges('test_scan_key_ranges'))
+    suite.addTest(TestScanKeyRanges('test_scan_empty_object'))
+    suite.addTest(TestScanKeyRanges('test_scan_invalid_documents_expect_exception'))
+
+    suite.addTest(TestLazyJsonFileIO('test_values_are_decoded_on_access'))
+    suite.addTest(TestLazyJsonFileIO('test_without_value_cache'))
+    suite.addTest(TestLazyJsonFileIO('test_changes_in_memory_and_write'))
+    suite.addTest(TestLazyJsonFileIO('test_index_is_persisted_and_reused'))
+    suite.addTest(TestLazyJsonFileIO('test_changed_file_expect_exception'))
+    suite.addTest(TestLazyJsonFileIO('test_close_closes_key_index'))
+    suite.addTest(TestLazyJsonFileIO('test_key_index_many_keys'))
+    suite.addTest(TestLazyJsonFileIO('test_invalid_index_file_is_replaced'))
+    suite.addTest(TestLazyJsonFileIO('test_index_not_persisted'))
+    suite.addTest(TestLazyJsonFileIO('test_container_cache'))
+    suite.addTest(TestLazyJsonFileIO('test_empty_file_expect_exception'))
+
+    suite.addTest(TestConcurrentDictContainer('test_store_and_read'))
+    suite.addTest(TestConcurrentDictContainer('test_without_validator'))
+    suite.addTest(TestConcurrentDictContainer('test_update_is_all_or_nothing'))
+    suite.addTest(TestConcurrentDictContainer('test_data_setter_and_merge_into'))
+    suite.addTest(TestConcurrentDictContainer('test_data_is_read_only'))
+    suite.addTest(TestConcurrentDictContainer('test_snapshot_is_published_once_and_copied_on_write'))
+    suite.addTest(TestConcurrentDictContainer('test_parallel_store_and_consistent_snapshots'))
+    suite.addTest(TestConcurrentDictContainer('test_invalid_stripe_count_expect_exception'))
+
+    suite.addTest(TestSnapshotDataContainer('test_dict_snapshot_is_copy_on_write'))
+    suite.addTest(TestSnapshotDataContainer('test_dict_is_copied_once_per_snapshot'))
+    suite.addTest(TestSnapshotDataContainer('test_dict_changes'))
+    suite.addTest(TestSnapshotDataContainer('test_dict_changes_only_does_not_share_the_dict'))
+    suite.addTest(TestSnapshotDataContainer('test_data_assignment_requires_full_write'))
+    suite.addTest(TestSnapshotDataContainer('test_list_snapshot_and_changes'))
+    suite.addTest(TestSnapshotDataContainer('test_unsupported_data_type_expect_exception'))
+
+    suite.addTest(TestDeltaFileIO('test_dict_deltas_are_appended'))
+    suite.addTest(TestDeltaFileIO('test_list_deltas_are_appended'))
+    suite.addTest(TestDeltaFileIO('test_compaction'))
+    suite.addTest(TestDeltaFileIO('test_plain_containers_are_written_in_full'))
+    suite.addTest(TestDeltaFileIO('test_partly_written_record_is_dropped'))
+    suite.addTest(TestDeltaFileIO('test_invalid_file_expect_exception'))
+
+    suite.addTest(TestNDJsonIO('test_write_and_read'))
+    suite.addTest(TestNDJsonIO('test_records_are_lazy_and_batched'))
+    suite.addTest(TestNDJsonIO('test_validation_while_streaming'))
+    suite.addTest(TestNDJsonIO('test_writer_buffers_records'))
+    suite.addTest(TestNDJsonIO('test_writer_counts_encoded_bytes'))
+    suite.addTest(TestNDJsonIO('test_invalid_parameters_expect_exception'))
+
+    suite.addTest(TestValidateColumn('test_string_columns'))
+    suite.addTest(TestValidateColumn('test_number_columns'))
+
+    suite.addTest(TestTableDataContainer('test_extend_and_read'))
+    suite.addTest(TestTableDataContainer('test_invalid_batches_are_not_added'))
+    suite.addTest(TestTableDataContainer('test_projection_shares_columns'))
+    suite.addTest(TestTableDataContainer('test_data_assignment'))
+    suite.addTest(TestTableDataContainer('test_invalid_schema_expect_exception'))
+
+    suite.addTest(TestCsvTableIO('test_write_and_read'))
+    suite.addTest(TestCsvTableIO('test_extra_columns_are_ignored_and_errors_have_line_numbers'))
+
+    suite.addTest(TestParallelValidator('test_small_input_is_validated_inline'))
+    suite.addTest(TestParallelValidator('test_sequence_shards_are_merged_in_order'))
+    suite.addTest(TestParallelValidator('test_numeric_arrays_use_shared_memory'))
+    suite.addTest(TestParallelValidator('test_sequence_shards_are_submitted_in_a_bounded_window'))
+    suite.addTest(TestParallelValidator('test_invalid_parameters_expect_exception'))
+
+    suite.addTest(TestValidationCache('test_results_are_cached_per_parameters'))
+    suite.addTest(TestValidationCache('test_parameter_order_and_defaults_share_entries'))
+    suite.addTest(TestValidationCache('test_validators_sharing_a_cache'))
+    suite.addTest(TestValidationCache('test_clock_eviction'))
+    suite.addTest(TestValidationCache('test_large_and_unhashable_values_are_not_cached'))
+    suite.addTest(TestValidationCache('test_number_results_keep_types_apart'))
+    suite.addTest(TestValidationCache('test_email_results_are_cached'))
+
+    suite.addTest(TestStringRules('test_same_results_as_validate_string'))
+    suite.addTest(TestStringRules('test_character_prefix_and_suffix_rules'))
+    suite.addTest(TestStringRules('test_rules_merged_into_one_regex'))
+    suite.addTest(TestStringRules('test_pattern_keeps_its_own_meaning'))
+    suite.addTest(TestStringRules('test_empty_rule_values'))
+    suite.addTest(TestStringRules('test_validator'))
+
+    suite.addTest(TestStringPool('test_string_pool_intern_returns_first_string'))
+    suite.addTest(TestStringPool('test_string_pool_is_bounded'))
+    suite.addTest(TestStringPool('test_string_pool_skips_long_strings_and_other_types'))
+    suite.addTest(TestStringPool('test_string_pool_deduplicate_nested_values'))
+    suite.addTest(TestStringPool('test_generic_data_container_with_string_pool_list'))
+    suite.addTest(TestStringPool('test_generic_data_container_store_many'))
+    suite.addTest(TestStringPool('test_generic_data_container_store_many_unsupported_data_type_expect_exception'))
+
+    suite.addTest(TestMemoryBudget('test_deep_size_includes_nested_values'))
+    suite.addTest(TestMemoryBudget('test_container_tracks_size_on_store'))
+    suite.addTest(TestMemoryBudget('test_container_tracks_size_of_list_and_scalar_data'))
+    suite.addTest(TestMemoryBudget('test_failed_store_is_not_counted'))
+    suite.addTest(TestMemoryBudget('test_garbage_collected_owner_is_forgotten'))
+    suite.addTest(TestMemoryBudget('test_text_file_io_cache_released_when_over_limit'))
+    suite.addTest(TestMemoryBudget('test_enforce_releases_largest_owner_first'))
+    suite.addTest(TestMemoryBudget('test_enforce_waits_for_growth_when_nothing_can_be_released'))
+    suite.addTest(TestMemoryBudget('test_data_assignment_is_accounted'))
+    suite.addTest(TestMemoryBudget('test_every_container_subclass_reports_memory_usage'))
+
+    suite.addTest(TestSpillableList('test_pickled_chunks_random_access_and_iteration'))
+    suite.addTest(TestSpillableList('test_page_cache'))
+    suite.addTest(TestSpillableList('test_numeric_chunks_read_through_mmap'))
+    suite.addTest(TestSpillableList('test_close_removes_spill_file'))
+    suite.addTest(TestSpillableList('test_equality_and_repr_match_list'))
+    suite.addTest(TestSpillableList('test_invalid_parameters_expect_exception'))
+
+    suite.addTest(TestSpillableListContainer('test_store_with_validation'))
+    suite.addTest(TestSpillableListContainer('test_memory_budget_spills_chunks'))
+
+    suite.addTest(TestSpillableListContainerWriters('test_text_file_io'))
+    suite.addTest(TestSpillableListContainerWriters('test_ndjson_io'))
+    suite.addTest(TestSpillableListContainerWriters('test_sqlite_io'))
+    suite.addTest(TestSpillableListContainerWriters('test_delta_file_io'))
+
+    suite.addTest(TestIndexedListContainer('test_hash_index_lookup'))
+    suite.addTest(TestIndexedListContainer('test_sorted_index_range'))
+    suite.addTest(TestIndexedListContainer('test_records_without_field_are_not_indexed'))
+    suite.addTest(TestIndexedListContainer('test_value_that_can_not_be_indexed_is_not_stored'))
+    suite.addTest(TestIndexedListContainer('test_rebuild_indexes'))
+
+    suite.addTest(TestScalarDataContainer('test_parse_int_is_exact_for_integer_strings'))
+    suite.addTest(TestScalarDataContainer('test_conversions'))
+    suite.addTest(TestScalarDataContainer('test_bound_number_validation'))
+    suite.addTest(TestScalarDataContainer('test_bound_decimal_validation'))
+    suite.addTest(TestScalarDataContainer('test_other_validator_with_bound_parameters'))
 
     return suite
 
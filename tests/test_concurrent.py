@@ -0,0 +1,141 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_concurrent
+    $ coverage report -m
+"""
+
+import json
+import unittest
+import threading
+from unittest import mock
+from oculusd_utils.persistence import GenericDataContainer
+from oculusd_utils.security.validation import DataValidator
+from oculusd_utils.persistence.concurrent import ConcurrentDictContainer
+
+
+class EvenNumberValidator(DataValidator):
+
+    def validate(self, data: object, **kwarg)->bool:
+        return isinstance(data, int) and data % 2 == 0
+
+
+class TestConcurrentDictContainer(unittest.TestCase):
+
+    def test_store_and_read(self):
+        data = ConcurrentDictContainer(data_validator=EvenNumberValidator(), stripe_count=4)
+        self.assertIsInstance(data, GenericDataContainer)
+        self.assertEqual('dict', data.data_type.__name__)
+        self.assertEqual(1, data.store(data=2, key='a'))
+        self.assertEqual(2, data.store(data=4, key=1))
+        self.assertEqual(2, data.store(data=6, key='a'))
+        with self.assertRaises(Exception):
+            data.store(data=3, key='odd')
+        with self.assertRaises(Exception):
+            data.store(data=2, key=None)
+        self.assertEqual(6, data.get(key='a'))
+        self.assertIsNone(data.get(key='odd'))
+        self.assertTrue(data.contains(key=1))
+        self.assertEqual({'a': 6, 1: 4}, data.data)
+        self.assertTrue(data.delete(key=1))
+        self.assertFalse(data.delete(key=1))
+        self.assertEqual(1, data.key_count())
+
+    def test_without_validator(self):
+        data = ConcurrentDictContainer()
+        data.store(data='anything', key='a')
+        self.assertEqual({'a': 'anything'}, data.snapshot())
+
+    def test_update_is_all_or_nothing(self):
+        data = ConcurrentDictContainer(data_validator=EvenNumberValidator())
+        self.assertEqual(3, data.update(items={'a': 2, 'b': 4, 'c': 6}))
+        with self.assertRaises(Exception):
+            data.update(items={'d': 8, 'e': 9})
+        self.assertEqual({'a': 2, 'b': 4, 'c': 6}, data.snapshot())
+
+    def test_data_setter_and_merge_into(self):
+        data = ConcurrentDictContainer(stripe_count=3)
+        data.data = {'key-{}'.format(i): i for i in range(100)}
+        self.assertEqual(100, data.key_count())
+        target = {'key-0': 'replaced', 'other': True}
+        self.assertIs(target, data.merge_into(target=target))
+        self.assertEqual(101, len(target))
+        self.assertEqual(0, target['key-0'])
+        self.assertEqual(100, data.store_many(items={'key-0': 1}))
+        self.assertEqual(1, data.snapshot()['key-0'])
+
+    def test_data_is_read_only(self):
+        data = ConcurrentDictContainer()
+        data.store(data=1, key='a')
+        copy = data.data
+        self.assertIsInstance(copy, dict)
+        self.assertEqual('{"a": 1}', json.dumps(copy))
+        with self.assertRaises(Exception):
+            copy['b'] = 2
+        with self.assertRaises(Exception):
+            del copy['a']
+        with self.assertRaises(Exception):
+            copy.update({'b': 2})
+        self.assertEqual({'a': 1}, data.data)
+
+    def test_snapshot_is_published_once_and_copied_on_write(self):
+        data = ConcurrentDictContainer(stripe_count=4)
+        data.update(items={'key-{}'.format(i): i for i in range(20)})
+        published = data.data
+        self.assertIs(published, data.data)
+        shards = list(data._shards)
+        with mock.patch.object(data, '_locks', None):
+            self.assertIs(published, data.data)     # No change since - no lock is used
+        data.store(data=-1, key='key-0')
+        self.assertEqual(0, published['key-0'])
+        self.assertEqual(-1, data.data['key-0'])
+        self.assertEqual(1, len([stripe for stripe in range(4) if data._shards[stripe] is not shards[stripe]]))
+        self.assertTrue(data.delete(key='key-1'))
+        self.assertNotIn('key-1', data.data)
+        self.assertIn('key-1', published)
+
+    def test_parallel_store_and_consistent_snapshots(self):
+        data = ConcurrentDictContainer(data_validator=EvenNumberValidator(), stripe_count=8)
+        snapshots = list()
+
+        def writer(number: int):
+            for i in range(500):
+                data.store(data=i * 2, key='{}-{}'.format(number, i))
+
+        def bulk_writer():
+            for i in range(50):
+                data.update(items={'pair-{}-a'.format(i): 0, 'pair-{}-b'.format(i): 0})
+
+        def reader():
+            for i in range(50):
+                snapshots.append(data.snapshot())
+
+        threads = [threading.Thread(target=writer, args=(number, )) for number in range(4)]
+        threads.append(threading.Thread(target=bulk_writer))
+        threads.append(threading.Thread(target=reader))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(4 * 500 + 100, data.key_count())
+        for snapshot in snapshots:
+            for i in range(50):
+                self.assertEqual('pair-{}-a'.format(i) in snapshot, 'pair-{}-b'.format(i) in snapshot)
+
+    def test_invalid_stripe_count_expect_exception(self):
+        with self.assertRaises(Exception):
+            ConcurrentDictContainer(stripe_count=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -0,0 +1,138 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_delta_io
+    $ coverage report -m
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from oculusd_utils.persistence import GenericDataContainer
+from oculusd_utils.persistence.delta_io import DeltaFileIO
+from oculusd_utils.persistence.snapshots import SnapshotDataContainer
+
+
+def line_count(path: str)->int:
+    with open(path, 'r') as f:
+        return len(f.readlines())
+
+
+class TestDeltaFileIO(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.delta_io = DeltaFileIO(file_folder_path=self.directory, file_name='data.ndjson')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def reopen(self, **kwarg)->DeltaFileIO:
+        self.delta_io = DeltaFileIO(file_folder_path=self.directory, file_name='data.ndjson', **kwarg)
+        return self.delta_io
+
+    def test_dict_deltas_are_appended(self):
+        data = self.delta_io.read()
+        self.assertIsInstance(data, SnapshotDataContainer)
+        self.assertEqual({}, data.data)
+        data.data = {'key-{}'.format(i): i for i in range(100)}
+        self.delta_io.write(data=data)
+        self.assertEqual(101, line_count(path=self.delta_io.uri))
+        data.store(data='changed', key='key-1')
+        data.store(data=Decimal('1.10'), key=2)
+        data.delete(key='key-3')
+        self.delta_io.write(data=data)
+        self.assertEqual(104, line_count(path=self.delta_io.uri))
+        self.delta_io.write(data=data)
+        self.assertEqual(104, line_count(path=self.delta_io.uri))
+        self.assertEqual(3, self.delta_io.delta_records)
+        live = data.data
+        data.store(data='changed again', key='key-1')
+        self.assertIs(live, data.data)    # A delta write does not share the dict, so the store did not copy it
+        self.delta_io.write(data=data)
+        self.assertEqual(105, line_count(path=self.delta_io.uri))
+        result = self.reopen().read()
+        self.assertEqual(data.data, result.data)
+        self.assertEqual(Decimal('1.10'), result.data[2])
+        self.assertNotIn('2', result.data)
+        self.assertFalse(result.is_dirty())
+        result.store(data=0, key='key-0')
+        self.delta_io.write(data=result)
+        self.assertEqual(106, line_count(path=self.delta_io.uri))
+
+    def test_list_deltas_are_appended(self):
+        data = self.delta_io.read(data_type=list)
+        data.store(data='a')
+        self.delta_io.write(data=data)
+        data.store(data='b')
+        data.store(data=Decimal('2'))
+        self.delta_io.write(data=data)
+        self.assertEqual(4, line_count(path=self.delta_io.uri))
+        self.assertEqual(['a', 'b', Decimal('2')], self.reopen().read().data)
+
+    def test_compaction(self):
+        delta_io = self.reopen(min_compaction_records=5, compaction_ratio=1.0)
+        data = delta_io.read()
+        data.data = {'a': 0, 'b': 0}
+        delta_io.write(data=data)
+        for i in range(5):
+            data.store(data=i, key='a')
+            delta_io.write(data=data)
+        self.assertTrue(delta_io.needs_compaction())
+        self.assertEqual(8, line_count(path=delta_io.uri))
+        data.store(data=5, key='a')
+        delta_io.write(data=data)
+        self.assertEqual(3, line_count(path=delta_io.uri))
+        self.assertFalse(delta_io.needs_compaction())
+        data.store(data=6, key='a')
+        delta_io.write(data=data)
+        self.assertEqual(1, self.reopen().compact())
+        self.assertEqual(3, line_count(path=delta_io.uri))
+        self.assertEqual({'a': 6, 'b': 0}, self.delta_io.read().data)
+        delta_io.write(data=data, compact=True)
+        self.assertEqual(3, line_count(path=delta_io.uri))
+
+    def test_plain_containers_are_written_in_full(self):
+        data = GenericDataContainer(data_type=dict)
+        data.store(data=1, key='a')
+        self.delta_io.write(data=data)
+        data.store(data=2, key='b')
+        self.delta_io.write(data=data)
+        self.assertEqual(3, line_count(path=self.delta_io.uri))
+        self.assertEqual({'a': 1, 'b': 2}, self.reopen().read().data)
+        with self.assertRaises(Exception):
+            self.delta_io.write(data=GenericDataContainer(data_type=str))
+
+    def test_partly_written_record_is_dropped(self):
+        data = self.delta_io.read()
+        data.store(data=1, key='a')
+        self.delta_io.write(data=data)
+        with open(self.delta_io.uri, 'a') as f:
+            f.write('["s","b","js')
+        result = self.reopen().read()
+        self.assertEqual({'a': 1}, result.data)
+        result.store(data=3, key='c')
+        self.delta_io.write(data=result)
+        self.assertEqual({'a': 1, 'c': 3}, self.reopen().read().data)
+
+    def test_invalid_file_expect_exception(self):
+        with open(self.delta_io.uri, 'w') as f:
+            f.write('{"format": "something else"}\n')
+        with self.assertRaises(Exception):
+            self.delta_io.read()
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
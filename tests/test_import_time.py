@@ -0,0 +1,111 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Import cost regression tests, based on the output of ``python -X importtime``
+
+Usage with coverage:
+
+::
+
+    $ coverage run -m tests.test_import_time
+    $ coverage report -m
+"""
+
+import unittest
+import subprocess
+import sys
+import os
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous caps (in microseconds) - the aim is to catch regressions like an eager import of inspect, not to benchmark
+MAX_CUMULATIVE_IMPORT_TIME_US = 250000
+MAX_PACKAGE_SELF_IMPORT_TIME_US = 50000
+
+# Modules that must only be imported on demand
+LAZY_MODULES = ('inspect', 'pathlib', 'json', 'datetime', )
+
+
+def import_time(statement: str)->dict:
+    """Run the import statement in a fresh interpreter with -X importtime
+
+    :returns: dict with the module name as key and a tuple of (self_us, cumulative_us) as value
+    """
+    env = dict(os.environ)
+    env.pop('DEBUG', None)
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    if proc.returncode != 0:    # pragma: no cover
+        raise Exception('Import failed: {}'.format(proc.stderr))
+    result = dict()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue    # header line
+        result[fields[2].strip()] = (int(fields[0]), int(fields[1]), )
+    return result
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_import_package_does_not_import_sub_packages(self):
+        timings = import_time(statement='import oculusd_utils')
+        self.assertTrue('oculusd_utils' in timings)
+        self.assertFalse('oculusd_utils.persistence' in timings)
+        self.assertFalse('oculusd_utils.security' in timings)
+
+    def test_import_persistence_skips_lazy_modules(self):
+        timings = import_time(statement='import oculusd_utils.persistence')
+        for module_name in LAZY_MODULES:
+            self.assertFalse(module_name in timings, 'Module "{}" imported eagerly'.format(module_name))
+
+    def test_import_persistence_import_time_cap(self):
+        timings = import_time(statement='import oculusd_utils.persistence')
+        self.assertTrue('oculusd_utils.persistence' in timings)
+        self.assertLess(timings['oculusd_utils.persistence'][1], MAX_CUMULATIVE_IMPORT_TIME_US)
+        package_self_time = 0
+        for module_name, times in timings.items():
+            if module_name.startswith('oculusd_utils'):
+                package_self_time = package_self_time + times[0]
+        self.assertLess(package_self_time, MAX_PACKAGE_SELF_IMPORT_TIME_US)
+
+    def test_import_package_attaches_no_handler(self):
+        proc = subprocess.run(
+            [sys.executable, '-c', 'import oculusd_utils.persistence, logging; print(len(logging.getLogger("oculusd_utils").handlers))'],
+            cwd=PROJECT_ROOT,
+            stdout=subprocess.PIPE,
+            universal_newlines=True
+        )
+        self.assertEqual('0', proc.stdout.strip())
+
+    def test_lazy_sub_package_attribute(self):
+        import oculusd_utils
+        self.assertIsNotNone(oculusd_utils.persistence)
+        self.assertIsNotNone(oculusd_utils.security)
+        with self.assertRaises(AttributeError):
+            oculusd_utils.no_such_attribute
+
+    def test_lazy_home(self):
+        import oculusd_utils.persistence
+        self.assertTrue(oculusd_utils.persistence.HOME.endswith(os.sep))
+        self.assertEqual(oculusd_utils.persistence.HOME, oculusd_utils.persistence.get_home())
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -0,0 +1,88 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_indexes
+    $ coverage report -m
+"""
+
+import unittest
+from oculusd_utils.security.validation import DataValidator
+from oculusd_utils.persistence.indexes import IndexedListContainer
+
+
+class RecordValidator(DataValidator):
+
+    def validate(self, data: object, **kwarg)->bool:
+        return isinstance(data, dict) and 'id' in data
+
+
+def make_events()->list:
+    return [{'id': i, 'hostname': 'node-{}'.format(i % 3), 'timestamp': (i * 7) % 20} for i in range(20)]
+
+
+class TestIndexedListContainer(unittest.TestCase):
+
+    def test_hash_index_lookup(self):
+        data = IndexedListContainer(result_set_name='Test', hash_indexes=('hostname', ))
+        self.assertEqual(20, data.store_many(items=make_events()))
+        self.assertEqual([1, 4, 7, 10, 13, 16, 19], data.find_indices(field='hostname', value='node-1'))
+        self.assertEqual([record for record in data.data if record['hostname'] == 'node-2'], data.find(field='hostname', value='node-2'))
+        self.assertEqual([], data.find(field='hostname', value='node-9'))
+        with self.assertRaises(Exception):
+            data.find(field='timestamp', value=1)
+        with self.assertRaises(Exception):
+            data.find_range(field='hostname', low='a')
+
+    def test_sorted_index_range(self):
+        data = IndexedListContainer(result_set_name='Test', sorted_indexes=('timestamp', ))
+        data.store_many(items=make_events())
+        expected = sorted([record for record in data.data if 5 <= record['timestamp'] <= 9], key=lambda record: record['timestamp'])
+        self.assertEqual(expected, data.find_range(field='timestamp', low=5, high=9))
+        self.assertEqual([5, 6, 7, 8], [record['timestamp'] for record in data.find_range(field='timestamp', low=5, high=9, include_high=False, include_low=True)][:4])
+        self.assertEqual([6, 7, 8], [record['timestamp'] for record in data.find_range(field='timestamp', low=5, high=9, include_low=False, include_high=False)])
+        self.assertEqual(list(range(20)), [record['timestamp'] for record in data.find_range(field='timestamp')])
+        self.assertEqual([{'id': 3, 'hostname': 'node-0', 'timestamp': 1}], data.find(field='timestamp', value=1))
+
+    def test_records_without_field_are_not_indexed(self):
+        data = IndexedListContainer(result_set_name='Test', hash_indexes=('hostname', ), sorted_indexes=('timestamp', ))
+        data.store(data={'hostname': 'a'})
+        data.store(data={'hostname': None, 'timestamp': None})
+        data.store(data='not a record')
+        data.store(data={'hostname': 'a', 'timestamp': 3})
+        self.assertEqual([0, 3], data.find_indices(field='hostname', value='a'))
+        self.assertEqual([3], data.find_range_indices(field='timestamp'))
+
+    def test_value_that_can_not_be_indexed_is_not_stored(self):
+        data = IndexedListContainer(result_set_name='Test', data_validator=RecordValidator(), hash_indexes=('tags', ), sorted_indexes=('timestamp', ))
+        data.store(data={'id': 1, 'tags': 'a', 'timestamp': 1})
+        with self.assertRaises(Exception):
+            data.store(data={'id': 2, 'tags': ['a', 'b'], 'timestamp': 2})
+        with self.assertRaises(Exception):
+            data.store(data={'id': 3, 'tags': 'b', 'timestamp': 'late'})
+        with self.assertRaises(Exception):
+            data.store(data={'tags': 'c', 'timestamp': 4})
+        self.assertEqual(1, len(data.data))
+        self.assertEqual([0], data.find_range_indices(field='timestamp'))
+        self.assertEqual([], data.find_indices(field='tags', value='c'))
+
+    def test_rebuild_indexes(self):
+        data = IndexedListContainer(result_set_name='Test', hash_indexes=('hostname', ), sorted_indexes=('timestamp', ))
+        data.store_many(items=make_events())
+        data.data = make_events()[:5]
+        data.rebuild_indexes()
+        self.assertEqual([0, 3], data.find_indices(field='hostname', value='node-0'))
+        self.assertEqual([0, 3, 1, 4, 2], data.find_range_indices(field='timestamp'))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
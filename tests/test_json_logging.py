@@ -0,0 +1,160 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run -m tests.test_json_logging
+    $ coverage report -m
+"""
+
+import unittest
+import logging
+import json
+import io
+from oculusd_utils import OculusDLogger
+from oculusd_utils.json_logging import JsonLogFormatter
+
+
+class TestJsonLogFormatter(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.logger = logging.getLogger('{}.json'.format(__name__))
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.handler = logging.StreamHandler(self.stream)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def lines(self)->list:
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_json_formatter_basic_record(self):
+        self.handler.setFormatter(JsonLogFormatter(service='test-service', static_fields={'env': 'test', 'shard': 3}))
+        self.logger.info('Some "quoted" message\nwith a new line')
+        lines = self.lines()
+        self.assertEqual(1, len(lines))
+        record = lines[0]
+        self.assertEqual('INFO', record['level'])
+        self.assertEqual(self.logger.name, record['logger'])
+        self.assertEqual('Some "quoted" message\nwith a new line', record['msg'])
+        self.assertEqual('test-service', record['service'])
+        self.assertEqual('test', record['env'])
+        self.assertEqual(3, record['shard'])
+        self.assertTrue('host' in record)
+        self.assertTrue(record['ts'].endswith('Z'))
+        self.assertEqual(24, len(record['ts']))
+        self.assertFalse('file' in record)
+
+    def test_json_formatter_without_host_and_service(self):
+        self.handler.setFormatter(JsonLogFormatter(include_host=False))
+        self.logger.warning('TEST %s', 'args')
+        record = self.lines()[0]
+        self.assertFalse('host' in record)
+        self.assertFalse('service' in record)
+        self.assertEqual('TEST args', record['msg'])
+        self.assertEqual('WARNING', record['level'])
+
+    def test_json_formatter_timestamp_cached_per_second(self):
+        json_formatter = JsonLogFormatter()
+        ts1 = json_formatter.format_timestamp(created=1545824915.060, msecs=60.0)
+        ts2 = json_formatter.format_timestamp(created=1545824915.999, msecs=999.0)
+        ts3 = json_formatter.format_timestamp(created=1545824916.001, msecs=1.0)
+        self.assertEqual('"2018-12-26T11:48:35.060Z"', ts1)
+        self.assertEqual('"2018-12-26T11:48:35.999Z"', ts2)
+        self.assertEqual('"2018-12-26T11:48:36.001Z"', ts3)
+
+    def test_json_formatter_exception(self):
+        self.handler.setFormatter(JsonLogFormatter())
+        try:
+            raise ValueError('Boom')
+        except ValueError:
+            self.logger.exception('Failed')
+        record = self.lines()[0]
+        self.assertTrue('ValueError: Boom' in record['exc'])
+
+
+class TestOculusDLoggerStructuredOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.logger = logging.getLogger('{}.structured'.format(__name__))
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.handler = logging.StreamHandler(self.stream)
+        self.logger.addHandler(self.handler)
+        self.test_logger = OculusDLogger(logger_impl=self.logger)
+
+    def tearDown(self):
+        self.test_logger.disable_structured_output()
+        self.test_logger.disable_debug()
+        self.logger.removeHandler(self.handler)
+
+    def lines(self)->list:
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_structured_output_without_debug(self):
+        self.test_logger.enable_structured_output(service='svc')
+        self.test_logger.info('TEST')
+        self.test_logger.error(message=None)
+        lines = self.lines()
+        self.assertEqual(2, len(lines))
+        self.assertEqual('TEST', lines[0]['msg'])
+        self.assertEqual('svc', lines[0]['service'])
+        self.assertFalse('func' in lines[0])
+        self.assertEqual('NO_INPUT_MESSAGE', lines[1]['msg'])
+        self.assertEqual('ERROR', lines[1]['level'])
+
+    def test_structured_output_with_debug_caller_fields(self):
+        self.test_logger.enable_structured_output()
+        self.test_logger.enable_debug()
+        self.test_logger.debug('DEBUG TEST')
+        self.test_logger.warning('WARNING TEST')
+        lines = self.lines()
+        self.assertEqual(2, len(lines))
+        for record in lines:
+            self.assertFalse(record['msg'].startswith('['))
+            self.assertEqual('test_json_logging.py', record['file'])
+            self.assertEqual('test_structured_output_with_debug_caller_fields', record['func'])
+            self.assertIsInstance(record['line'], int)
+
+    def test_structured_output_is_per_handler(self):
+        text_stream = io.StringIO()
+        text_handler = logging.StreamHandler(text_stream)
+        other = logging.getLogger('{}.text'.format(__name__))
+        other.propagate = False
+        other.addHandler(text_handler)
+        try:
+            text_logger = OculusDLogger(logger_impl=other)
+            text_logger.enable_debug()
+            self.test_logger.enable_structured_output()
+            self.test_logger.enable_debug()
+            text_logger.info('TEXT')
+            self.test_logger.info('JSON')
+            self.assertTrue(text_stream.getvalue().startswith('[test_json_logging.py:'))
+            self.assertEqual('JSON', self.lines()[0]['msg'])
+        finally:
+            text_logger.disable_debug()
+            other.removeHandler(text_handler)
+
+    def test_disable_structured_output_restores_text(self):
+        self.test_logger.enable_structured_output()
+        self.test_logger.disable_structured_output()
+        self.test_logger.enable_debug()
+        self.test_logger.info('TEST')
+        line = self.stream.getvalue()
+        self.assertTrue(' - INFO - [test_json_logging.py:' in line)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -0,0 +1,184 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_lazy_json
+    $ coverage report -m
+"""
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+from oculusd_utils.persistence import TextFileIO
+from oculusd_utils.persistence.lazy_json import LazyJsonFileIO, LazyJsonDict, KeyIndex, scan_key_ranges
+
+
+TEST_DATA = {
+    'plain': 'value',
+    'escaped "key" é': 'with } and { and ] in a string',
+    'number': -1.5e3,
+    'nothing': None,
+    'flag': True,
+    'nested': {'list': [1, [2, 3], {'deep': '[{'}], 'empty': {}},
+    'empty list': [],
+}
+
+
+class TestScanKeyRanges(unittest.TestCase):
+
+    def test_scan_key_ranges(self):
+        for indent in (None, 4):
+            document = json.dumps(TEST_DATA, indent=indent).encode('utf-8')
+            ranges = scan_key_ranges(buffer=document)
+            self.assertEqual(list(TEST_DATA.keys()), list(ranges.keys()))
+            for key, (start, end) in ranges.items():
+                self.assertEqual(TEST_DATA[key], json.loads(document[start:end]))
+
+    def test_scan_empty_object(self):
+        self.assertEqual({}, scan_key_ranges(buffer=b' {\n} '))
+
+    def test_scan_invalid_documents_expect_exception(self):
+        for document in (b'', b'[1, 2]', b'"text"', b'{"a": [1, 2}', b'{"a": 1', b'{"a" 1}', b'{"a":', b'{1: 2}'):
+            with self.assertRaises(Exception):
+                scan_key_ranges(buffer=document)
+
+
+class TestLazyJsonFileIO(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'data.json')
+        with open(self.path, 'w') as f:
+            json.dump(TEST_DATA, f, indent=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_values_are_decoded_on_access(self):
+        data = LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json').read()
+        self.assertEqual('dict', data.data_type.__name__)
+        self.assertIsInstance(data.data, LazyJsonDict)
+        self.assertEqual(len(TEST_DATA), len(data.data))
+        self.assertEqual(0, data.data.loaded_count())
+        self.assertEqual(TEST_DATA['nested'], data.data['nested'])
+        self.assertEqual(1, data.data.loaded_count())
+        self.assertTrue('plain' in data.data)
+        self.assertFalse('missing' in data.data)
+        with self.assertRaises(KeyError):
+            data.data['missing']
+        self.assertEqual(TEST_DATA, data.data.to_dict())
+        data.data.close()
+
+    def test_without_value_cache(self):
+        lazy_io = LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json', cache_values=False)
+        data = lazy_io.read()
+        self.assertEqual('value', data.data['plain'])
+        self.assertEqual(0, data.data.loaded_count())
+
+    def test_changes_in_memory_and_write(self):
+        lazy_io = LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json')
+        data = lazy_io.read()
+        data.store(data='new', key='added')
+        data.store(data='changed', key='plain')
+        del data.data['number']
+        with self.assertRaises(KeyError):
+            del data.data['number']
+        self.assertFalse('number' in data.data)
+        self.assertEqual(len(TEST_DATA), len(data.data))
+        self.assertEqual('added', list(data.data)[-1])
+        lazy_io.write(data=data)
+        expected = dict(TEST_DATA)
+        expected['plain'] = 'changed'
+        expected['added'] = 'new'
+        del expected['number']
+        self.assertEqual(expected, json.loads(TextFileIO(file_folder_path=self.directory, file_name='data.json').read().data))
+        self.assertEqual(expected, lazy_io.read(force=True).data.to_dict())
+
+    def test_index_is_persisted_and_reused(self):
+        lazy_io = LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json')
+        ranges = lazy_io.key_ranges()
+        self.assertIsInstance(ranges, KeyIndex)
+        self.assertTrue(os.path.exists(self.path + '.keyidx'))
+        with mock.patch('oculusd_utils.persistence.lazy_json.scan_key_ranges') as scan:
+            data = LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json').read()
+            self.assertEqual(0, scan.call_count)
+        self.assertEqual(list(TEST_DATA.keys()), list(data.data.keys()))
+        self.assertEqual(TEST_DATA, data.data.to_dict())
+        self.assertFalse(1 in data.data)
+        self.assertFalse('missing' in data.data)
+        # A changed file invalidates the saved index
+        with open(self.path, 'w') as f:
+            json.dump({'a': 1}, f)
+        self.assertEqual({'a': 1}, lazy_io.read().data.to_dict())
+
+    def test_changed_file_expect_exception(self):
+        data = LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json').read()
+        self.assertEqual('value', data.data['plain'])
+        with open(self.path, 'w') as f:
+            json.dump({'nested': 'a different document'}, f)
+        with self.assertRaises(Exception):
+            data.data['nested']
+        self.assertEqual('value', data.data['plain'])    # loaded before the change
+        data.data.close()
+
+    def test_close_closes_key_index(self):
+        data = LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json').read()
+        index = data.data.ranges
+        self.assertIsInstance(index, KeyIndex)
+        self.assertEqual('value', data.data['plain'])
+        data.data.close()
+        self.assertIsNone(data.data._file)
+        self.assertTrue(index._buffer.closed)
+
+    def test_key_index_many_keys(self):
+        ranges = {'key-{}'.format(i): (i, i + 1, ) for i in range(5000)}
+        index_path = os.path.join(self.directory, 'test.keyidx')
+        KeyIndex.write(path=index_path, mtime_ns=1, size=2, ranges=ranges)
+        index = KeyIndex(path=index_path, mtime_ns=1, size=2)
+        self.assertEqual(5000, len(index))
+        for i in range(0, 5000, 7):
+            self.assertEqual((i, i + 1, ), index['key-{}'.format(i)])
+        self.assertFalse('key-5000' in index)
+        index.close()
+        with self.assertRaises(Exception):
+            KeyIndex(path=index_path, mtime_ns=2, size=2)
+        with self.assertRaises(Exception):
+            KeyIndex.write(path=index_path, mtime_ns=1, size=2, ranges={1: (0, 1, )})
+        self.assertEqual(['data.json', 'test.keyidx'], sorted(os.listdir(self.directory)))
+
+    def test_invalid_index_file_is_replaced(self):
+        with open(self.path + '.keyidx', 'wb') as f:
+            f.write(b'garbage')
+        self.assertEqual('value', LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json').read().data['plain'])
+        self.assertIsInstance(LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json').key_ranges(), KeyIndex)
+
+    def test_index_not_persisted(self):
+        lazy_io = LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json', persist_index=False)
+        self.assertEqual('value', lazy_io.read().data['plain'])
+        self.assertFalse(os.path.exists(self.path + '.keyidx'))
+
+    def test_container_cache(self):
+        lazy_io = LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json', enable_cache=True)
+        self.assertIs(lazy_io.read(), lazy_io.read())
+
+    def test_empty_file_expect_exception(self):
+        with open(self.path, 'w') as f:
+            f.write('')
+        with self.assertRaises(Exception):
+            LazyJsonFileIO(file_folder_path=self.directory, file_name='data.json').read()
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
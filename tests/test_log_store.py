@@ -0,0 +1,170 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_log_store
+    $ coverage report -m
+"""
+
+import unittest
+import os
+import time
+import shutil
+import tempfile
+from decimal import Decimal
+from oculusd_utils.persistence import GenericDataContainer
+from oculusd_utils.security.validation import DataValidator
+from oculusd_utils.persistence.log_store import LogStructuredIO
+
+
+def directory_size(directory: str)->int:
+    return sum([os.path.getsize(os.path.join(directory, file_name)) for file_name in os.listdir(directory)])
+
+
+class PositiveNumberValidator(DataValidator):
+
+    def validate(self, data: object, **kwarg)->bool:
+        return isinstance(data, int) and data > 0
+
+
+class TestLogStructuredIO(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_io = LogStructuredIO(directory=self.directory)
+
+    def tearDown(self):
+        self.log_io.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def reopen(self, **kwarg)->LogStructuredIO:
+        self.log_io.close()
+        self.log_io = LogStructuredIO(directory=self.directory, **kwarg)
+        return self.log_io
+
+    def test_put_get_delete_and_reopen(self):
+        self.log_io.put(key='a', value={'nested': [1, 2]})
+        self.log_io.put(key=1, value=Decimal('1.10'))
+        self.log_io.put_many(items={'b': 'B', 'c': None})
+        self.log_io.put(key='a', value='replaced')
+        self.assertTrue(self.log_io.delete(key='b'))
+        self.assertFalse(self.log_io.delete(key='missing'))
+        self.assertEqual('replaced', self.log_io.get(key='a'))
+        self.assertEqual(Decimal('1.10'), self.log_io.get(key=1))
+        self.assertIsNone(self.log_io.get(key='1'))
+        self.assertEqual('gone', self.log_io.get(key='b', default='gone'))
+        log_io = self.reopen()
+        self.assertEqual(3, log_io.key_count())
+        self.assertEqual(['a', 1, 'c'], log_io.keys())
+        self.assertTrue(log_io.contains(key='c'))
+        self.assertEqual({'a': 'replaced', 1: Decimal('1.10'), 'c': None}, log_io.read().data)
+
+    def test_single_key_update_cost(self):
+        self.log_io.put_many(items={'key-{}'.format(i): 'x' * 100 for i in range(1000)})
+        size_before = directory_size(directory=self.directory)
+        self.log_io.put(key='key-1', value='y')
+        self.assertLess(directory_size(directory=self.directory) - size_before, 50)
+
+    def test_container_store_appends(self):
+        data = self.log_io.container(result_set_name='numbers', data_validator=PositiveNumberValidator())
+        data.store(data=1, key='one')
+        with self.assertRaises(Exception):
+            data.store(data=-1, key='minus one')
+        self.assertEqual({'one': 1}, data.data)
+        data = self.reopen().container()
+        self.assertEqual({'one': 1}, data.data)
+
+    def test_write_replaces_content(self):
+        self.log_io.put_many(items={'a': 1, 'b': 2})
+        data = GenericDataContainer(data_type=dict)
+        data.data = {'b': 3, 'c': 4}
+        self.log_io.write(data=data)
+        self.assertEqual({'b': 3, 'c': 4}, self.reopen().read().data)
+        with self.assertRaises(Exception):
+            self.log_io.write(data=GenericDataContainer(data_type=list))
+
+    def test_segments_compaction_and_hint_files(self):
+        log_io = self.reopen(max_file_size=256)
+        for i in range(100):
+            log_io.put(key='key-{}'.format(i % 10), value=i)
+        log_io.delete(key='key-0')
+        self.assertTrue(len(os.listdir(self.directory)) > 3)
+        self.assertTrue(log_io.needs_compaction())
+        size_before = directory_size(directory=self.directory)
+        self.assertTrue(log_io.compact() > 0)
+        self.assertLess(directory_size(directory=self.directory), size_before)
+        self.assertEqual(0, log_io.dead_bytes)
+        self.assertEqual(1, len([file_name for file_name in os.listdir(self.directory) if file_name.endswith('.hint')]))
+        expected = {'key-{}'.format(i): 90 + i for i in range(1, 10)}
+        self.assertEqual(expected, log_io.read().data)
+        log_io.put(key='key-1', value='new')
+        expected['key-1'] = 'new'
+        self.assertEqual(expected, self.reopen(max_file_size=256).read().data)
+        self.assertTrue(self.log_io.compact() > 0)
+        self.assertEqual(0, self.log_io.compact())
+        self.assertEqual(expected, self.reopen().read().data)
+
+    def test_crash_during_compaction_does_not_resurrect_deleted_keys(self):
+        log_io = self.reopen(max_file_size=64)
+        log_io.put(key='deleted', value='x' * 40)
+        log_io.put(key='kept', value='y' * 40)
+        log_io.delete(key='deleted')
+        log_io.put(key='other', value=1)
+
+        def crash(file_ids: list):
+            raise Exception('Simulated crash')
+
+        log_io._remove_segments = crash
+        with self.assertRaises(Exception):
+            log_io.compact()
+        log_io = self.reopen(max_file_size=64)
+        self.assertEqual({'kept': 'y' * 40, 'other': 1}, log_io.read().data)
+        self.assertTrue(log_io.compact() > 0)
+        self.assertEqual({'kept': 'y' * 40, 'other': 1}, self.reopen().read().data)
+
+    def test_truncated_record_is_removed_on_open(self):
+        self.log_io.put(key='a', value=1)
+        self.log_io.put(key='b', value=2)
+        self.log_io.close()
+        log_file = os.path.join(self.directory, sorted(os.listdir(self.directory))[-1])
+        with open(log_file, 'rb') as f:
+            content = f.read()
+        with open(log_file, 'wb') as f:
+            f.write(content[:-3])
+        self.log_io = LogStructuredIO(directory=self.directory)
+        self.assertEqual({'a': 1}, self.log_io.read().data)
+        self.log_io.put(key='c', value=3)
+        self.assertEqual({'a': 1, 'c': 3}, self.reopen().read().data)
+
+    def test_background_compaction(self):
+        log_io = self.reopen(max_file_size=128, compaction_interval=0.01, min_dead_ratio=0.5)
+        for i in range(50):
+            log_io.put(key='a', value=i)
+        log_io.start()
+        self.assertTrue(log_io.is_running())
+        deadline = time.time() + 10
+        while log_io.needs_compaction() and time.time() < deadline:
+            time.sleep(0.01)
+        log_io.stop()
+        self.assertFalse(log_io.is_running())
+        self.assertFalse(log_io.needs_compaction())
+        self.assertEqual(49, log_io.get(key='a'))
+
+    def test_invalid_parameters_expect_exception(self):
+        with self.assertRaises(Exception):
+            LogStructuredIO(directory=self.directory, max_file_size=0)
+        with self.assertRaises(Exception):
+            self.log_io.put(key=('tuple', ), value=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -15,10 +15,11 @@ Usage with coverage:
 
 import unittest
 import logging
-from oculusd_utils import OculusDLogger, DEBUG, formatter, get_utc_timestamp
+from oculusd_utils import OculusDLogger, DEBUG, formatter, get_utc_timestamp, get_monotonic_timestamp, CoarseClock, LogRateLimit
 from pathlib import Path
 import os
 import traceback
+import time
 
 
 def remove_log_file(filename: str): 
@@ -122,6 +123,88 @@ class TestOculusDLogger(unittest.TestCase):
         self.assertTrue('ERR' in last_line)
 
 
+class TestLogRateLimit(unittest.TestCase):
+
+    def setUp(self):
+        self.logfile = 'logtest_rate_limit'
+        remove_log_file(filename=self.logfile)
+        self.logger = logging.getLogger('{}.rate_limit'.format(__name__))
+        self.logger.setLevel(logging.DEBUG)
+        self.handler = logging.FileHandler(filename=self.logfile)
+        self.handler.setLevel(logging.DEBUG)
+        self.handler.setFormatter(formatter)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+        remove_log_file(filename=self.logfile)
+
+    def read_lines(self)->list:
+        self.handler.flush()
+        with open(self.logfile, 'r') as f:
+            return f.readlines()
+
+    def test_rate_limit_first_n_then_suppress(self):
+        test_logger = OculusDLogger(logger_impl=self.logger)
+        test_logger.set_rate_limit(level=logging.WARNING, first_n=3, interval=3600)
+        for i in range(10):
+            test_logger.warning('Repeated warning {}'.format(i))
+        test_logger.warning('Other call site')
+        lines = self.read_lines()
+        self.assertEqual(4, len(lines))
+        self.assertTrue('Repeated warning 2' in lines[2])
+        self.assertTrue('Other call site' in lines[3])
+
+    def test_rate_limit_per_level(self):
+        test_logger = OculusDLogger(logger_impl=self.logger)
+        test_logger.set_rate_limit(level=logging.INFO, first_n=1, interval=3600)
+        for i in range(5):
+            test_logger.info('Info {}'.format(i))
+            test_logger.error('Error {}'.format(i))
+        lines = self.read_lines()
+        self.assertEqual(6, len(lines))
+        test_logger.remove_rate_limit(level=logging.INFO)
+        test_logger.info('Not limited anymore')
+        self.assertEqual(7, len(self.read_lines()))
+
+    def test_rate_limit_debug_level(self):
+        test_logger = OculusDLogger(logger_impl=self.logger)
+        test_logger.enable_debug()
+        test_logger.set_rate_limit(level=logging.DEBUG, first_n=2, interval=3600)
+        for i in range(5):
+            test_logger.debug('Debug {}'.format(i))
+        self.assertEqual(2, len(self.read_lines()))
+
+    def test_rate_limit_summary_after_interval(self):
+        now = [0.0]
+        test_logger = OculusDLogger(logger_impl=self.logger)
+        rate_limit = test_logger.set_rate_limit(level=logging.WARNING, first_n=1, interval=10)
+        rate_limit.clock = lambda: now[0]
+        for i in range(7):
+            if i == 5:
+                now[0] = 10.0
+            test_logger.warning('Repeated')
+        lines = self.read_lines()
+        self.assertEqual(2, len(lines))
+        self.assertTrue('[4 similar messages suppressed]' in lines[1])
+        self.assertEqual(1, len(rate_limit.call_sites))
+        rate_limit.reset()
+        self.assertEqual(0, len(rate_limit.call_sites))
+
+    def test_rate_limit_invalid_parameters_expect_exception(self):
+        test_logger = OculusDLogger(logger_impl=self.logger)
+        with self.assertRaises(Exception):
+            test_logger.set_rate_limit(level=12345)
+        with self.assertRaises(Exception):
+            LogRateLimit(first_n=-1)
+
+    def test_rate_limit_summary_with_none_message(self):
+        rate_limit = LogRateLimit()
+        self.assertIsNone(rate_limit.summary(message=None, suppressed=5))
+        self.assertEqual('TEST', rate_limit.summary(message='TEST', suppressed=0))
+
+
 class TestGetUtcTimestamp(unittest.TestCase):
 
     def test_get_utc_timestamp_without_decimal(self):
@@ -136,6 +219,48 @@ class TestGetUtcTimestamp(unittest.TestCase):
         self.assertIsInstance(ts, float)
         self.assertTrue(ts>0.5)
 
+    def test_get_utc_timestamp_matches_wall_clock(self):
+        before = int(time.time())
+        ts = get_utc_timestamp()
+        after = int(time.time())
+        self.assertTrue(before <= ts <= after)
+
+    def test_get_monotonic_timestamp(self):
+        ts1 = get_monotonic_timestamp()
+        ts2 = get_monotonic_timestamp()
+        self.assertIsInstance(ts1, float)
+        self.assertTrue(ts2 >= ts1)
+
+
+class TestCoarseClock(unittest.TestCase):
+
+    def test_coarse_clock_not_started_reads_real_clock(self):
+        clock = CoarseClock(resolution=10)
+        self.assertFalse(clock.is_running())
+        ts1 = clock.monotonic()
+        time.sleep(0.01)
+        self.assertTrue(clock.monotonic() > ts1)
+        self.assertIsInstance(clock.utc_timestamp(), int)
+        self.assertIsInstance(clock.utc_timestamp(with_decimal=True), float)
+
+    def test_coarse_clock_started_returns_cached_values(self):
+        clock = CoarseClock(resolution=0.01)
+        clock.start()
+        try:
+            self.assertTrue(clock.is_running())
+            ts1 = clock.monotonic()
+            time.sleep(0.1)
+            self.assertTrue(clock.monotonic() > ts1)
+            self.assertTrue(abs(clock.utc_timestamp(with_decimal=True) - time.time()) < 1.0)
+            self.assertIsInstance(clock.utc_timestamp(), int)
+        finally:
+            clock.stop()
+        self.assertFalse(clock.is_running())
+
+    def test_coarse_clock_invalid_resolution_expect_exception(self):
+        with self.assertRaises(Exception):
+            CoarseClock(resolution=0)
+
 if __name__ == '__main__':
     unittest.main()
 
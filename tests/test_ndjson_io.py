@@ -0,0 +1,123 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_ndjson_io
+    $ coverage report -m
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+from oculusd_utils.persistence import GenericDataContainer, GenericIOProcessor
+from oculusd_utils.security.validation import DataValidator
+from oculusd_utils.persistence.ndjson_io import NDJsonIO
+
+
+class EventValidator(DataValidator):
+
+    def validate(self, data: object, **kwarg)->bool:
+        return isinstance(data, dict) and 'id' in data
+
+
+class CountingProcessor(GenericIOProcessor):
+
+    def process(self, data: GenericDataContainer, **kwarg)->GenericDataContainer:
+        self.count = len(data.data)
+        return data
+
+
+class TestNDJsonIO(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ndjson_io = NDJsonIO(file_folder_path=self.directory, file_name='events.ndjson', data_validator=EventValidator(), batch_size=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write_lines(self, lines: list):
+        with open(self.ndjson_io.uri, 'w') as f:
+            f.write('\n'.join(lines))
+
+    def test_write_and_read(self):
+        data = GenericDataContainer(data_type=list)
+        data.data = [{'id': i, 'name': 'événement {}'.format(i)} for i in range(10)]
+        processor = CountingProcessor()
+        self.ndjson_io.write(data=data, write_processor=processor)
+        self.assertEqual(10, processor.count)
+        with open(self.ndjson_io.uri, 'rb') as f:
+            self.assertEqual(10, len(f.read().splitlines()))
+        result = self.ndjson_io.read(read_processor=processor)
+        self.assertEqual('list', result.data_type.__name__)
+        self.assertEqual(data.data, result.data)
+        self.ndjson_io.write(data=data, append=True)
+        self.assertEqual(20, len(self.ndjson_io.read().data))
+        with self.assertRaises(Exception):
+            self.ndjson_io.write(data=GenericDataContainer(data_type=str))
+        self.assertEqual(20, len(self.ndjson_io.read().data))
+
+    def test_records_are_lazy_and_batched(self):
+        self.write_lines(lines=['{"id": %d}' % i for i in range(7)] + ['', '  '])
+        records = self.ndjson_io.records()
+        self.assertEqual({'id': 0}, next(records))
+        records.close()
+        batches = list(self.ndjson_io.batches())
+        self.assertEqual([3, 3, 1], [len(batch.data) for batch in batches])
+        self.assertEqual([5, 2], [len(batch.data) for batch in self.ndjson_io.batches(batch_size=5)])
+
+    def test_validation_while_streaming(self):
+        self.write_lines(lines=['{"id": 1}', '{"name": "no id"}', 'not json', '{"id": 2}'])
+        records = self.ndjson_io.records()
+        self.assertEqual({'id': 1}, next(records))
+        with self.assertRaises(Exception):
+            next(records)
+        ndjson_io = NDJsonIO(file_folder_path=self.directory, file_name='events.ndjson', data_validator=EventValidator(), skip_invalid=True)
+        self.assertEqual([{'id': 1}, {'id': 2}], ndjson_io.read().data)
+        self.assertEqual(2, ndjson_io.skipped_count)
+        self.write_lines(lines=['not json'])
+        with self.assertRaises(Exception):
+            self.ndjson_io.read()
+
+    def test_writer_buffers_records(self):
+        ndjson_io = NDJsonIO(file_folder_path=self.directory, file_name='events.ndjson', buffer_size=100)
+        with ndjson_io.writer() as writer:
+            writer.write_record(record={'id': 0})
+            self.assertEqual(0, os.path.getsize(ndjson_io.uri))
+            self.assertEqual(20, writer.write_records(records=({'id': i, 'padding': 'x' * 10} for i in range(1, 21))))
+            self.assertGreater(os.path.getsize(ndjson_io.uri), 0)
+        self.assertEqual(21, writer.record_count)
+        self.assertEqual(21, len(ndjson_io.read().data))
+        data = GenericDataContainer(data_type=dict)
+        data.store(data=1, key='id')
+        ndjson_io.write(data=data)
+        self.assertEqual([{'id': 1}], ndjson_io.read().data)
+
+    def test_writer_counts_encoded_bytes(self):
+        ndjson_io = NDJsonIO(file_folder_path=self.directory, file_name='names.ndjson', buffer_size=100)
+        with ndjson_io.writer() as writer:
+            writer.write_record(record={'n': '\u00e9' * 30})     # 39 characters, 69 bytes
+            self.assertEqual(69, writer._buffered_bytes)
+            writer.write_record(record={'n': '\u00e9' * 30})
+            self.assertEqual(138, os.path.getsize(ndjson_io.uri))
+        self.assertEqual([{'n': '\u00e9' * 30}] * 2, ndjson_io.read().data)
+
+    def test_invalid_parameters_expect_exception(self):
+        with self.assertRaises(Exception):
+            NDJsonIO(file_folder_path=self.directory, file_name='x', data_validator='not a validator')
+        with self.assertRaises(Exception):
+            NDJsonIO(file_folder_path=self.directory, file_name='x', batch_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -0,0 +1,82 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="*tests*","oculusd_utils/__init__.py,oculusd_utils/persistence/__init__.py,oculusd_utils/security/__init__.py" -m tests.test_parallel_validation
+    $ coverage report -m
+"""
+
+import unittest
+from array import array
+from oculusd_utils.security.validation import StringDataValidator, NumberDataValidator
+from oculusd_utils.security.parallel import ParallelValidator
+
+
+class TestParallelValidator(unittest.TestCase):
+
+    def test_small_input_is_validated_inline(self):
+        runner = ParallelValidator(validator=StringDataValidator(), parameters={'max_length': 5}, shard_size=10)
+        report = runner.validate_many(values=['abc', 'abcdefg', '1bc', 'abcde'])
+        self.assertIsNone(runner._executor)
+        self.assertEqual([1, 2], report.failed_indices)
+        self.assertEqual(2, report.valid_count)
+        self.assertFalse(report.passed())
+        runner.close()
+
+    def test_sequence_shards_are_merged_in_order(self):
+        values = ['name{}'.format(i) if i % 7 else '' for i in range(250)] + [None]
+        with ParallelValidator(validator=StringDataValidator(), max_workers=2, shard_size=40) as runner:
+            report = runner.validate_many(values=values)
+        self.assertEqual([i for i in range(250) if i % 7 == 0] + [250], report.failed_indices)
+        self.assertEqual(251, report.total)
+
+    def test_numeric_arrays_use_shared_memory(self):
+        values = array('q', [i % 100 - 1 for i in range(1000)])
+        with ParallelValidator(validator=NumberDataValidator(), parameters={'min_value': 0, 'max_value': 97}, max_workers=2, shard_size=128) as runner:
+            report = runner.validate_many(values=values)
+            self.assertEqual([i for i in range(1000) if i % 100 in (0, 99)], report.failed_indices)
+            report = runner.validate_many(values=array('d', [0.5] * 500))
+            self.assertTrue(report.passed())
+            report = runner.validate_many(values=[1, 'not a number', 2] * 100)
+            self.assertEqual(100, report.invalid_count)
+
+    def test_sequence_shards_are_submitted_in_a_bounded_window(self):
+        submitted = list()
+        collected = list()
+
+        class Done:
+            def __init__(self, start):
+                self.start = start
+
+            def result(self):
+                collected.append(self.start)
+                return [self.start]
+
+        def submit_shard(pool, start, stop):
+            self.assertLessEqual(len(submitted) - len(collected), 4)
+            submitted.append(start)
+            return Done(start=start)
+
+        runner = ParallelValidator(validator=StringDataValidator(), max_workers=2, shard_size=10)
+        results = runner._run_shards(executor=None, submit_shard=submit_shard, shards=[(start, start + 10, ) for start in range(0, 200, 10)])
+        self.assertEqual([[start] for start in range(0, 200, 10)], results)
+        self.assertEqual(submitted, collected)
+
+    def test_invalid_parameters_expect_exception(self):
+        with self.assertRaises(Exception):
+            ParallelValidator(validator='not a validator')
+        with self.assertRaises(Exception):
+            ParallelValidator(validator=StringDataValidator(), shard_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -14,12 +14,14 @@ Usage with coverage:
 """
 
 import unittest
-from oculusd_utils.persistence import GenericDataContainer, GenericIOProcessor, GenericIO, TextFileIO, ValidateFileExistIOProcessor
+from oculusd_utils.persistence import GenericDataContainer, GenericIOProcessor, GenericIO, TextFileIO, ValidateFileExistIOProcessor, StringPool, MemoryBudget, deep_size
 from decimal import Decimal
 from oculusd_utils.security.validation import DataValidator, L, StringDataValidator, NumberDataValidator
 from datetime import datetime
 import os
 import json
+import shutil
+import tempfile
 
 
 class DictValueNotNoneDataValidator(DataValidator):
@@ -391,6 +393,233 @@ class TestGenericDataContainer(unittest.TestCase):
             gdc = GenericDataContainer(result_set_name='Test', data_type=datetime)
 
 
+class TestStringPool(unittest.TestCase):
+
+    def _new_string(self, value: str)->str:
+        # Strings built at run time are separate objects, even when they are equal
+        return ''.join(list(value))
+
+    def test_string_pool_intern_returns_first_string(self):
+        pool = StringPool()
+        first = self._new_string('host-01.example.com')
+        second = self._new_string('host-01.example.com')
+        self.assertIsNot(first, second)
+        self.assertIs(pool.intern(first), first)
+        self.assertIs(pool.intern(second), first)
+        statistics = pool.statistics()
+        self.assertEqual(2, statistics['lookups'])
+        self.assertEqual(1, statistics['deduplicated'])
+        self.assertGreater(statistics['replaced_bytes'], 0)
+        self.assertEqual(1, statistics['size'])
+
+    def test_string_pool_is_bounded(self):
+        pool = StringPool(max_size=2)
+        first = pool.intern(self._new_string('pool-a'))
+        pool.intern(self._new_string('pool-b'))
+        self.assertIs(first, pool.intern(self._new_string('pool-a')))    # pool-b is now the least recently used
+        pool.intern(self._new_string('pool-c'))
+        self.assertEqual(2, len(pool))
+        self.assertEqual(1, pool.statistics()['evicted'])
+        self.assertIs(first, pool.intern(self._new_string('pool-a')))
+        other = self._new_string('pool-b')
+        self.assertIs(other, pool.intern(other))
+        with self.assertRaises(Exception):
+            StringPool(max_size=0)
+
+    def test_string_pool_skips_long_strings_and_other_types(self):
+        pool = StringPool(max_length=4)
+        long_value = self._new_string('abcdefgh')
+        self.assertIs(pool.intern(long_value), long_value)
+        self.assertEqual(123, pool.intern(123))
+        self.assertEqual(0, pool.statistics()['lookups'])
+
+    def test_string_pool_deduplicate_nested_values(self):
+        pool = StringPool()
+        status = self._new_string('status-ok')
+        value = pool.deduplicate({self._new_string('status-key'): [self._new_string('status-ok'), (self._new_string('status-ok'), 1, )], 'n': 1})
+        self.assertEqual({'status-key': ['status-ok', ('status-ok', 1, )], 'n': 1}, value)
+        items = value['status-key']
+        self.assertIs(items[0], items[1][0])
+        self.assertIs(pool.intern(status), items[0])
+
+    def test_generic_data_container_with_string_pool_list(self):
+        pool = StringPool()
+        gdc = GenericDataContainer(result_set_name='Test', data_type=list, string_pool=pool)
+        for i in range(10):
+            gdc.store(data={self._new_string('pool-test-state'): self._new_string('pool-test-running')})
+        self.assertEqual(10, len(gdc.data))
+        self.assertIs(gdc.data[0]['pool-test-state'], gdc.data[9]['pool-test-state'])
+        self.assertIs(list(gdc.data[0].keys())[0], list(gdc.data[9].keys())[0])
+        self.assertEqual(18, pool.statistics()['deduplicated'])
+
+    def test_generic_data_container_store_many(self):
+        pool = StringPool()
+        gdc = GenericDataContainer(result_set_name='Test', data_type=dict, string_pool=pool)
+        result = gdc.store_many(items={'a': self._new_string('value'), 'b': self._new_string('value')})
+        self.assertEqual(2, result)
+        self.assertIs(gdc.data['a'], gdc.data['b'])
+        gdc_list = GenericDataContainer(result_set_name='Test', data_type=list)
+        self.assertEqual(3, gdc_list.store_many(items=(str(i) for i in range(3))))
+        self.assertEqual(['0', '1', '2'], gdc_list.data)
+        self.assertEqual(0, gdc_list.store_many(items=[]) - 3)
+
+    def test_generic_data_container_store_many_unsupported_data_type_expect_exception(self):
+        gdc = GenericDataContainer(result_set_name='Test', data_type=str)
+        with self.assertRaises(Exception):
+            gdc.store_many(items=['a', 'b'])
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def tearDown(self):
+        if os.path.isfile('BUDGET_TEST'):
+            os.remove('BUDGET_TEST')
+
+    def test_deep_size_includes_nested_values(self):
+        value = {'key': ['a' * 100, ('b' * 100, )]}
+        self.assertGreater(deep_size(value), 200)
+        self.assertGreater(deep_size(value), deep_size({'key': []}))
+        self.assertEqual(deep_size('abc'), deep_size('abc'))
+
+    def test_container_tracks_size_on_store(self):
+        budget = MemoryBudget()
+        gdc = GenericDataContainer(result_set_name='Test', data_type=dict, memory_budget=budget)
+        for i in range(100):
+            gdc.store(data={'value': 'v' * i, 'items': [i, i + 1]}, key='key-{}'.format(i))
+        gdc.store(data='replaced', key='key-1')
+        self.assertEqual(deep_size(gdc.data), gdc.memory_usage())
+        self.assertEqual({'Test': deep_size(gdc.data)}, budget.usage())
+        self.assertEqual(deep_size(gdc.data), budget.total)
+
+    def test_container_tracks_size_of_list_and_scalar_data(self):
+        budget = MemoryBudget()
+        gdc_list = GenericDataContainer(result_set_name='List', data_type=list, memory_budget=budget)
+        for i in range(50):
+            gdc_list.store(data='item-{}'.format(i))
+        gdc_str = GenericDataContainer(result_set_name='Str', data_type=str, memory_budget=budget)
+        gdc_str.store(data='x' * 1000)
+        gdc_str.store(data='short')
+        self.assertEqual({'List': deep_size(gdc_list.data), 'Str': deep_size('short')}, budget.usage())
+        gdc_untracked = GenericDataContainer(result_set_name='Untracked', data_type=list)
+        gdc_untracked.store(data='item')
+        self.assertIsNone(gdc_untracked.memory_size)
+        self.assertEqual(deep_size(gdc_untracked.data), gdc_untracked.memory_usage())
+
+    def test_failed_store_is_not_counted(self):
+        budget = MemoryBudget()
+        gdc = GenericDataContainer(result_set_name='Test', data_type=dict, data_validator=DictValueNotNoneDataValidator(), memory_budget=budget)
+        size = budget.total
+        with self.assertRaises(Exception):
+            gdc.store(data=None, key='a')
+        self.assertEqual(size, budget.total)
+
+    def test_garbage_collected_owner_is_forgotten(self):
+        budget = MemoryBudget()
+        gdc = GenericDataContainer(result_set_name='Test', data_type=list, memory_budget=budget)
+        gdc.store(data='item')
+        self.assertGreater(budget.total, 0)
+        del gdc
+        self.assertEqual(0, budget.total)
+        self.assertEqual(dict(), budget.usage())
+
+    def test_text_file_io_cache_released_when_over_limit(self):
+        with open('BUDGET_TEST', 'w') as f:
+            f.write('x' * 10000)
+        budget = MemoryBudget(limit=5000)
+        tfio = TextFileIO(file_folder_path='.', file_name='BUDGET_TEST', enable_cache=True, memory_budget=budget)
+        data = tfio.read()
+        self.assertEqual(10000, len(data.data))
+        self.assertIsNone(tfio.cached_data)
+        self.assertEqual(0, tfio.cached_bytes)
+        self.assertEqual(1, budget.release_count)
+        budget.limit = None
+        tfio.read()
+        self.assertIsNotNone(tfio.cached_data)
+        self.assertGreater(budget.usage()[tfio.uri], 10000)
+        tfio.invalidate_cache()
+        self.assertEqual(0, budget.total)
+
+    def test_enforce_releases_largest_owner_first(self):
+        budget = MemoryBudget()
+        tfio_large = TextFileIO(file_folder_path='.', file_name='LARGE', enable_cache=True, memory_budget=budget)
+        tfio_small = TextFileIO(file_folder_path='.', file_name='SMALL', enable_cache=True, memory_budget=budget)
+        large = GenericDataContainer(result_set_name='large', data_type=str)
+        large.store(data='x' * 10000)
+        small = GenericDataContainer(result_set_name='small', data_type=str)
+        small.store(data='y' * 100)
+        tfio_large.update_cache(data=large)
+        tfio_small.update_cache(data=small)
+        budget.limit = 5000
+        released = budget.enforce()
+        self.assertGreater(released, 10000)
+        self.assertIsNone(tfio_large.cached_data)
+        self.assertIsNotNone(tfio_small.cached_data)
+
+    def test_enforce_waits_for_growth_when_nothing_can_be_released(self):
+        budget = MemoryBudget(limit=1000, retry_growth=0.5)
+        gdc = GenericDataContainer(result_set_name='Test', data_type=list, memory_budget=budget)
+        for i in range(100):
+            gdc.store(data='item-{}'.format(i))
+        self.assertGreater(budget.total, 3000)
+        # Only retried after the total grew by another 500 bytes
+        self.assertLess(budget.enforce_count, (budget.total - 1000) // 500 + 2)
+        count = budget.enforce_count
+        tfio = TextFileIO(file_folder_path='.', file_name='BUDGET_TEST', enable_cache=True, memory_budget=budget)
+        gdc.store(data='item')
+        self.assertEqual(count + 1, budget.enforce_count)
+        del tfio
+        gdc.data = list()
+        gdc.store(data='item')
+        self.assertLess(budget.total, 1000)
+        self.assertIsNone(budget._retry_at)
+
+    def test_data_assignment_is_accounted(self):
+        budget = MemoryBudget()
+        gdc = GenericDataContainer(result_set_name='Test', data_type=dict, memory_budget=budget)
+        gdc.data = {'key-{}'.format(i): 'value-{}'.format(i) for i in range(100)}
+        self.assertEqual(deep_size(gdc.data), budget.total)
+        gdc.store(data='value', key='key-100')
+        self.assertEqual(deep_size(gdc.data), gdc.memory_usage())
+        gdc.data = dict()
+        self.assertEqual(deep_size(dict()), budget.total)
+
+    def test_every_container_subclass_reports_memory_usage(self):
+        from oculusd_utils.persistence.concurrent import ConcurrentDictContainer
+        from oculusd_utils.persistence.indexes import IndexedListContainer
+        from oculusd_utils.persistence.log_store import LogStructuredIO, LogStructuredDataContainer
+        from oculusd_utils.persistence.scalars import ScalarDataContainer
+        from oculusd_utils.persistence.snapshots import SnapshotDataContainer
+        from oculusd_utils.persistence.spill import SpillableListContainer
+        from oculusd_utils.persistence.table import TableDataContainer
+        directory = tempfile.mkdtemp()
+        log_io = LogStructuredIO(directory=os.path.join(directory, 'log'))
+        try:
+            concurrent = ConcurrentDictContainer()
+            concurrent.store(data='value', key='key')
+            indexed = IndexedListContainer(hash_indexes=('name', ))
+            indexed.store(data={'name': 'value'})
+            logged = LogStructuredDataContainer(log_io=log_io)
+            logged.store(data='value', key='key')
+            scalar = ScalarDataContainer(data_type=float)
+            scalar.store(data=1.5)
+            snapshot = SnapshotDataContainer()
+            snapshot.store(data='value', key='key')
+            spillable = SpillableListContainer(chunk_size=2, max_memory_items=2, directory=directory)
+            spillable.data.extend(['value'] * 10)
+            table = TableDataContainer(schema={'name': (str, {})})
+            table.extend(rows=[{'name': 'value'}])
+            for container in (concurrent, indexed, logged, scalar, snapshot, spillable, table, ):
+                self.assertGreater(container.memory_usage(), 0, container.__class__.__name__)
+                tfio = TextFileIO(file_folder_path=directory, file_name='BUDGET_TEST', enable_cache=True)
+                tfio.write(data=container)
+                self.assertIs(container, tfio.read())
+                self.assertEqual(container.memory_usage(), tfio.cached_bytes)
+            spillable.close()
+        finally:
+            log_io.close()
+            shutil.rmtree(directory, ignore_errors=True)
+
+
 class TestGenericIOProcessor(unittest.TestCase):
 
     def test_init_generic_io_processor(self):
@@ -511,6 +740,29 @@ class TestTextFileIO(unittest.TestCase):
         self.assertIsNotNone(gdc_cached_refreshed_value.data)
         self.assertEqual('Brand New Data', gdc_cached_refreshed_value.data)
 
+    def test_text_file_io_cache_expiry_uses_injected_clock(self):
+        now = [1000.0]
+        tfio = TextFileIO(file_folder_path='.', file_name='READ_TEST', enable_cache=True, cache_max_age=10, clock=lambda: now[0])
+        with open('READ_TEST', 'w') as f:
+            f.write('TEST')
+        tfio.read()
+        with open('READ_TEST', 'w') as f:
+            f.write('Brand New Data')
+        now[0] = 1009.0
+        self.assertEqual('TEST', tfio.read().data)
+        now[0] = 1010.0
+        self.assertEqual('Brand New Data', tfio.read().data)
+
+    def test_text_file_io_invalidate_cache(self):
+        tfio = TextFileIO(file_folder_path='.', file_name='READ_TEST', enable_cache=True)
+        with open('READ_TEST', 'w') as f:
+            f.write('TEST')
+        tfio.read()
+        self.assertIsNotNone(tfio.cached_data)
+        tfio.invalidate_cache()
+        self.assertIsNone(tfio.cached_data)
+        self.assertEqual(0, tfio.cached_data_timestamp)
+
     def test_text_file_io_multi_line_text_data_read_without_cache(self):
         tfio = TextFileIO(file_folder_path='.', file_name='READ_TEST')
         text_data = 'TEST\n123\nAgain'
@@ -705,6 +957,101 @@ class TestValidateFileExistIOProcessor(unittest.TestCase):
         with self.assertRaises(Exception):
             fp.process(data=gdc)
 
+    def test_validate_file_exists_io_processor_bulk(self):
+        os.mkdir('bulk_test_dir')
+        try:
+            for name in ('a.txt', 'b.txt', 'c.txt'):
+                with open(os.path.join('bulk_test_dir', name), 'w') as f:
+                    f.write('TEST')
+            os.mkdir(os.path.join('bulk_test_dir', 'sub.txt'))
+            paths = [
+                os.path.join('bulk_test_dir', 'a.txt'),
+                os.path.join('bulk_test_dir', 'b.txt'),
+                os.path.join('bulk_test_dir', 'missing.txt'),
+                os.path.join('bulk_test_dir', 'sub.txt'),
+                os.path.join('no_such_dir', 'a.txt'),
+                os.path.join('no_such_dir', 'b.txt'),
+                'somefile.txt',
+                os.path.join('bulk_test_dir', 'a.txt'),
+            ]
+            gdc = GenericDataContainer(result_set_name='Test', data_type=list)
+            for path in paths:
+                gdc.store(data=path)
+            fp = ValidateFileExistIOProcessor()
+            result = fp.process_bulk(data=gdc)
+            self.assertEqual(7, len(result))
+            self.assertTrue(result[os.path.join('bulk_test_dir', 'a.txt')])
+            self.assertTrue(result[os.path.join('bulk_test_dir', 'b.txt')])
+            self.assertFalse(result[os.path.join('bulk_test_dir', 'missing.txt')])
+            self.assertFalse(result[os.path.join('bulk_test_dir', 'sub.txt')])
+            self.assertFalse(result[os.path.join('no_such_dir', 'a.txt')])
+            self.assertTrue(result['somefile.txt'])
+            for path, exists in result.items():
+                self.assertEqual(os.path.isfile(path), exists, path)
+        finally:
+            shutil.rmtree('bulk_test_dir')
+
+    def test_validate_file_exists_io_processor_bulk_invalid_input_expect_exception(self):
+        fp = ValidateFileExistIOProcessor()
+        with self.assertRaises(Exception):
+            fp.process_bulk(data=['somefile.txt'])
+        with self.assertRaises(Exception):
+            fp.process_bulk(data=self.gdc)
+
+    def test_validate_file_exists_io_processor_cache(self):
+        now = [100.0]
+        fp = ValidateFileExistIOProcessor(cache_ttl=10, negative_cache_ttl=5, clock=lambda: now[0])
+        fp.process(data=self.gdc)
+        self.assertEqual({'somefile.txt': True, 'null_file.txt': False}, fp.files_exist(paths=['somefile.txt', 'null_file.txt']))
+        os.rename(self.gdc.data, 'null_file.txt')
+        try:
+            # Both results are served from the cache
+            fp.process(data=self.gdc)
+            self.assertFalse(fp.is_file('null_file.txt'))
+            now[0] = 105.0
+            self.assertTrue(fp.is_file('null_file.txt'))
+            now[0] = 110.0
+            with self.assertRaises(Exception):
+                fp.process(data=self.gdc)
+        finally:
+            os.rename('null_file.txt', self.gdc.data)
+        fp.clear_cache()
+        self.assertEqual(0, len(fp.existence_cache))
+
+    def test_validate_file_exists_io_processor_lists_large_directory_only_when_cheaper(self):
+        os.mkdir('scandir_test_dir')
+        try:
+            for i in range(40):
+                with open(os.path.join('scandir_test_dir', 'f{}.txt'.format(i)), 'w') as f:
+                    f.write('x')
+            fp = ValidateFileExistIOProcessor()
+            listed = list()
+            original = fp._list_files
+
+            def list_files(directory: str)->set:
+                listed.append(directory)
+                return original(directory=directory)
+
+            fp._list_files = list_files
+            few = [os.path.join('scandir_test_dir', 'f{}.txt'.format(i)) for i in range(5)]
+            self.assertEqual(dict.fromkeys(few, True), fp.files_exist(paths=few))
+            self.assertEqual(['scandir_test_dir'], listed)
+            self.assertEqual(40, fp.directory_sizes['scandir_test_dir'])
+            # 5 paths in a directory of 40 entries are tested one by one from now on
+            self.assertEqual(dict.fromkeys(few, True), fp.files_exist(paths=few))
+            self.assertEqual(1, len(listed))
+            many = [os.path.join('scandir_test_dir', 'f{}.txt'.format(i)) for i in range(20)]
+            fp.files_exist(paths=many)
+            self.assertEqual(2, len(listed))
+            self.assertEqual({'a.txt': False}, fp.files_exist(paths=['a.txt']))
+        finally:
+            shutil.rmtree('scandir_test_dir')
+
+    def test_validate_file_exists_io_processor_cache_size_limit(self):
+        fp = ValidateFileExistIOProcessor(cache_ttl=60, max_cache_entries=2)
+        fp.files_exist(paths=['a', 'b', 'c', 'somefile.txt'])
+        self.assertTrue(len(fp.existence_cache) <= 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,94 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_scalars
+    $ coverage report -m
+"""
+
+import unittest
+from decimal import Decimal
+from oculusd_utils.security.validation import DataValidator, NumberDataValidator
+from oculusd_utils.persistence import GenericDataContainer, parse_int
+from oculusd_utils.persistence.scalars import ScalarDataContainer
+
+
+class EvenNumberValidator(DataValidator):
+
+    def validate(self, data: object, **kwarg)->bool:
+        return data % 2 == 0 and data <= kwarg.get('max_value', data)
+
+
+class TestScalarDataContainer(unittest.TestCase):
+
+    def test_parse_int_is_exact_for_integer_strings(self):
+        self.assertEqual(12345678901234567891, parse_int('12345678901234567891'))
+        self.assertEqual(1, parse_int('1.9'))
+        self.assertEqual(1000, parse_int('1e3'))
+        gdc = GenericDataContainer(result_set_name='Test', data_type=int)
+        gdc.store(data='12345678901234567891')
+        self.assertEqual(12345678901234567891, gdc.data)
+
+    def test_conversions(self):
+        counter = ScalarDataContainer(result_set_name='Test', data_type=int)
+        self.assertEqual(1, counter.store(data=5))
+        counter.store(data=5.9)
+        self.assertEqual(5, counter.data)
+        counter.store(data='99999999999999999999')
+        self.assertEqual(99999999999999999999, counter.data)
+        gauge = ScalarDataContainer(result_set_name='Test', data_type=float)
+        gauge.store(data=3)
+        self.assertIsInstance(gauge.data, float)
+        amount = ScalarDataContainer(result_set_name='Test', data_type=Decimal)
+        amount.store(data='10.01')
+        self.assertEqual(Decimal('10.01'), amount.data)
+        with self.assertRaises(Exception):
+            counter.store(data=[1])
+        with self.assertRaises(Exception):
+            ScalarDataContainer(result_set_name='Test', data_type=str)
+
+    def test_bound_number_validation(self):
+        counter = ScalarDataContainer(result_set_name='Test', data_type=int, data_validator=NumberDataValidator(), validation_parameters={'min_value': 0, 'max_value': 10})
+        counter.store(data=10)
+        with self.assertRaises(Exception):
+            counter.store(data=11)
+        with self.assertRaises(Exception):
+            counter.store(data='-1')
+        self.assertEqual(10, counter.data)
+        counter.store(data=20, max_value=100)
+        self.assertEqual(20, counter.data)
+        gauge = ScalarDataContainer(result_set_name='Test', data_type=float, data_validator=NumberDataValidator(), validation_parameters={'max_value': 1.0})
+        gauge.store(data=-5.0)
+        with self.assertRaises(Exception):
+            gauge.store(data=1.5)
+
+    def test_bound_decimal_validation(self):
+        amount = ScalarDataContainer(result_set_name='Test', data_type=Decimal, data_validator=NumberDataValidator(), validation_parameters={'min_value': Decimal('0.00')})
+        amount.store(data='0.00')
+        with self.assertRaises(Exception):
+            amount.store(data=Decimal('-0.01'))
+        with self.assertRaises(Exception):
+            ScalarDataContainer(result_set_name='Test', data_type=Decimal, data_validator=NumberDataValidator(), validation_parameters={'max_value': 1})
+
+    def test_other_validator_with_bound_parameters(self):
+        counter = ScalarDataContainer(result_set_name='Test', data_type=int, data_validator=EvenNumberValidator(), validation_parameters={'max_value': 10})
+        counter.store(data=4)
+        with self.assertRaises(Exception):
+            counter.store(data=5)
+        with self.assertRaises(Exception):
+            counter.store(data=12)
+        counter.store(data=12, max_value=20)
+        self.assertEqual(12, counter.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
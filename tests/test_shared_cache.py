@@ -0,0 +1,201 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_shared_cache
+    $ coverage report -m
+"""
+
+import unittest
+import os
+import struct
+import shutil
+import tempfile
+import multiprocessing
+from oculusd_utils.persistence import TextFileIO, CacheBackend, GenericDataContainer
+from oculusd_utils.persistence.shared_cache import SharedMemoryCache, key_digest, SLOT_SIZE, HEADER_SIZE
+
+
+def child_put(cache: SharedMemoryCache, key: str, text: str):
+    cache.put_text(key=key, text=text)
+
+
+def child_crash_holding_lock(cache: SharedMemoryCache):
+    cache._lock()
+    os._exit(1)
+
+
+def child_read_via_text_file_io(cache: SharedMemoryCache, folder: str, queue):
+    tfio = TextFileIO(file_folder_path=folder, file_name='data.txt', enable_cache=True, cache_backend=cache)
+    queue.put(tfio.read().data)
+
+
+class TestSharedMemoryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SharedMemoryCache(name='test', slot_count=8, directory=self.directory)
+
+    def tearDown(self):
+        self.cache.destroy()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run_in_child(self, target, *args):
+        process = multiprocessing.get_context('fork').Process(target=target, args=args)
+        process.start()
+        process.join(30)
+        return process.exitcode
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get(key='a'))
+        version = self.cache.put(key='a', data=b'Hello')
+        self.assertTrue(version > 0)
+        self.assertEqual(version, self.cache.version(key='a'))
+        self.assertEqual(b'Hello', self.cache.get(key='a'))
+        buffer = self.cache.get_buffer(key='a')
+        self.assertIsInstance(buffer, memoryview)
+        self.assertTrue(buffer.readonly)
+        self.assertEqual(b'Hello', bytes(buffer))
+        self.cache.put_text(key='b', text='Unicode é')
+        self.assertEqual('Unicode é', self.cache.get_text(key='b'))
+        self.cache.put(key='empty', data=b'')
+        self.assertEqual(b'', self.cache.get(key='empty'))
+
+    def test_replace_bumps_version_and_removes_old_file(self):
+        version1 = self.cache.put(key='a', data=b'one')
+        buffer1 = self.cache.get_buffer(key='a')
+        version2 = self.cache.put(key='a', data=b'two')
+        self.assertTrue(version2 > version1)
+        self.assertEqual(b'two', self.cache.get(key='a'))
+        # The old mapping stays valid for as long as it is referenced
+        self.assertEqual(b'one', bytes(buffer1))
+        data_files = [name for name in os.listdir(self.cache.path) if name.endswith('.dat')]
+        self.assertEqual(1, len(data_files))
+
+    def test_invalidate(self):
+        self.cache.put(key='a', data=b'one')
+        self.cache.invalidate(key='a')
+        self.cache.invalidate(key='not cached')
+        self.assertIsNone(self.cache.get(key='a'))
+        self.assertEqual(0, self.cache.version(key='a'))
+        self.cache.put(key='a', data=b'again')
+        self.assertEqual(b'again', self.cache.get(key='a'))
+
+    def test_max_age(self):
+        now = [100.0]
+        self.cache.clock = lambda: now[0]
+        self.cache.put(key='a', data=b'one')
+        self.assertEqual(b'one', self.cache.get(key='a', max_age=10))
+        now[0] = 110.0
+        self.assertIsNone(self.cache.get(key='a', max_age=10))
+        self.assertEqual(b'one', self.cache.get(key='a'))
+
+    def test_entry_from_before_a_reboot_is_expired(self):
+        now = [100000.0]
+        self.cache.clock = lambda: now[0]
+        self.cache.put(key='a', data=b'one')
+        now[0] = 5.0    # The monotonic clock restarted
+        self.assertIsNone(self.cache.get(key='a', max_age=10))
+        self.assertEqual(b'one', self.cache.get(key='a'))
+
+    def test_temporary_files_of_crashed_writer_are_removed(self):
+        tmp_path = os.path.join(self.cache.path, '.tmp-crashed')
+        with open(tmp_path, 'wb') as f:
+            f.write(b'partial')
+        other = SharedMemoryCache(name='test', directory=self.directory)
+        other.close()
+        self.assertFalse(os.path.exists(tmp_path))
+
+    def test_eviction_when_full(self):
+        for i in range(20):
+            self.cache.put(key='key{}'.format(i), data='value{}'.format(i).encode('utf-8'))
+        self.assertEqual(b'value19', self.cache.get(key='key19'))
+        data_files = [name for name in os.listdir(self.cache.path) if name.endswith('.dat')]
+        self.assertTrue(len(data_files) <= 8)
+
+    def test_shared_between_processes(self):
+        self.assertEqual(0, self.run_in_child(child_put, self.cache, 'a', 'from child'))
+        self.assertEqual('from child', self.cache.get_text(key='a'))
+        other = SharedMemoryCache(name='test', directory=self.directory)
+        try:
+            self.assertEqual(8, other.slot_count)
+            self.assertEqual('from child', other.get_text(key='a'))
+        finally:
+            other.close()
+
+    def test_worker_crash_while_holding_lock(self):
+        self.assertEqual(1, self.run_in_child(child_crash_holding_lock, self.cache))
+        self.cache.put(key='a', data=b'still works')
+        self.assertEqual(b'still works', self.cache.get(key='a'))
+
+    def test_half_written_slot_is_ignored_and_repaired(self):
+        self.cache.put(key='a', data=b'one')
+        slot = self.cache._find(digest=key_digest(key='a'))[0]
+        offset = HEADER_SIZE + slot * SLOT_SIZE
+        sequence = struct.unpack_from('<Q', self.cache._index, offset)[0]
+        struct.pack_into('<Q', self.cache._index, offset, sequence + 1)
+        self.assertIsNone(self.cache.get(key='a'))
+        self.cache.put(key='a', data=b'repaired')
+        self.assertEqual(b'repaired', self.cache.get(key='a'))
+
+    def test_invalid_index_file_expect_exception(self):
+        os.makedirs(os.path.join(self.directory, 'odc-cache-broken'))
+        with open(os.path.join(self.directory, 'odc-cache-broken', 'index'), 'wb') as f:
+            f.write(b'X' * 128)
+        with self.assertRaises(Exception):
+            SharedMemoryCache(name='broken', directory=self.directory)
+
+    def test_text_file_io_with_shared_cache(self):
+        with open(os.path.join(self.directory, 'data.txt'), 'w') as f:
+            f.write('Shared Data')
+        tfio = TextFileIO(file_folder_path=self.directory, file_name='data.txt', enable_cache=True, cache_backend=self.cache)
+        self.assertEqual('Shared Data', tfio.read().data)
+        self.assertIsNone(tfio.cached_data)
+        os.remove(os.path.join(self.directory, 'data.txt'))
+        queue = multiprocessing.get_context('fork').Queue()
+        self.assertEqual(0, self.run_in_child(child_read_via_text_file_io, self.cache, self.directory, queue))
+        self.assertEqual('Shared Data', queue.get(timeout=10))
+        tfio.invalidate_cache()
+        self.assertIsNone(self.cache.get_text(key=tfio.uri))
+
+    def test_text_file_io_with_shared_cache_force_and_write(self):
+        path = os.path.join(self.directory, 'data.txt')
+        with open(path, 'w') as f:
+            f.write('One')
+        tfio = TextFileIO(file_folder_path=self.directory, file_name='data.txt', enable_cache=True, cache_backend=self.cache)
+        tfio.read()
+        with open(path, 'w') as f:
+            f.write('Two')
+        self.assertEqual('One', tfio.read().data)
+        self.assertEqual('Two', tfio.read(force=True).data)
+        self.assertEqual('Two', self.cache.get_text(key=tfio.uri))
+        gdc = GenericDataContainer(data_type=dict)
+        gdc.store(data=1, key='a')
+        tfio.write(data=gdc)
+        self.assertIsNone(self.cache.get_text(key=tfio.uri))
+
+    def test_cache_backend_base_class_expect_exception(self):
+        backend = CacheBackend()
+        with self.assertRaises(Exception):
+            backend.get_text(key='a')
+        with self.assertRaises(Exception):
+            backend.put_text(key='a', text='b')
+        with self.assertRaises(Exception):
+            backend.invalidate(key='a')
+
+    def test_text_file_io_invalid_cache_backend_expect_exception(self):
+        with self.assertRaises(Exception):
+            TextFileIO(file_folder_path=self.directory, file_name='data.txt', cache_backend='not a backend')
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
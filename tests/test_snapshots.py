@@ -0,0 +1,130 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_snapshots
+    $ coverage report -m
+"""
+
+import unittest
+from oculusd_utils.security.validation import DataValidator
+from oculusd_utils.persistence.snapshots import ListSnapshot, SnapshotDataContainer
+
+
+class PositiveNumberValidator(DataValidator):
+
+    def validate(self, data: object, **kwarg)->bool:
+        return isinstance(data, int) and data > 0
+
+
+class TestSnapshotDataContainer(unittest.TestCase):
+
+    def test_dict_snapshot_is_copy_on_write(self):
+        data = SnapshotDataContainer(data_validator=PositiveNumberValidator())
+        data.store(data=1, key='a')
+        view = data.snapshot()
+        data.store(data=2, key='b')
+        data.store(data=3, key='a')
+        self.assertEqual({'a': 1}, dict(view))
+        self.assertEqual({'a': 3, 'b': 2}, data.data)
+        with self.assertRaises(TypeError):
+            view['c'] = 1
+        with self.assertRaises(Exception):
+            data.store(data=-1, key='c')
+        self.assertEqual(2, len(data.data))
+
+    def test_dict_is_copied_once_per_snapshot(self):
+        data = SnapshotDataContainer()
+        data.store(data=1, key='a')
+        data.snapshot()
+        data.store(data=2, key='b')
+        copied = data.data
+        data.store(data=3, key='c')
+        self.assertIs(copied, data.data)
+
+    def test_dict_changes(self):
+        data = SnapshotDataContainer()
+        data.store(data=1, key='a')
+        data.store(data=2, key='b')
+        self.assertTrue(data.is_dirty())
+        self.assertEqual({'a', 'b'}, data.dirty_keys())
+        snapshot, changed, deleted, full = data.take_changes()
+        self.assertEqual({'a', 'b'}, changed)
+        self.assertEqual(set(), deleted)
+        self.assertFalse(full)
+        self.assertFalse(data.is_dirty())
+        self.assertTrue(data.delete(key='a'))
+        self.assertFalse(data.delete(key='a'))
+        data.store(data=3, key='c')
+        self.assertEqual({'b': 2, 'a': 1}, dict(snapshot))
+        snapshot, changed, deleted, full = data.take_changes()
+        self.assertEqual({'c'}, changed)
+        self.assertEqual({'a'}, deleted)
+        self.assertEqual({'b': 2, 'c': 3}, dict(snapshot))
+
+    def test_dict_changes_only_does_not_share_the_dict(self):
+        data = SnapshotDataContainer()
+        data.data = {'a': 1, 'b': 2}
+        snapshot, changed, deleted, full = data.take_changes(changes_only=True)
+        self.assertTrue(full)
+        self.assertEqual({'a': 1, 'b': 2}, dict(snapshot))
+        live = data.data
+        data.store(data=3, key='c')
+        self.assertIsNot(live, data.data)
+        live = data.data
+        data.delete(key='a')
+        snapshot, changed, deleted, full = data.take_changes(changes_only=True)
+        self.assertFalse(full)
+        self.assertEqual({'c': 3}, dict(snapshot))
+        self.assertEqual({'a'}, deleted)
+        data.store(data=4, key='d')
+        self.assertIs(live, data.data)
+        self.assertEqual({'c': 3}, dict(snapshot))
+
+    def test_data_assignment_requires_full_write(self):
+        data = SnapshotDataContainer()
+        self.assertFalse(data.is_dirty())
+        data.data = {'x': 1}
+        self.assertTrue(data.is_dirty())
+        snapshot, changed, deleted, full = data.take_changes()
+        self.assertTrue(full)
+        self.assertEqual({'x': 1}, dict(snapshot))
+
+    def test_list_snapshot_and_changes(self):
+        data = SnapshotDataContainer(data_type=list)
+        data.store(data='a')
+        data.store(data='b')
+        view = data.snapshot()
+        data.store(data='c')
+        self.assertIsInstance(view, ListSnapshot)
+        self.assertEqual(['a', 'b'], view)
+        self.assertEqual(['b'], view[1:])
+        self.assertEqual('b', view[-1])
+        with self.assertRaises(IndexError):
+            view[2]
+        self.assertEqual({0, 1, 2}, data.dirty_keys())
+        snapshot, changed, deleted, full = data.take_changes()
+        self.assertEqual([0, 1, 2], changed)
+        data.store(data='d')
+        snapshot, changed, deleted, full = data.take_changes()
+        self.assertEqual([3], changed)
+        self.assertEqual('d', snapshot[3])
+        with self.assertRaises(Exception):
+            data.delete(key=0)
+
+    def test_unsupported_data_type_expect_exception(self):
+        with self.assertRaises(Exception):
+            SnapshotDataContainer(data_type=str)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -0,0 +1,181 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_spill
+    $ coverage report -m
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from oculusd_utils.security.validation import DataValidator
+from oculusd_utils.persistence import MemoryBudget, TextFileIO
+from oculusd_utils.persistence.ndjson_io import NDJsonIO
+from oculusd_utils.persistence.sqlite_io import SQLiteIO
+from oculusd_utils.persistence.delta_io import DeltaFileIO
+from oculusd_utils.persistence.spill import SpillableList, SpillableListContainer
+
+
+class DictRecordValidator(DataValidator):
+
+    def validate(self, data: object, **kwarg)->bool:
+        return isinstance(data, dict)
+
+
+class TestSpillableList(unittest.TestCase):
+
+    def test_pickled_chunks_random_access_and_iteration(self):
+        items = SpillableList(chunk_size=10, max_memory_items=20, cache_chunks=2)
+        items.extend({'id': i, 'name': 'item-{}'.format(i)} for i in range(105))
+        self.assertEqual(105, len(items))
+        self.assertEqual(8, items.spilled_chunk_count)
+        self.assertEqual({'id': 0, 'name': 'item-0'}, items[0])
+        self.assertEqual({'id': 57, 'name': 'item-57'}, items[57])
+        self.assertEqual({'id': 104, 'name': 'item-104'}, items[-1])
+        self.assertEqual([i['id'] for i in items], list(range(105)))
+        self.assertEqual([3, 4, 5], [i['id'] for i in items[3:6]])
+        with self.assertRaises(IndexError):
+            items[105]
+        items.close()
+
+    def test_page_cache(self):
+        items = SpillableList(chunk_size=10, max_memory_items=10, cache_chunks=2)
+        items.extend(range(100))
+        self.assertEqual(1, items[1])
+        self.assertEqual(2, items[2])
+        self.assertEqual(1, items.cache_misses)
+        self.assertEqual(1, items.cache_hits)
+        self.assertEqual(15, items[15])
+        self.assertEqual(25, items[25])
+        self.assertEqual(5, items[5])
+        self.assertEqual(4, items.cache_misses)
+        items.close()
+
+    def test_numeric_chunks_read_through_mmap(self):
+        items = SpillableList(chunk_size=100, max_memory_items=100, typecode='d')
+        for i in range(1050):
+            items.append(i * 0.5)
+        self.assertEqual(9, items.spilled_chunk_count)
+        self.assertEqual(0.5, items[1])
+        self.assertEqual(512.0, items[1024])
+        self.assertEqual(sum([i * 0.5 for i in range(1050)]), sum(items))
+        items.append(2000.0)
+        self.assertEqual(2000.0, items[-1])
+        self.assertEqual(100 * 8 + 51 * 8, items.memory_usage())
+        with self.assertRaises(TypeError):
+            items.append('not a number')
+        items.close()
+
+    def test_close_removes_spill_file(self):
+        items = SpillableList(chunk_size=2, max_memory_items=2)
+        items.extend(range(10))
+        path = items.path
+        self.assertTrue(os.path.isfile(path))
+        items.close()
+        self.assertFalse(os.path.isfile(path))
+        items = SpillableList()
+        path = items.path
+        del items
+        self.assertFalse(os.path.isfile(path))
+
+    def test_equality_and_repr_match_list(self):
+        items = SpillableList(chunk_size=2, max_memory_items=2)
+        items.extend(['a', 1, None, 2.5, 'b'])
+        self.assertEqual(1, items.spilled_chunk_count)
+        self.assertEqual(['a', 1, None, 2.5, 'b'], items)
+        self.assertEqual(items, ('a', 1, None, 2.5, 'b', ))
+        self.assertNotEqual(['a', 1], items)
+        self.assertNotEqual('a1', items)
+        self.assertEqual(repr(['a', 1, None, 2.5, 'b']), repr(items))
+        self.assertEqual(str(['a', 1, None, 2.5, 'b']), str(items))
+        other = SpillableList(chunk_size=3)
+        other.extend(['a', 1, None, 2.5, 'b'])
+        self.assertEqual(items, other)
+        items.close()
+        other.close()
+
+    def test_invalid_parameters_expect_exception(self):
+        with self.assertRaises(Exception):
+            SpillableList(chunk_size=0)
+        with self.assertRaises(Exception):
+            SpillableList(typecode='u')
+
+
+class TestSpillableListContainer(unittest.TestCase):
+
+    def test_store_with_validation(self):
+        data = SpillableListContainer(result_set_name='Test', data_validator=DictRecordValidator(), chunk_size=5, max_memory_items=5)
+        for i in range(23):
+            self.assertEqual(i + 1, data.store(data={'i': i}))
+        with self.assertRaises(Exception):
+            data.store(data='not a dict')
+        self.assertEqual(23, len(data.data))
+        self.assertEqual(3, data.data.spilled_chunk_count)
+        self.assertEqual({'i': 7}, data.data[7])
+        self.assertEqual(23, data.store_many(items=[]))
+        data.close()
+
+    def test_memory_budget_spills_chunks(self):
+        budget = MemoryBudget()
+        data = SpillableListContainer(result_set_name='Test', chunk_size=10, max_memory_items=1000, memory_budget=budget)
+        for i in range(95):
+            data.store(data='item-{}'.format(i))
+        self.assertEqual(0, data.data.spilled_chunk_count)
+        size = budget.usage()['Test']
+        self.assertEqual(data.memory_usage(), size)
+        budget.limit = size // 2
+        data.store(data='item-95')
+        self.assertEqual(9, data.data.spilled_chunk_count)
+        self.assertLess(budget.total, size // 2)
+        self.assertEqual(['item-0', 'item-95'], [data.data[0], data.data[95]])
+        data.close()
+
+
+class TestSpillableListContainerWriters(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.records = [{'i': i, 'name': 'record-{}'.format(i)} for i in range(25)]
+        self.data = SpillableListContainer(result_set_name='Test', chunk_size=5, max_memory_items=5)
+        self.data.store_many(items=self.records)
+
+    def tearDown(self):
+        self.data.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_text_file_io(self):
+        tfio = TextFileIO(file_folder_path=self.directory, file_name='records.txt')
+        tfio.write(data=self.data)
+        with open(tfio.uri) as f:
+            self.assertEqual('{}'.format(self.records), f.read())
+
+    def test_ndjson_io(self):
+        ndjson_io = NDJsonIO(file_folder_path=self.directory, file_name='records.ndjson')
+        ndjson_io.write(data=self.data)
+        self.assertEqual(self.records, ndjson_io.read().data)
+
+    def test_sqlite_io(self):
+        sqlite_io = SQLiteIO(db_path=os.path.join(self.directory, 'records.db'))
+        sqlite_io.write(data=self.data)
+        self.assertEqual(self.records, sqlite_io.read(result_set_name='Test').data)
+        sqlite_io.close()
+
+    def test_delta_file_io(self):
+        delta_io = DeltaFileIO(file_folder_path=self.directory, file_name='records.delta')
+        delta_io.write(data=self.data)
+        self.assertEqual(self.records, delta_io.read().data)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -0,0 +1,170 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_sqlite_io
+    $ coverage report -m
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from decimal import Decimal
+from oculusd_utils.persistence import GenericDataContainer, GenericIOProcessor
+from oculusd_utils.persistence.sqlite_io import SQLiteIO
+
+
+class RecordingIOProcessor(GenericIOProcessor):
+
+    def __init__(self):
+        super().__init__()
+        self.processed = list()
+
+    def process(self, data: GenericDataContainer, **kwarg):
+        self.processed.append(data.result_set_name)
+
+
+def container(result_set_name: str, data_type: object, data: object)->GenericDataContainer:
+    result = GenericDataContainer(result_set_name=result_set_name, data_type=data_type)
+    result.data = data
+    return result
+
+
+class TestSQLiteIO(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, 'data.db')
+        self.sqlite_io = SQLiteIO(db_path=self.db_path, batch_size=3)
+
+    def tearDown(self):
+        self.sqlite_io.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_write_and_read_all_types(self):
+        containers = (
+            container(result_set_name='s', data_type=str, data='Hello'),
+            container(result_set_name='i', data_type=int, data=42),
+            container(result_set_name='f', data_type=float, data=1.5),
+            container(result_set_name='d', data_type=Decimal, data=Decimal('10.01')),
+            container(result_set_name='l', data_type=list, data=[1, 'two', {'three': 3}, Decimal('4.4'), None]),
+            container(result_set_name='t', data_type=tuple, data=('a', 'b', )),
+            container(result_set_name='m', data_type=dict, data={'a': 1, 2: [2], 'c': None}),
+        )
+        for data in containers:
+            self.sqlite_io.write(data=data)
+        self.assertEqual(['d', 'f', 'i', 'l', 'm', 's', 't'], self.sqlite_io.result_set_names())
+        for data in containers:
+            result = self.sqlite_io.read(result_set_name=data.result_set_name)
+            self.assertEqual(data.data_type, result.data_type)
+            self.assertEqual(data.data, result.data)
+        self.assertEqual(['a', 2, 'c'], list(self.sqlite_io.read(result_set_name='m').data.keys()))
+
+    def test_write_replaces_result_set(self):
+        self.sqlite_io.write(data=container(result_set_name='m', data_type=dict, data={'a': 1, 'b': 2}))
+        self.sqlite_io.write(data=container(result_set_name='m', data_type=dict, data={'c': 3}))
+        self.assertEqual({'c': 3}, self.sqlite_io.read(result_set_name='m').data)
+        self.sqlite_io.write(data=container(result_set_name='x', data_type=dict, data={'c': 3}), result_set_name='other')
+        self.assertEqual({'c': 3}, self.sqlite_io.read(result_set_name='other').data)
+
+    def test_read_keys_without_loading_everything(self):
+        data = {'key-{}'.format(i): i for i in range(1200)}
+        self.sqlite_io.write(data=container(result_set_name='m', data_type=dict, data=data))
+        keys = ['key-{}'.format(i) for i in range(0, 1200, 2)] + ['missing']
+        result = self.sqlite_io.read_keys(keys=keys, result_set_name='m')
+        self.assertEqual(600, len(result.data))
+        self.assertEqual(1198, result.data['key-1198'])
+        self.assertEqual(7, self.sqlite_io.read_key(key='key-7', result_set_name='m'))
+        self.assertEqual('none', self.sqlite_io.read_key(key='missing', result_set_name='m', default='none'))
+
+    def test_put_and_delete_item(self):
+        self.sqlite_io.put_item(key='a', value=1, result_set_name='m')
+        self.sqlite_io.put_item(key='b', value=2, result_set_name='m')
+        self.sqlite_io.put_item(key='a', value=3, result_set_name='m')
+        self.assertEqual([('a', 3), ('b', 2)], list(self.sqlite_io.read(result_set_name='m').data.items()))
+        self.sqlite_io.delete_item(key='a', result_set_name='m')
+        self.assertEqual({'b': 2}, self.sqlite_io.read(result_set_name='m').data)
+        self.sqlite_io.write(data=container(result_set_name='l', data_type=list, data=[1]))
+        with self.assertRaises(Exception):
+            self.sqlite_io.put_item(key='a', value=1, result_set_name='l')
+        with self.assertRaises(Exception):
+            self.sqlite_io.read_keys(keys=('a', ), result_set_name='l')
+
+    def test_next_position_uses_index(self):
+        connection = self.sqlite_io.connection()
+        plan = connection.execute(
+            'EXPLAIN QUERY PLAN SELECT COALESCE(MAX(position), -1) + 1 FROM containers_items WHERE result_set_name = ?',
+            ('users', )
+        ).fetchall()
+        self.assertIn('containers_items_position', ' '.join([row[-1] for row in plan]))
+
+    def test_write_many_in_one_transaction(self):
+        containers = [container(result_set_name='m{}'.format(i), data_type=dict, data={'a': i}) for i in range(5)]
+        self.assertEqual(5, self.sqlite_io.write_many(containers=containers))
+        self.assertEqual({'a': 4}, self.sqlite_io.read(result_set_name='m4').data)
+
+    def test_failed_write_is_rolled_back(self):
+        self.sqlite_io.write(data=container(result_set_name='m', data_type=dict, data={'a': 1}))
+        with self.assertRaises(Exception):
+            self.sqlite_io.write(data=container(result_set_name='m', data_type=dict, data={'b': 2, 'c': 3, 'd': 4, 'e': object()}))
+        with self.assertRaises(Exception):
+            self.sqlite_io.write_many(containers=[container(result_set_name='n', data_type=dict, data={'a': 1}), 'not a container'])
+        with self.assertRaises(Exception):
+            self.sqlite_io.put_item(key=('tuple', ), value=1, result_set_name='m')
+        self.assertEqual({'a': 1}, self.sqlite_io.read(result_set_name='m').data)
+        self.assertEqual(['m'], self.sqlite_io.result_set_names())
+
+    def test_delete_and_missing_result_set(self):
+        self.sqlite_io.write(data=container(result_set_name='m', data_type=dict, data={'a': 1}))
+        self.sqlite_io.delete(result_set_name='m')
+        with self.assertRaises(Exception):
+            self.sqlite_io.read(result_set_name='m')
+
+    def test_processors(self):
+        processor = RecordingIOProcessor()
+        data = container(result_set_name='m', data_type=dict, data={'a': 1})
+        self.sqlite_io.write(data=data, write_processor=processor)
+        self.sqlite_io.read(result_set_name='m', read_processor=processor)
+        self.sqlite_io.read(result_set_name='m', read_processor='not a processor')
+        self.sqlite_io.write(data=data, write_processor='not a processor')
+        self.assertEqual(['m', 'm'], processor.processed)
+
+    def test_connection_per_thread(self):
+        connections = list()
+
+        def worker(number: int):
+            connections.append(self.sqlite_io.connection())
+            self.sqlite_io.put_item(key=number, value=number, result_set_name='m')
+
+        threads = [threading.Thread(target=worker, args=(i, )) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(4, len(set([id(connection) for connection in connections])))
+        self.assertTrue(self.sqlite_io.connection() not in connections)
+        self.assertEqual(4, len(self.sqlite_io.read(result_set_name='m').data))
+        self.assertEqual('wal', self.sqlite_io.connection().execute('PRAGMA journal_mode').fetchone()[0])
+
+    def test_invalid_parameters_expect_exception(self):
+        with self.assertRaises(Exception):
+            SQLiteIO(db_path=self.db_path, table_name='bad name; DROP TABLE x')
+        with self.assertRaises(Exception):
+            SQLiteIO(db_path=self.db_path, batch_size=0)
+        with self.assertRaises(Exception):
+            self.sqlite_io.write(data='not a container')
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -0,0 +1,120 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="*tests*","oculusd_utils/__init__.py,oculusd_utils/persistence/__init__.py,oculusd_utils/security/__init__.py" -m tests.test_string_rules
+    $ coverage report -m
+"""
+
+import unittest
+import string
+from oculusd_utils.security.validation import validate_string, StringDataValidator
+from oculusd_utils.security.string_rules import StringRules, RuleStringDataValidator
+from oculusd_utils.persistence import GenericDataContainer
+
+
+VALUES = (None, 5, '', 'a', 'A b', '1abc', ' lead', 'x' * 255, 'x' * 256, 'abc def', 'über', 'été ', 'tab\tand\nnewline')
+
+
+class TestStringRules(unittest.TestCase):
+
+    def test_same_results_as_validate_string(self):
+        for parameters in (
+            dict(),
+            dict(min_length=0),
+            dict(max_length=3, start_with_alpha=False),
+            dict(contain_at_least_one_space=True),
+            dict(can_be_none=True),
+        ):
+            rules = StringRules(**parameters)
+            for value in VALUES:
+                self.assertEqual(validate_string(input_str=value, **parameters), rules.check(value), '{} {!r}'.format(parameters, value))
+
+    def test_character_prefix_and_suffix_rules(self):
+        rules = StringRules(allowed_characters=string.ascii_lowercase + '-', prefixes=('db-', 'web-', ), suffixes='-prod')
+        self.assertTrue(rules.check('db-main-prod'))
+        self.assertFalse(rules.check('db-Main-prod'))
+        self.assertFalse(rules.check('cache-prod'))
+        self.assertFalse(rules.check('web-test'))
+        self.assertIsNone(rules.regex)
+        self.assertEqual([1, 2], rules.failed_indices(['web-x-prod', 'web-1-prod', None]))
+
+    def test_rules_merged_into_one_regex(self):
+        rules = StringRules(
+            start_with_alpha=False,
+            pattern=r'[a-z]+(?:\.[a-z]+)*',
+            prefixes=('a', 'b', ),
+            suffixes=('.com', '.org', ),
+            forbidden_substrings=('..', 'bad', ),
+            allowed_characters=string.ascii_lowercase + '.]',
+        )
+        self.assertIsNotNone(rules.regex)
+        self.assertTrue(rules.check('alpha.example.com'))
+        self.assertTrue(rules.check('b.org'))
+        self.assertFalse(rules.check('c.org'))
+        self.assertFalse(rules.check('alpha.example.net'))
+        self.assertFalse(rules.check('a.bad.com'))
+        self.assertFalse(rules.check('a.com\n'))
+        space_rules = StringRules(forbidden_substrings='--', contain_at_least_one_space=True)
+        self.assertTrue(space_rules.check('a b'))
+        self.assertFalse(space_rules.check('ab'))
+        self.assertFalse(space_rules.check('a -- b'))
+
+    def test_pattern_keeps_its_own_meaning(self):
+        rules = StringRules(pattern='a.b', start_with_alpha=False)
+        self.assertTrue(rules.check('a-b'))
+        self.assertFalse(rules.check('a\nb'))
+        rules = StringRules(pattern='a.b', start_with_alpha=False, forbidden_substrings='x', suffixes='b')
+        self.assertFalse(rules.check('a\nb'))
+        self.assertFalse(rules.check('axb'))
+        self.assertTrue(StringRules(forbidden_substrings='x', suffixes='b').check('a\nb'))
+        rules = StringRules(pattern='(?i)abc', forbidden_substrings='--')
+        self.assertTrue(rules.check('ABC'))
+        self.assertFalse(rules.check('abd'))
+
+    def test_empty_rule_values(self):
+        for forbidden_substrings in (None, ('x', ), ):
+            rules = StringRules(min_length=0, start_with_alpha=False, allowed_characters='', forbidden_substrings=forbidden_substrings)
+            self.assertTrue(rules.check(''))
+            self.assertFalse(rules.check('a'))
+        rules = StringRules(forbidden_substrings=())
+        self.assertIsNone(rules.forbidden_substrings)
+        self.assertTrue(rules.check('abc'))
+        with self.assertRaises(Exception):
+            StringRules(prefixes=())
+        with self.assertRaises(Exception):
+            StringRules(suffixes=[])
+
+    def test_validator(self):
+        validator = RuleStringDataValidator(rules=StringRules(max_length=8, allowed_characters=string.ascii_letters))
+        self.assertIsInstance(validator, StringDataValidator)
+        self.assertTrue(validator.validate(data='Hello'))
+        self.assertFalse(validator.validate(data='Hello world'))
+        self.assertTrue(validator.validate(data='Hello world', max_length=20, allowed_characters=string.ascii_letters + ' '))
+        self.assertTrue(validator.validate(data='Hello world', allowed_characters=string.ascii_letters + ' ', max_length=20))
+        self.assertEqual(1, len(validator._compiled))
+        self.assertFalse(validator.validate(data='Hello1'))
+        with self.assertRaises(Exception):
+            validator.validate(data='Hello', prefixes=['H'])
+        self.assertTrue(RuleStringDataValidator().validate(data='Hello'))
+        bounded = RuleStringDataValidator(max_compiled=2)
+        for max_length in range(5, 10):
+            self.assertTrue(bounded.validate(data='Hello', max_length=max_length))
+        self.assertEqual([(('max_length', 8, ), ), (('max_length', 9, ), )], list(bounded._compiled))
+        data = GenericDataContainer(data_type=str, data_validator=validator)
+        data.store(data='Hello')
+        with self.assertRaises(Exception):
+            data.store(data='Hello!')
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -0,0 +1,159 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_table
+    $ coverage report -m
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+from array import array
+from decimal import Decimal
+from oculusd_utils.persistence import GenericDataContainer
+from oculusd_utils.persistence.table import validate_column, TableDataContainer, CsvTableIO
+
+
+SCHEMA = {
+    'name': (str, {'min_length': 1, 'max_length': 10}),
+    'age': (int, {'min_value': 0, 'max_value': 150}),
+    'score': (float, {}),
+    'balance': (Decimal, {'min_value': '0.00'}),
+}
+
+
+class TestValidateColumn(unittest.TestCase):
+
+    def test_string_columns(self):
+        self.assertEqual(-1, validate_column(column_type=str, values=['Alice', 'Bob'], parameters={}))
+        self.assertEqual(1, validate_column(column_type=str, values=['Alice', '1bob'], parameters={}))
+        self.assertEqual(-1, validate_column(column_type=str, values=['Alice', '1bob'], parameters={'start_with_alpha': False}))
+        self.assertEqual(0, validate_column(column_type=str, values=['Alice', 'Bob Smith'], parameters={'contain_at_least_one_space': True}))
+        self.assertEqual(2, validate_column(column_type=str, values=['a', 'b', ''], parameters={}))
+        self.assertEqual(1, validate_column(column_type=str, values=['a', None], parameters={}))
+        self.assertEqual(-1, validate_column(column_type=str, values=['a', None], parameters={'can_be_none': True}))
+        self.assertEqual(-1, validate_column(column_type=str, values=[], parameters={}))
+
+    def test_number_columns(self):
+        self.assertEqual(-1, validate_column(column_type=int, values=array('q', [0, 5, 10]), parameters={'min_value': 0, 'max_value': 10}))
+        self.assertEqual(1, validate_column(column_type=int, values=array('q', [0, -5, 10]), parameters={'min_value': 0}))
+        self.assertEqual(2, validate_column(column_type=int, values=array('q', [0, 5, 11]), parameters={'max_value': 10}))
+        self.assertEqual(2, validate_column(column_type=float, values=array('d', [float('nan'), 1.0, -1.0]), parameters={'min_value': 0}))
+        self.assertEqual(-1, validate_column(column_type=float, values=array('d', [float('nan'), 1.0]), parameters={'min_value': 0}))
+        self.assertEqual(0, validate_column(column_type=Decimal, values=[Decimal('-1')], parameters={'min_value': Decimal('0')}))
+
+
+class TestTableDataContainer(unittest.TestCase):
+
+    def setUp(self):
+        self.table = TableDataContainer(result_set_name='people', schema=SCHEMA)
+
+    def test_extend_and_read(self):
+        self.assertIsInstance(self.table, GenericDataContainer)
+        self.assertEqual(2, self.table.extend(rows=[
+            {'name': 'Alice', 'age': 30, 'score': 1.5, 'balance': Decimal('10.00')},
+            {'name': 'Bob', 'age': 40, 'score': 2, 'balance': Decimal('0.00')},
+        ]))
+        self.assertEqual(3, self.table.store(data={'name': 'Carol', 'age': 50, 'score': 0.5, 'balance': Decimal('1')}))
+        self.assertEqual(array('q', [30, 40, 50]), self.table.column(name='age'))
+        self.assertEqual(array('d', [1.5, 2.0, 0.5]), self.table.data['score'])
+        self.assertEqual({'name': 'Bob', 'age': 40, 'score': 2.0, 'balance': Decimal('0.00')}, self.table.row(index=1))
+        self.assertEqual(['Alice', 'Bob', 'Carol'], [row['name'] for row in self.table.rows()])
+        self.assertEqual(('name', 'age', 'score', 'balance', ), self.table.column_names())
+        with self.assertRaises(Exception):
+            self.table.column(name='missing')
+
+    def test_invalid_batches_are_not_added(self):
+        self.table.extend_columns(columns={'name': ['Alice'], 'age': [30], 'score': [1.0], 'balance': [Decimal('1')]})
+        invalid_batches = (
+            {'name': ['Bob', 'Carol'], 'age': [40, 151], 'score': [1.0, 1.0], 'balance': [Decimal('1'), Decimal('1')]},
+            {'name': ['Bob', 'Carol'], 'age': [40, 'x'], 'score': [1.0, 1.0], 'balance': [Decimal('1'), Decimal('1')]},
+            {'name': ['Bob', 'Carol'], 'age': [40, 41], 'score': [1.0, 1.0], 'balance': [Decimal('1'), 1]},
+            {'name': ['Bob', 'Carol'], 'age': [40, 41], 'score': [1.0, 1.0], 'balance': [Decimal('1'), Decimal('-1')]},
+            {'name': ['Bob', 'Carolina Smith'], 'age': [40, 41], 'score': [1.0, 1.0], 'balance': [Decimal('1'), Decimal('1')]},
+            {'name': ['Bob'], 'age': [40, 41], 'score': [1.0, 1.0], 'balance': [Decimal('1'), Decimal('1')]},
+            {'name': ['Bob'], 'age': [40]},
+        )
+        for columns in invalid_batches:
+            with self.assertRaises(Exception):
+                self.table.extend_columns(columns=columns)
+        with self.assertRaises(Exception):
+            self.table.extend(rows=[{'name': 'Bob'}])
+        with self.assertRaises(Exception):
+            self.table.store(data=['Bob', 40, 1.0, Decimal('1')])
+        self.assertEqual(1, self.table.row_count())
+        self.assertEqual(1, len(self.table.column(name='balance')))
+
+    def test_projection_shares_columns(self):
+        self.table.extend(rows=[{'name': 'Alice', 'age': 30, 'score': 1.5, 'balance': Decimal('1')}])
+        projection = self.table.project(names=('age', 'name', ))
+        self.assertEqual(('age', 'name', ), projection.column_names())
+        self.assertIs(self.table.column(name='age'), projection.column(name='age'))
+        with self.assertRaises(Exception):
+            projection.store(data={'name': 'Bob', 'age': 40})
+        with self.assertRaises(Exception):
+            self.table.project(names=('missing', ))
+
+    def test_data_assignment(self):
+        self.table.data = {'name': ['Alice'], 'age': [30], 'score': [1.5], 'balance': [Decimal('1')]}
+        self.assertEqual(array('q', [30]), self.table.column(name='age'))
+        with self.assertRaises(Exception):
+            self.table.data = {'name': ['Alice']}
+
+    def test_invalid_schema_expect_exception(self):
+        for schema in (None, {}, {'a': (list, {})}, {'a': (int, {'min_length': 1})}, {'a': (str, {'min_value': 1})}):
+            with self.assertRaises(Exception):
+                TableDataContainer(schema=schema)
+
+
+class TestCsvTableIO(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.csv_io = CsvTableIO(file_folder_path=self.directory, file_name='people.csv', schema=SCHEMA, chunk_size=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write_lines(self, lines: list):
+        with open(self.csv_io.uri, 'w') as f:
+            f.write('\n'.join(lines))
+
+    def test_write_and_read(self):
+        table = TableDataContainer(schema=SCHEMA)
+        table.extend(rows=[{'name': 'Person', 'age': i, 'score': i / 2, 'balance': Decimal('{}.10'.format(i))} for i in range(5)])
+        self.csv_io.write(data=table)
+        result = self.csv_io.read()
+        self.assertEqual(5, result.row_count())
+        self.assertEqual(table.columns, result.columns)
+        self.assertEqual([2, 2, 1], [chunk.row_count() for chunk in self.csv_io.chunks()])
+        with self.assertRaises(Exception):
+            self.csv_io.write(data=GenericDataContainer(data_type=list))
+
+    def test_extra_columns_are_ignored_and_errors_have_line_numbers(self):
+        self.write_lines(lines=['extra,balance,score,age,name', 'x,1.00,1.5,30,Alice', 'y,2.00,2.5,31,Bob', 'z,3.00,3.5,old,Carol'])
+        chunks = self.csv_io.chunks()
+        self.assertEqual(['Alice', 'Bob'], next(chunks).column(name='name'))
+        with self.assertRaises(Exception) as context:
+            next(chunks)
+        self.assertIn('Line 4', str(context.exception))
+        self.write_lines(lines=['name,age', 'Alice,30'])
+        with self.assertRaises(Exception):
+            self.csv_io.read()
+        self.write_lines(lines=[])
+        self.assertEqual(0, self.csv_io.read().row_count())
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
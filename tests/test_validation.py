@@ -14,7 +14,7 @@ Usage with coverage:
 """
 
 import unittest
-from oculusd_utils.security.validation import is_valid_email, validate_string, DataValidator, StringDataValidator, NumberDataValidator
+from oculusd_utils.security.validation import is_valid_email, validate_string, DataValidator, StringDataValidator, NumberDataValidator, ValidationCache, CachedDataValidator
 from oculusd_utils.persistence import GenericDataContainer
 import random
 from decimal import Decimal
@@ -383,7 +383,94 @@ class TestNumberDataValidator(unittest.TestCase):
         v = NumberDataValidator()
         with self.assertRaises(Exception):
             v.validate(data=datetime.now(), min_value=0.0)
-        
+
+
+class TestValidationCache(unittest.TestCase):
+
+    def test_results_are_cached_per_parameters(self):
+        cache = ValidationCache(max_size=10)
+        v = CachedDataValidator(validator=StringDataValidator(), cache=cache)
+        self.assertTrue(v.validate(data='NL', max_length=2))
+        self.assertTrue(v.validate(data='NL', max_length=2))
+        self.assertFalse(v.validate(data='NL', max_length=1))
+        self.assertFalse(v.validate(data='1NL'))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(3, cache.misses)
+        self.assertEqual(0.25, cache.hit_rate())
+        self.assertEqual(3, cache.size())
+
+    def test_parameter_order_and_defaults_share_entries(self):
+        cache = ValidationCache()
+        v = CachedDataValidator(validator=NumberDataValidator(), cache=cache)
+        self.assertTrue(v.validate(data=3, min_value=1, max_value=5))
+        self.assertTrue(v.validate(data=3, max_value=5, min_value=1))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.size())
+        v = CachedDataValidator(validator=StringDataValidator(), cache=cache, defaults={'min_length': 1, 'max_length': 255})
+        self.assertTrue(v.validate(data='abc'))
+        self.assertTrue(v.validate(data='abc', max_length=255))
+        self.assertTrue(v.validate(data='abc', max_length=255, min_length=1))
+        self.assertFalse(v.validate(data='abc', max_length=2))
+        self.assertEqual(3, cache.hits)
+        self.assertEqual(3, cache.size())
+
+    def test_validators_sharing_a_cache(self):
+        cache = ValidationCache()
+        strict = CachedDataValidator(validator=StringDataValidator(), cache=cache)
+        never = CachedDataValidator(validator=DataValidator(), cache=cache)
+        self.assertTrue(strict.validate(data='abc'))
+        self.assertFalse(never.validate(data='abc'))
+        self.assertEqual(2, cache.size())
+        with self.assertRaises(Exception):
+            CachedDataValidator(validator='not a validator')
+
+    def test_clock_eviction(self):
+        cache = ValidationCache(max_size=2)
+        v = CachedDataValidator(validator=StringDataValidator(), cache=cache)
+        v.validate(data='a')
+        v.validate(data='b')
+        v.validate(data='a')    # Marks "a" as referenced, so "b" is evicted for "c"
+        v.validate(data='c')
+        self.assertEqual(2, cache.size())
+        v.validate(data='a')
+        v.validate(data='b')
+        self.assertEqual({'size': 2, 'max_size': 2, 'hits': 2, 'misses': 4, 'uncacheable': 0, 'hit_rate': 2 / 6}, cache.statistics())
+        cache.clear()
+        self.assertEqual(0, cache.size())
+        self.assertEqual(0.0, cache.hit_rate())
+
+    def test_large_and_unhashable_values_are_not_cached(self):
+        cache = ValidationCache(max_value_length=5)
+        v = CachedDataValidator(validator=StringDataValidator(), cache=cache)
+        self.assertTrue(v.validate(data='abcdef'))
+        self.assertFalse(v.validate(data=['a', 'list']))
+        self.assertTrue(v.validate(data='abc', unused=[10]))
+        self.assertEqual(0, cache.size())
+        self.assertEqual(3, cache.uncacheable)
+
+    def test_number_results_keep_types_apart(self):
+        cache = ValidationCache()
+        v = CachedDataValidator(validator=NumberDataValidator(), cache=cache)
+        self.assertTrue(v.validate(data=1, min_value=1))
+        self.assertFalse(v.validate(data=True, min_value=2))
+        self.assertTrue(v.validate(data=1.0, min_value=1))
+        self.assertEqual(0, cache.hits)
+        with self.assertRaises(Exception):
+            v.validate(data=Decimal('1'), min_value=1)
+        with self.assertRaises(Exception):
+            v.validate(data=Decimal('1'), min_value=1)
+        self.assertTrue(v.validate(data=1, min_value=1))
+        self.assertEqual(1, cache.hits)
+
+    def test_email_results_are_cached(self):
+        cache = ValidationCache()
+        self.assertTrue(is_valid_email('user1@example.tld', cache=cache))
+        self.assertTrue(is_valid_email('user1@example.tld', cache=cache))
+        self.assertFalse(is_valid_email('user2', cache=cache))
+        self.assertEqual(1, cache.hits)
+        with self.assertRaises(Exception):
+            ValidationCache(max_size=0)
+
 
 if __name__ == '__main__':
     unittest.main()
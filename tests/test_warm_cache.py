@@ -0,0 +1,179 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_warm_cache
+    $ coverage report -m
+"""
+
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+from decimal import Decimal
+from oculusd_utils.persistence import TextFileIO, GenericDataContainer
+from oculusd_utils.persistence.warm_cache import WarmStartCache, file_signature
+
+
+class TestWarmStartCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, 'warm.db')
+        self.cache = WarmStartCache(db_path=self.db_path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write_file(self, file_name: str, text: str)->str:
+        path = os.path.join(self.directory, file_name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def restart(self)->WarmStartCache:
+        self.cache.close()
+        self.cache = WarmStartCache(db_path=self.db_path)
+        return self.cache
+
+    def test_put_and_get_container_survives_restart(self):
+        path = self.write_file(file_name='a.json', text='{"a": 1}')
+        data = GenericDataContainer(data_type=dict)
+        data.store(data=Decimal('1.5'), key='a')
+        self.cache.put_container(path=path, data=data, parser='json')
+        self.assertIsNone(self.cache.get_container(path=path, parser='text'))
+        cache = self.restart()
+        self.assertEqual(1, cache.warm_up())
+        result = cache.get_container(path=path, parser='json')
+        self.assertEqual('dict', result.data_type.__name__)
+        self.assertEqual({'a': Decimal('1.5')}, result.data)
+
+    def test_lazy_get_without_warm_up(self):
+        path = self.write_file(file_name='a.txt', text='Hello')
+        self.cache.put_text(key=path, text='Hello')
+        cache = self.restart()
+        self.assertEqual(0, len(cache.entries))
+        self.assertEqual('Hello', cache.get_text(key=path))
+        self.assertEqual(1, len(cache.entries))
+
+    def test_changed_file_is_not_served(self):
+        path = self.write_file(file_name='a.txt', text='One')
+        self.cache.put_text(key=path, text='One')
+        self.write_file(file_name='a.txt', text='Changed')
+        self.assertIsNone(self.cache.get_text(key=path))
+        cache = self.restart()
+        self.assertEqual(0, cache.warm_up())
+        self.assertEqual(0, cache.entry_count())
+
+    def test_removed_file(self):
+        path = self.write_file(file_name='a.txt', text='One')
+        self.cache.put_text(key=path, text='One')
+        os.remove(path)
+        self.assertIsNone(self.cache.get_text(key=path))
+        self.cache.put_text(key=path, text='Not stored')
+        self.assertEqual(1, self.cache.entry_count())
+        self.assertEqual(0, self.cache.warm_up())
+        self.assertEqual(0, self.cache.entry_count())
+
+    def test_warm_up_selected_parsers(self):
+        path = self.write_file(file_name='a.txt', text='One')
+        self.cache.put_text(key=path, text='One')
+        data = GenericDataContainer(data_type=list)
+        data.store(data='One')
+        self.cache.put_container(path=path, data=data, parser='lines')
+        cache = self.restart()
+        self.assertEqual(1, cache.warm_up(parsers=('lines', )))
+        self.assertEqual(['lines'], [key[1] for key in cache.entries])
+
+    def test_unreadable_entry_is_dropped(self):
+        path = self.write_file(file_name='a.txt', text='One')
+        self.cache.put_text(key=path, text='One')
+        connection = sqlite3.connect(self.db_path)
+        connection.execute("UPDATE entries SET payload = X'00'")
+        connection.commit()
+        connection.close()
+        cache = self.restart()
+        self.assertEqual(0, cache.warm_up())
+        self.assertEqual(0, cache.entry_count())
+
+    def test_unreadable_dict_entry_is_dropped_on_get(self):
+        path = self.write_file(file_name='a.json', text='{"a": 1}')
+        data = GenericDataContainer(data_type=dict)
+        data.store(data=1, key='a')
+        self.cache.put_container(path=path, data=data, parser='json')
+        connection = sqlite3.connect(self.db_path)
+        connection.execute("UPDATE entries SET payload = X'00'")
+        connection.commit()
+        connection.close()
+        cache = self.restart()
+        self.assertIsNone(cache.get_container(path=path, parser='json'))
+        self.assertEqual(0, cache.entry_count())
+
+    def test_returned_data_is_a_copy(self):
+        path = self.write_file(file_name='a.json', text='{"a": [1]}')
+        data = GenericDataContainer(data_type=dict)
+        data.store(data=[1], key='a')
+        self.cache.put_container(path=path, data=data, parser='json')
+        data.data['a'].append(2)
+        result = self.cache.get_container(path=path, parser='json')
+        result.data['a'].append(3)
+        result.data['b'] = 4
+        self.assertEqual({'a': [1]}, self.cache.get_container(path=path, parser='json').data)
+
+    def test_file_changed_after_read_is_not_cached(self):
+        path = self.write_file(file_name='a.txt', text='One')
+        signature = file_signature(path=path)
+        self.write_file(file_name='a.txt', text='One, changed while it was parsed')
+        self.cache.put_text(key=path, text='One', signature=signature)
+        self.assertEqual(0, self.cache.entry_count())
+        self.assertIsNone(self.cache.get_text(key=path))
+
+    def test_invalidate(self):
+        path = self.write_file(file_name='a.txt', text='One')
+        self.cache.put_text(key=path, text='One')
+        data = GenericDataContainer(data_type=int)
+        data.store(data=1)
+        self.cache.put_container(path=path, data=data, parser='count')
+        self.cache.invalidate(key=path, parser='count')
+        self.assertIsNone(self.cache.get_container(path=path, parser='count'))
+        self.assertEqual('One', self.cache.get_text(key=path))
+        self.cache.invalidate(key=path)
+        self.assertIsNone(self.cache.get_text(key=path))
+        self.assertEqual(0, self.cache.entry_count())
+
+    def test_put_invalid_data_expect_exception(self):
+        with self.assertRaises(Exception):
+            self.cache.put_container(path='a', data='not a container')
+
+    def test_text_file_io_with_warm_start_cache(self):
+        path = self.write_file(file_name='a.txt', text='Persisted')
+        tfio = TextFileIO(file_folder_path=self.directory, file_name='a.txt', enable_cache=True, cache_backend=self.cache)
+        self.assertEqual('Persisted', tfio.read().data)
+        cache = self.restart()
+        self.assertEqual(1, cache.warm_up())
+        tfio = TextFileIO(file_folder_path=self.directory, file_name='a.txt', enable_cache=True, cache_backend=cache)
+        self.assertEqual('Persisted', tfio.read().data)
+        self.write_file(file_name='a.txt', text='Changed on disk')
+        self.assertEqual('Changed on disk', tfio.read().data)
+
+    def test_text_file_io_write_is_cached(self):
+        tfio = TextFileIO(file_folder_path=self.directory, file_name='a.txt', enable_cache=True, cache_backend=self.cache)
+        data = GenericDataContainer(data_type=str)
+        data.store(data='Written')
+        tfio.write(data=data)
+        self.assertEqual('Written', self.cache.get_text(key=tfio.uri))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF
@@ -0,0 +1,194 @@
+# Copyright (c) 2018. All rights reserved. OculusD.com, Inc. 
+# This software is licensed under the LGPL license version 3 of 2007. A copy of
+# the license should be included with this software, usually in a file called
+# LICENSE.txt. If this is not the case, you can view the license online at
+# https://www.gnu.org/licenses/lgpl-3.0.txt
+
+"""
+Usage with coverage:
+
+::
+
+    $ coverage run --omit="oculusd_utils/__init__.py","oculusd_utils/security/*" -m tests.test_watcher
+    $ coverage report -m
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from oculusd_utils.persistence import TextFileIO
+from oculusd_utils.persistence.watcher import CacheWatcher, read_file_signature
+
+
+def write_file(path: str, data: str):
+    with open(path, 'w') as f:
+        f.write(data)
+    # Make sure the modification time differs, even on file systems with a coarse timestamp resolution
+    stat_result = os.stat(path)
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1000000000))
+
+
+class TestCacheWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def create_text_file_io(self, file_name: str, data: str)->TextFileIO:
+        write_file(os.path.join(self.folder, file_name), data)
+        return TextFileIO(file_folder_path=self.folder, file_name=file_name, enable_cache=True, cache_max_age=86400)
+
+    def test_watcher_invalidates_cache_on_change(self):
+        tfio = self.create_text_file_io(file_name='a.txt', data='TEST')
+        watcher = CacheWatcher()
+        watcher.watch(text_file_io=tfio)
+        self.assertEqual('TEST', tfio.read().data)
+        self.assertEqual(0, watcher.poll())
+        write_file(tfio.uri, 'Changed')
+        self.assertEqual('TEST', tfio.read().data)
+        self.assertEqual(1, watcher.poll())
+        self.assertIsNone(tfio.cached_data)
+        self.assertEqual('Changed', tfio.read().data)
+
+    def test_watcher_refresh_mode(self):
+        tfio = self.create_text_file_io(file_name='a.txt', data='TEST')
+        watcher = CacheWatcher(refresh=True)
+        watcher.watch(text_file_io=tfio)
+        tfio.read()
+        write_file(tfio.uri, 'Changed')
+        watcher.poll()
+        self.assertIsNotNone(tfio.cached_data)
+        self.assertEqual('Changed', tfio.cached_data.data)
+
+    def test_watcher_scandir_directory_with_subscribers(self):
+        events = list()
+        per_file_events = list()
+        watcher = CacheWatcher(min_files_for_scandir=2)
+        watcher.subscribe(callback=lambda uri, previous, current: events.append((uri, previous, current)))
+        text_file_ios = list()
+        for i in range(5):
+            tfio = self.create_text_file_io(file_name='file{}.txt'.format(i), data='TEST')
+            text_file_ios.append(tfio)
+            if i == 0:
+                watcher.watch(text_file_io=tfio, callback=lambda uri, previous, current: per_file_events.append(uri))
+            else:
+                watcher.watch(text_file_io=tfio)
+        self.assertEqual(5, watcher.watched_count())
+        write_file(text_file_ios[0].uri, 'Changed')
+        os.remove(text_file_ios[1].uri)
+        self.assertEqual(2, watcher.poll_all())
+        self.assertEqual(2, len(events))
+        self.assertEqual([os.path.abspath(text_file_ios[0].uri)], per_file_events)
+        removed = [event for event in events if event[2] is None]
+        self.assertEqual(1, len(removed))
+        self.assertIsNotNone(removed[0][1])
+
+    def test_watcher_new_file_detected(self):
+        events = list()
+        watcher = CacheWatcher()
+        path = os.path.join(self.folder, 'new.txt')
+        watcher.watch_path(path=path, callback=lambda uri, previous, current: events.append(current))
+        self.assertIsNone(read_file_signature(path=path))
+        write_file(path, 'Hello')
+        self.assertEqual(1, watcher.poll())
+        self.assertEqual(read_file_signature(path=path), events[0])
+
+    def test_watcher_batches_round_robin(self):
+        watcher = CacheWatcher(batch_size=1)
+        paths = list()
+        for i in range(3):
+            folder = os.path.join(self.folder, 'dir{}'.format(i))
+            os.mkdir(folder)
+            path = os.path.join(folder, 'file.txt')
+            write_file(path, 'TEST')
+            watcher.watch_path(path=path)
+            paths.append(path)
+        for path in paths:
+            write_file(path, 'Changed')
+        self.assertEqual(1, watcher.poll())
+        self.assertEqual(1, watcher.poll())
+        self.assertEqual(1, watcher.poll())
+        self.assertEqual(0, watcher.poll())
+
+    def test_watcher_splits_large_directory_over_polls(self):
+        checked = list()
+        watcher = CacheWatcher(batch_size=2, min_files_for_scandir=2)
+        original = watcher._current_signatures
+
+        def current_signatures(directory: str, files: dict)->dict:
+            checked.append(len(files))
+            return original(directory=directory, files=files)
+
+        watcher._current_signatures = current_signatures
+        paths = list()
+        for i in range(5):
+            path = os.path.join(self.folder, 'file{}.txt'.format(i))
+            write_file(path, 'TEST')
+            watcher.watch_path(path=path)
+            paths.append(path)
+        for path in paths:
+            write_file(path, 'Changed')
+        self.assertEqual(2, watcher.poll())
+        self.assertEqual(2, watcher.poll())
+        self.assertEqual(1, watcher.poll())     # The last file of the directory, then the first one again
+        self.assertEqual([2, 2, 1, 1], checked)
+        write_file(paths[1], 'Changed again')
+        self.assertEqual(1, watcher.poll_all())
+        self.assertEqual(5, sum(checked[4:]))
+
+    def test_watcher_unwatch(self):
+        tfio = self.create_text_file_io(file_name='a.txt', data='TEST')
+        watcher = CacheWatcher()
+        watcher.watch(text_file_io=tfio)
+        watcher.unwatch(path=tfio.uri)
+        watcher.unwatch(path=tfio.uri)
+        self.assertEqual(0, watcher.watched_count())
+        self.assertEqual(0, watcher.poll())
+
+    def test_watcher_failing_subscriber_does_not_stop_others(self):
+        events = list()
+        def failing_subscriber(uri, previous, current):
+            raise Exception('Subscriber failure')
+        tfio = self.create_text_file_io(file_name='a.txt', data='TEST')
+        watcher = CacheWatcher()
+        watcher.subscribe(callback=failing_subscriber)
+        watcher.subscribe(callback=lambda uri, previous, current: events.append(uri))
+        watcher.watch(text_file_io=tfio)
+        write_file(tfio.uri, 'Changed')
+        watcher.poll()
+        self.assertEqual(1, len(events))
+        watcher.unsubscribe(callback=failing_subscriber)
+        self.assertEqual(1, len(watcher.subscribers))
+
+    def test_watcher_background_thread(self):
+        tfio = self.create_text_file_io(file_name='a.txt', data='TEST')
+        watcher = CacheWatcher(poll_interval=0.01)
+        watcher.watch(text_file_io=tfio)
+        tfio.read()
+        watcher.start()
+        try:
+            self.assertTrue(watcher.is_running())
+            write_file(tfio.uri, 'Changed')
+            deadline = time.monotonic() + 5
+            while tfio.cached_data is not None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertIsNone(tfio.cached_data)
+        finally:
+            watcher.stop()
+        self.assertFalse(watcher.is_running())
+
+    def test_watcher_invalid_parameters_expect_exception(self):
+        with self.assertRaises(Exception):
+            CacheWatcher(batch_size=0)
+        with self.assertRaises(Exception):
+            CacheWatcher().watch(text_file_io='not a TextFileIO')
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# EOF